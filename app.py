@@ -1,5 +1,7 @@
 import streamlit as st
 from database_utils import register_user
+from cache_utils import get_response_cache_stats, purge_response_cache
+from gateway_utils import get_llm_gateway
 from datetime import datetime, timezone, timedelta
 import gspread
 from google.oauth2.service_account import Credentials
@@ -80,6 +82,7 @@ if st.session_state.user_id:
             st.Page("pages/3_Morning_Conference.py", title="Morning Conference", icon="🏥"),
             st.Page("pages/4_Dashboard.py", title="대쉬보드", icon="📊"),
             st.Page("pages/5_Question.py", title="질문", icon="❓"),
+            st.Page("pages/9_Search.py", title="검색", icon="🔍"),
         ]
     }
     
@@ -89,6 +92,7 @@ if st.session_state.user_id:
             st.Page("pages/6_New_Post.py", title="컨퍼런스 관리", icon="✍️"),
             st.Page("pages/7_Quiz_Admin.py", title="문제 관리", icon="📝"),
             st.Page("pages/8_Test_Admin.py", title="검사자료 관리", icon="🔬"),
+            st.Page("pages/10_AI_Usage.py", title="AI 사용량", icon="📈"),
         ]
     
     # 사이드바에 사용자 정보 표시
@@ -96,6 +100,19 @@ if st.session_state.user_id:
         st.markdown(f"**👤 {st.session_state.user_id}**")
         if st.session_state.is_admin:
             st.caption("👑 관리자")
+            with st.expander("🤖 AI 응답 캐시"):
+                cache_stats = get_response_cache_stats()
+                st.caption(f"저장 {cache_stats['entries']}개 · 적중률 {cache_stats['hit_rate']:.0%}")
+                st.caption(f"적중 {cache_stats['hits']} · 유사 적중 {cache_stats['similar_hits']} · 미스 {cache_stats['misses']}")
+                if st.button("캐시 비우기"):
+                    removed = purge_response_cache()
+                    st.success(f"{removed}개 삭제됨")
+            with st.expander("🚦 AI 호출 대기열"):
+                gw = get_llm_gateway().snapshot()
+                st.caption(f"진행 {gw['active']} · 대기 {gw['waiting']} (사용자 {gw['users_waiting']}명) · 최대 대기 {gw['max_queue']}")
+                st.caption(f"완료 {gw['calls']} · rate limit {gw['rate_limited']} · 재시도 {gw['retries']} · 실패 {gw['failed']}")
+                if gw['cooldown']:
+                    st.caption(f"rate limit 대기 {gw['cooldown']}초")
         if st.button("로그아웃"):
             st.session_state.user_id = ''
             st.session_state.is_admin = False
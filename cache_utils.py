@@ -0,0 +1,154 @@
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+import streamlit as st
+
+# AI 튜터 응답 캐시 설정 (사용자 간 공유)
+RESPONSE_CACHE_TTL = 7 * 24 * 3600     # 초
+RESPONSE_CACHE_MAX_ENTRIES = 2000
+RESPONSE_CACHE_SIMILARITY = 0.9        # 문자 n-gram 코사인 유사도 기준
+_cache_lock = threading.Lock()
+
+
+@st.cache_resource
+def get_response_cache():
+    """(context_id, 정규화된 질문) -> 응답 (프로세스 공유 LRU)"""
+    return {
+        "entries": OrderedDict(),   # key -> {"answer", "vector", "created"}
+        "by_context": {},           # context_id -> set(key)
+        "stats": {"hits": 0, "similar_hits": 0, "misses": 0, "evictions": 0},
+    }
+
+
+def normalize_question(question):
+    """공백/문장부호/대소문자 차이를 없앤 질문"""
+    text = str(question).lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _ngram_vector(text, sizes=(2, 3)):
+    compact = text.replace(" ", "")
+    counts = Counter()
+    for n in sizes:
+        for i in range(len(compact) - n + 1):
+            counts[compact[i:i + n]] += 1
+    norm = math.sqrt(sum(v * v for v in counts.values()))
+    return counts, norm
+
+
+def _cosine(a, b):
+    counts_a, norm_a = a
+    counts_b, norm_b = b
+    if not norm_a or not norm_b:
+        return 0.0
+    if len(counts_a) > len(counts_b):
+        counts_a, counts_b = counts_b, counts_a
+    dot = sum(v * counts_b.get(k, 0) for k, v in counts_a.items())
+    return dot / (norm_a * norm_b)
+
+
+def _remove(cache, key):
+    cache["entries"].pop(key, None)
+    keys = cache["by_context"].get(key[0])
+    if keys is not None:
+        keys.discard(key)
+        if not keys:
+            del cache["by_context"][key[0]]
+
+
+def get_cached_response(context_id, question, similar=True, cache=None):
+    """캐시된 응답 반환 (없으면 None). similar=True면 같은 자료의 비슷한 질문도 허용"""
+    if cache is None:
+        cache = get_response_cache()
+    normalized = normalize_question(question)
+    key = (str(context_id), normalized)
+    now = time.time()
+
+    with _cache_lock:
+        entries = cache["entries"]
+        entry = entries.get(key)
+        if entry and now - entry["created"] > RESPONSE_CACHE_TTL:
+            _remove(cache, key)
+            entry = None
+        if entry:
+            entries.move_to_end(key)
+            cache["stats"]["hits"] += 1
+            return entry["answer"]
+
+        if similar:
+            vector = _ngram_vector(normalized)
+            best_key, best_score = None, RESPONSE_CACHE_SIMILARITY
+            for other in list(cache["by_context"].get(key[0], ())):
+                other_entry = entries[other]
+                if now - other_entry["created"] > RESPONSE_CACHE_TTL:
+                    _remove(cache, other)
+                    continue
+                score = _cosine(vector, other_entry["vector"])
+                if score >= best_score:
+                    best_key, best_score = other, score
+            if best_key is not None:
+                entries.move_to_end(best_key)
+                cache["stats"]["similar_hits"] += 1
+                return entries[best_key]["answer"]
+
+        cache["stats"]["misses"] += 1
+        return None
+
+
+def put_cached_response(context_id, question, answer, cache=None):
+    if cache is None:
+        cache = get_response_cache()
+    normalized = normalize_question(question)
+    if not normalized or not answer:
+        return
+    key = (str(context_id), normalized)
+
+    with _cache_lock:
+        entries = cache["entries"]
+        entries[key] = {"answer": answer, "vector": _ngram_vector(normalized), "created": time.time()}
+        entries.move_to_end(key)
+        cache["by_context"].setdefault(key[0], set()).add(key)
+        while len(entries) > RESPONSE_CACHE_MAX_ENTRIES:
+            oldest = next(iter(entries))
+            _remove(cache, oldest)
+            cache["stats"]["evictions"] += 1
+
+
+def purge_response_cache(context_id=None, cache=None):
+    """
+    캐시 비우기 (context_id 지정 시 해당 자료만, "quiz:3"이면 "quiz:3:..." 하위 맥락 포함).
+    삭제된 항목 수 반환
+    """
+    if cache is None:
+        cache = get_response_cache()
+    with _cache_lock:
+        if context_id is None:
+            removed = len(cache["entries"])
+            cache["entries"].clear()
+            cache["by_context"].clear()
+            return removed
+        context_id = str(context_id)
+        keys = [
+            key
+            for context, context_keys in cache["by_context"].items()
+            if context == context_id or context.startswith(context_id + ":")
+            for key in context_keys
+        ]
+        for key in keys:
+            _remove(cache, key)
+        return len(keys)
+
+
+def get_response_cache_stats(cache=None):
+    """캐시 크기와 적중률"""
+    if cache is None:
+        cache = get_response_cache()
+    with _cache_lock:
+        stats = dict(cache["stats"])
+        stats["entries"] = len(cache["entries"])
+    lookups = stats["hits"] + stats["similar_hits"] + stats["misses"]
+    stats["hit_rate"] = (stats["hits"] + stats["similar_hits"]) / lookups if lookups else 0.0
+    return stats
@@ -0,0 +1,174 @@
+"""
+문제 은행 유사 중복 탐지 (MinHash + LSH).
+
+문제와 보기를 정규화(소문자, 공백/문장부호 제거, 보기는 정렬)한 뒤 글자 3-gram으로 쪼갠다.
+한국어는 띄어쓰기가 사람마다 달라 단어보다 글자 단위가 안정적이다.
+MinHash 서명을 밴드로 나눠 버킷에 넣고, 같은 버킷에 걸린 후보만 실제 Jaccard 유사도로 확인한다.
+색인은 프로세스 공유로 한 번 만들고, 등록/수정/삭제 때 해당 문제만 갱신한다.
+"""
+import random
+import re
+import threading
+import zlib
+
+import streamlit as st
+
+from empathy_utils import parse_choices
+
+DUPLICATE_SHINGLE_SIZE = 3
+DUPLICATE_NUM_PERM = 64
+DUPLICATE_BANDS = 16            # 밴드 16 x 4행: 유사도 약 0.5부터 후보로 걸림
+DUPLICATE_THRESHOLD = 0.7       # 후보 중 이 이상의 Jaccard 유사도만 중복으로 판단
+
+_MASKS = [random.Random(20240611 + i).getrandbits(32) for i in range(DUPLICATE_NUM_PERM)]
+_ROWS = DUPLICATE_NUM_PERM // DUPLICATE_BANDS
+_dedup_lock = threading.Lock()
+
+
+def _normalize(text):
+    return re.sub(r"[\W_]+", "", str(text or "").lower())
+
+
+def shingles(question):
+    """문제 + 보기의 글자 n-gram 해시 집합"""
+    choices = sorted(_normalize(c) for c in parse_choices(question.get('choices', '')) if c)
+    text = _normalize(question.get('question', '')) + "|" + "|".join(choices)
+    k = DUPLICATE_SHINGLE_SIZE
+    if len(text) <= k:
+        return {zlib.crc32(text.encode("utf-8"))}
+    return {zlib.crc32(text[i:i + k].encode("utf-8")) for i in range(len(text) - k + 1)}
+
+
+def minhash(hashes):
+    """MinHash 서명 (해시 하나에 순열마다 다른 XOR 마스크)"""
+    return [min(map(mask.__xor__, hashes)) for mask in _MASKS]
+
+
+def _band_keys(signature):
+    return [(b, tuple(signature[b * _ROWS:(b + 1) * _ROWS])) for b in range(DUPLICATE_BANDS)]
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@st.cache_resource
+def get_duplicate_index():
+    """문제 id -> 글자 n-gram 집합/밴드 키, (밴드, 서명 조각) -> 문제 id 집합 (프로세스 공유)"""
+    return {"shingles": {}, "bands": {}, "buckets": {}, "questions": {}, "built": False}
+
+
+def _remove(index, question_id):
+    index["shingles"].pop(question_id, None)
+    index["questions"].pop(question_id, None)
+    for key in index["bands"].pop(question_id, []):
+        bucket = index["buckets"].get(key)
+        if bucket is not None:
+            bucket.discard(question_id)
+            if not bucket:
+                del index["buckets"][key]
+
+
+def _add(index, question):
+    question_id = str(question.get('id', ''))
+    _remove(index, question_id)
+    hashes = shingles(question)
+    keys = _band_keys(minhash(hashes))
+    index["shingles"][question_id] = hashes
+    index["questions"][question_id] = str(question.get('question', ''))
+    index["bands"][question_id] = keys
+    for key in keys:
+        index["buckets"].setdefault(key, set()).add(question_id)
+
+
+def _candidates(index, keys, exclude=None):
+    found = set()
+    for key in keys:
+        found |= index["buckets"].get(key, set())
+    found.discard(exclude)
+    return found
+
+
+def build_duplicate_index(questions, index=None):
+    """전체 문제로 색인 만들기"""
+    if index is None:
+        index = get_duplicate_index()
+    with _dedup_lock:
+        for key in ("shingles", "bands", "buckets", "questions"):
+            index[key].clear()
+        for q in questions:
+            _add(index, q)
+        index["built"] = True
+    return index
+
+
+def index_question(question, index=None):
+    """등록/수정 시 해당 문제만 갱신 (색인이 아직 없으면 생략)"""
+    if index is None:
+        index = get_duplicate_index()
+    with _dedup_lock:
+        if index["built"]:
+            _add(index, question)
+
+
+def remove_question(question_id, index=None):
+    if index is None:
+        index = get_duplicate_index()
+    with _dedup_lock:
+        _remove(index, str(question_id))
+
+
+def find_duplicates(question, threshold=DUPLICATE_THRESHOLD, index=None):
+    """
+    색인에 있는 문제 중 question과 비슷한 것 [(id, 유사도, 문제)] (유사도 높은 순).
+    question에 id가 있으면 자기 자신은 제외
+    """
+    if index is None:
+        index = get_duplicate_index()
+    hashes = shingles(question)
+    keys = _band_keys(minhash(hashes))
+    exclude = str(question.get('id', '')) or None
+    matches = []
+    with _dedup_lock:
+        for question_id in _candidates(index, keys, exclude):
+            score = jaccard(hashes, index["shingles"][question_id])
+            if score >= threshold:
+                matches.append((question_id, score, index["questions"][question_id]))
+    return sorted(matches, key=lambda m: -m[1])
+
+
+def duplicate_report(threshold=DUPLICATE_THRESHOLD, index=None):
+    """
+    문제 은행 전체의 중복 묶음 (서로 비슷한 문제끼리 연결).
+    반환: [{"ids": [...], "pairs": [(id, id, 유사도)]}] (큰 묶음부터)
+    """
+    if index is None:
+        index = get_duplicate_index()
+    parent = {}
+
+    def find(x):
+        while parent.get(x, x) != x:
+            x = parent[x]
+        return x
+
+    pairs = []
+    with _dedup_lock:
+        for question_id, keys in index["bands"].items():
+            hashes = index["shingles"][question_id]
+            for other in _candidates(index, keys, question_id):
+                if other < question_id:
+                    continue    # 쌍마다 한 번만
+                score = jaccard(hashes, index["shingles"][other])
+                if score >= threshold:
+                    pairs.append((question_id, other, score))
+                    parent[find(other)] = find(question_id)
+
+    groups = {}
+    for a, b, score in pairs:
+        group = groups.setdefault(find(a), {"ids": set(), "pairs": []})
+        group["ids"].update((a, b))
+        group["pairs"].append((a, b, score))
+    report = [{"ids": sorted(g["ids"]), "pairs": sorted(g["pairs"], key=lambda p: -p[2])} for g in groups.values()]
+    return sorted(report, key=lambda g: -len(g["ids"]))
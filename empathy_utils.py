@@ -0,0 +1,199 @@
+"""
+보기별 공감 메시지 사전 생성.
+
+(문제, 선택한 보기, 정답 여부)가 같으면 공감 메시지 입력도 같으므로,
+모든 조합을 미리 생성해 EMPATHY_STORE_PATH(JSON)에 저장하고
+Quiz 페이지는 저장된 메시지를 바로 보여준 뒤 없을 때만 실시간 생성한다.
+
+실행 예:
+    python empathy_utils.py                      # questions 시트 전체 (.streamlit/secrets.toml 사용)
+    python empathy_utils.py --source q.csv       # 시트에서 내보낸 CSV/xlsx
+    python empathy_utils.py --workers 8 --variants 2
+중단 후 다시 실행하면 저장된 항목은 건너뛰고 이어서 생성한다.
+"""
+import argparse
+import json
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from langchain_core.prompts import ChatPromptTemplate
+
+EMPATHY_STORE_PATH = os.getenv("EMPATHY_STORE_PATH", "empathy_messages.json")
+
+EMPATHY_SYSTEM = (
+    "당신은 신경과 전문의입니다. 학습자의 답변을 보고 한국어로 공감하는 말을 두 문장으로 표현해주세요.\n"
+    "정답인 경우: 성취감을 높일 수 있는 공감을 제공해요.\n"
+    "오답인 경우: 격려와 함께 공감을 제공해요."
+)
+
+
+def parse_choices(choices):
+    return [c.strip() for c in str(choices).split(',')]
+
+
+def build_learning_context(question, answer, selected):
+    return f"Question: {question}, Correct Answer: {answer}, Student Answer: {selected}"
+
+
+def empathy_key(question_id, selected, is_correct):
+    return f"{question_id}|{str(selected).strip()}|{'correct' if is_correct else 'wrong'}"
+
+
+def load_empathy_store(path=EMPATHY_STORE_PATH):
+    """저장된 공감 메시지 {key: [메시지, ...]}"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def empathy_store_mtime(path=EMPATHY_STORE_PATH):
+    """저장 파일의 수정 시각 (없으면 0). 다시 생성하면 값이 바뀌므로 캐시 키로 사용"""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def pick_empathy(store, question_id, selected, is_correct):
+    """저장된 메시지 중 하나 (없으면 None)"""
+    variants = store.get(empathy_key(question_id, selected, is_correct))
+    return random.choice(variants) if variants else None
+
+
+def _save_store(store, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(store, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def iter_empathy_jobs(questions):
+    """문제 목록에서 (key, learning_context) 조합 생성"""
+    for q in questions:
+        question_id = q.get('id', '')
+        answer = str(q.get('answer', '')).strip()
+        for choice in parse_choices(q.get('choices', '')):
+            if not choice:
+                continue
+            is_correct = (choice == answer)
+            yield (empathy_key(question_id, choice, is_correct),
+                   build_learning_context(q.get('question', ''), answer, choice))
+
+
+def pregenerate_empathy(questions, chat_model, path=EMPATHY_STORE_PATH, max_workers=4,
+                        variants=1, checkpoint_every=20, on_progress=None):
+    """
+    모든 (문제, 보기) 조합의 공감 메시지를 생성해 path에 저장.
+    이미 variants개 이상 저장된 조합은 건너뜀 (체크포인트에서 재개).
+    chat_model은 LangChain 채팅 모델 (테스트에서는 가짜 모델 사용 가능).
+    반환: {"generated", "skipped", "failed"}
+    """
+    store = load_empathy_store(path)
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", EMPATHY_SYSTEM),
+        ("human", "{learning_context}"),
+    ])
+    chain = prompt | chat_model
+
+    jobs = []
+    skipped = 0
+    for key, learning_context in iter_empathy_jobs(questions):
+        missing = variants - len(store.get(key, []))
+        if missing <= 0:
+            skipped += 1
+            continue
+        jobs.extend([(key, learning_context)] * missing)
+
+    result = {"generated": 0, "skipped": skipped, "failed": 0}
+    if not jobs:
+        return result
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(chain.invoke, {"learning_context": learning_context}): key
+            for key, learning_context in jobs
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                text = future.result().content.strip()
+                store.setdefault(key, []).append(text)
+                result["generated"] += 1
+            except Exception:
+                result["failed"] += 1
+            done += 1
+            if done % checkpoint_every == 0:
+                _save_store(store, path)
+            if on_progress:
+                on_progress(done, len(jobs))
+
+    _save_store(store, path)
+    return result
+
+
+def _load_questions_from_file(path):
+    import pandas as pd
+    if path.lower().endswith(".csv"):
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    else:
+        df = pd.read_excel(path, dtype=str).fillna("")
+    return df.to_dict("records")
+
+
+def _load_questions_from_sheet(secrets):
+    import gspread
+    from google.oauth2.service_account import Credentials
+    credentials = Credentials.from_service_account_info(
+        secrets["gcp_service_account"],
+        scopes=["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+    )
+    client = gspread.authorize(credentials)
+    spreadsheet = client.open_by_url(secrets["google_sheets"]["spreadsheet_url"])
+    return spreadsheet.worksheet("questions").get_all_records()
+
+
+def main():
+    import tomllib
+    from langchain_openai import ChatOpenAI
+
+    parser = argparse.ArgumentParser(description="보기별 공감 메시지 사전 생성")
+    parser.add_argument("--source", help="questions 시트에서 내보낸 CSV/xlsx (없으면 시트에서 직접 읽음)")
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml")
+    parser.add_argument("--output", default=EMPATHY_STORE_PATH)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--variants", type=int, default=1)
+    args = parser.parse_args()
+
+    with open(args.secrets, "rb") as f:
+        secrets = tomllib.load(f)
+
+    if args.source:
+        questions = _load_questions_from_file(args.source)
+    else:
+        questions = _load_questions_from_sheet(secrets)
+
+    chat_model = ChatOpenAI(
+        model="gpt-4o",
+        temperature=0.9,
+        api_key=secrets["OPENAI_API_KEY"],
+        model_kwargs={"frequency_penalty": 0, "presence_penalty": 0.6},
+    )
+
+    def on_progress(done, total):
+        print(f"\r{done}/{total}", end="", flush=True)
+
+    result = pregenerate_empathy(
+        questions, chat_model, path=args.output,
+        max_workers=args.workers, variants=args.variants, on_progress=on_progress
+    )
+    print(f"\n생성 {result['generated']} · 건너뜀 {result['skipped']} · 실패 {result['failed']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+부하 테스트용 가짜 채팅 모델 (API 호출 없음).
+
+지연 시간과 오류/ rate limit 비율을 설정할 수 있어, 게이트웨이와 페이지가
+동시 접속 상황에서 어떻게 동작하는지 로컬에서 재현할 수 있다.
+
+앱 전체에서 사용하려면 환경 변수로 켠다:
+    LLM_FAKE=1 LLM_FAKE_LATENCY=1.5 LLM_FAKE_RATE_LIMIT_RATE=0.1 streamlit run app.py
+"""
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+
+def _split_tokens(text):
+    """공백을 붙인 단어 단위로 나눔 (이어 붙이면 원문 그대로)"""
+    return re.findall(r"\s*\S+\s*", text) or [text]
+
+
+class FakeRateLimitError(Exception):
+    """OpenAI RateLimitError처럼 status_code 429를 가진 오류"""
+    status_code = 429
+
+    def __init__(self, message="Rate limit reached (fake)"):
+        super().__init__(message)
+
+
+class FakeModelError(Exception):
+    status_code = 500
+
+
+class FakeChatModel(BaseChatModel):
+    """마지막 사용자 메시지를 짧게 되풀이하는 가짜 모델"""
+
+    latency: float = 0.5            # 첫 토큰까지 지연 (초)
+    token_delay: float = 0.02       # 토큰 사이 지연 (초)
+    error_rate: float = 0.0         # 일반 오류 비율
+    rate_limit_rate: float = 0.0    # rate limit 오류 비율
+    reply: str = "가짜 응답입니다. 실제 모델 대신 부하 테스트용으로 생성된 문장이에요."
+    seed: Optional[int] = None
+    _random: Any = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _rng(self):
+        if self.seed is None:
+            return random
+        if self._random is None:
+            self._random = random.Random(self.seed)
+        return self._random
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        """첫 토큰까지 기다린 뒤 응답 텍스트 반환 (설정한 비율로 오류 발생)"""
+        time.sleep(self.latency)
+        roll = self._rng().random()
+        if roll < self.rate_limit_rate:
+            raise FakeRateLimitError()
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise FakeModelError("Internal server error (fake)")
+        last = str(messages[-1].content) if messages else ""
+        return f"{self.reply} ({last[:40]})"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        text = self._respond(messages)
+        time.sleep(self.token_delay * len(_split_tokens(text)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for token in _split_tokens(self._respond(messages)):
+            time.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+def fake_model_factory_from_env():
+    """LLM_FAKE가 설정되어 있으면 가짜 모델 생성 함수, 아니면 None"""
+    if not os.getenv("LLM_FAKE"):
+        return None
+    options = {
+        "latency": float(os.getenv("LLM_FAKE_LATENCY", "0.5")),
+        "token_delay": float(os.getenv("LLM_FAKE_TOKEN_DELAY", "0.02")),
+        "error_rate": float(os.getenv("LLM_FAKE_ERROR_RATE", "0")),
+        "rate_limit_rate": float(os.getenv("LLM_FAKE_RATE_LIMIT_RATE", "0")),
+    }
+
+    def factory(temperature=0.3, presence_penalty=0.9, frequency_penalty=0):
+        return FakeChatModel(**options)
+    return factory
+
+
+class ScriptedChatModel(FakeChatModel):
+    """
+    정해진 응답을 순서대로 돌려주는 결정적 가짜 모델 (테스트용).
+    fail_on: 실패시킬 호출 번호(0부터), max_calls: 이 횟수를 넘으면 rate limit 오류 (할당량 흉내)
+    """
+
+    responses: List[str] = ["테스트 응답입니다."]
+    fail_on: List[int] = []
+    max_calls: Optional[int] = None
+    latency: float = 0.0
+    token_delay: float = 0.0
+    _calls: int = PrivateAttr(default=0)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-chat"
+
+    @property
+    def calls(self):
+        return self._calls
+
+    def _next_call(self):
+        with self._lock:
+            index = self._calls
+            self._calls += 1
+        return index
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        index = self._next_call()
+        time.sleep(self.latency)
+        if self.max_calls is not None and index >= self.max_calls:
+            raise FakeRateLimitError("Quota exceeded (scripted)")
+        if index in self.fail_on:
+            raise FakeModelError(f"Scripted failure on call {index}")
+        return self.responses[index % len(self.responses)]
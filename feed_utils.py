@@ -0,0 +1,142 @@
+"""
+시트에 계속 추가되는 목록(컨퍼런스 글, 댓글 등)의 증분 캐시.
+
+처음 한 번 전체를 읽은 뒤에는 마지막으로 알던 행부터 열린 범위(A{n}:…)만 읽어 새 행을 붙인다.
+읽은 첫 행이 마지막으로 알던 행의 id와 다르면 그 사이에 행이 삭제/이동된 것이므로 전체를 다시 읽는다.
+제자리 수정은 tail로는 알 수 없으므로 이 앱에서 쓰는 쪽(관리 페이지)이 invalidate_feed를 불러
+다음 확인 때 전체를 다시 읽게 하고, 시트를 직접 고친 경우에 대비해 FEED_FULL_RELOAD_SECONDS마다도 다시 읽는다.
+캐시는 프로세스 공유이고, 확인은 FEED_POLL_SECONDS에 한 번만 시트에 요청한다.
+"""
+import threading
+import time
+
+import streamlit as st
+
+from sheets_utils import col_letter
+
+FEED_POLL_SECONDS = 30
+FEED_FULL_RELOAD_SECONDS = 300
+
+
+@st.cache_resource
+def get_feed_cache(name, id_field="id"):
+    """
+    name 시트의 증분 캐시.
+    records: 시트 순서, newest: id 내림차순, rows: 알고 있는 데이터 행 수,
+    anchor: 마지막 행의 id, high_water: 가장 큰 id
+    version은 내용이 바뀔 때마다 증가
+    """
+    return {
+        "name": name, "id_field": id_field, "header": [], "records": [], "newest": [],
+        "rows": 0, "anchor": None, "high_water": "", "version": 0, "loaded": 0.0, "checked": 0.0,
+        "stats": {"full": 0, "tail": 0, "appended": 0},
+        "lock": threading.Lock(), "derived": {},
+    }
+
+
+def _record(header, row):
+    row = list(row) + [""] * (len(header) - len(row))   # API는 뒤쪽 빈 셀을 생략함
+    return dict(zip(header, row))
+
+
+def _id(feed, record):
+    return str(record.get(feed["id_field"], ""))
+
+
+def _order(value):
+    # 숫자 id는 숫자로 비교 (자릿수가 달라도 순서가 맞도록)
+    value = str(value or "")
+    return (0, int(value), "") if value.isdigit() else (1, 0, value)
+
+
+def _full_reload(feed, worksheet):
+    values = worksheet.get_all_values()
+    header = values[0] if values else []
+    records = [_record(header, row) for row in values[1:] if any(row)]
+    feed["header"] = header
+    feed["records"] = records
+    feed["newest"] = sorted(records, key=lambda r: _order(_id(feed, r)), reverse=True)
+    feed["rows"] = len(values) - 1 if values else 0
+    feed["anchor"] = str(_record(header, values[-1]).get(feed["id_field"], "")) if len(values) > 1 else None
+    feed["high_water"] = max((_id(feed, r) for r in records), key=_order, default="")
+    feed["loaded"] = time.time()
+    feed["version"] += 1
+    feed["stats"]["full"] += 1
+
+
+def _read_tail(feed, worksheet):
+    """
+    마지막으로 알던 행부터 끝까지 1회 읽기.
+    반환: 새 행 목록, 또는 그 사이 행이 지워져 기준 행이 맞지 않으면 None
+    """
+    last_col = col_letter(max(1, len(feed["header"])))
+    if feed["rows"] == 0:
+        return list(worksheet.get(f"A2:{last_col}"))
+    values = list(worksheet.get(f"A{feed['rows'] + 1}:{last_col}"))
+    if not values or str(_record(feed["header"], values[0]).get(feed["id_field"], "")) != feed["anchor"]:
+        return None
+    return values[1:]
+
+
+def sync_feed(feed, open_sheet, min_interval=FEED_POLL_SECONDS, full=False):
+    """
+    새로 추가된 행만 읽어 캐시에 합침 (min_interval 안에 다시 부르면 시트에 요청하지 않음).
+    open_sheet()는 실제로 읽을 때만 호출. 반환: 새로 합친 레코드 목록
+    """
+    with feed["lock"]:
+        now = time.time()
+        if not full and now - feed["checked"] < min_interval:
+            return []
+        feed["checked"] = now
+        worksheet = open_sheet()
+        if full or not feed["header"] or now - feed["loaded"] > FEED_FULL_RELOAD_SECONDS:
+            _full_reload(feed, worksheet)
+            return []
+
+        tail = _read_tail(feed, worksheet)
+        feed["stats"]["tail"] += 1
+        if tail is None:
+            _full_reload(feed, worksheet)
+            return []
+        feed["rows"] += len(tail)
+        if tail:
+            feed["anchor"] = str(_record(feed["header"], tail[-1]).get(feed["id_field"], ""))
+        # 기준 행 뒤의 행은 모두 새 행 (id는 초 단위라 같은 초에 쓴 행도 있으므로 id로 거르지 않음)
+        new = [r for r in (_record(feed["header"], row) for row in tail) if any(r.values())]
+        if new:
+            feed["records"] = feed["records"] + new
+            feed["newest"] = sorted(feed["newest"] + new, key=lambda r: _order(_id(feed, r)), reverse=True)
+            feed["high_water"] = max([feed["high_water"]] + [_id(feed, r) for r in new], key=_order)
+            feed["version"] += 1
+            feed["stats"]["appended"] += len(new)
+        return new
+
+
+def invalidate_feed(feed):
+    """시트를 고친 뒤 호출: 다음 sync_feed에서 (간격과 관계없이) 전체를 다시 읽음"""
+    with feed["lock"]:
+        feed["loaded"] = 0.0
+        feed["checked"] = 0.0
+
+
+def count_since(feed, high_water):
+    """high_water보다 나중 id의 레코드 수 (newest가 id 내림차순이라 앞에서부터 셈)"""
+    count = 0
+    mark = _order(high_water)
+    for record in feed["newest"]:
+        if _order(_id(feed, record)) <= mark:
+            break
+        count += 1
+    return count
+
+
+def group_by(feed, field):
+    """field 값 -> 레코드 목록 (버전이 바뀔 때만 다시 만듦)"""
+    cached = feed["derived"].get(field)
+    if cached and cached[0] == feed["version"]:
+        return cached[1]
+    groups = {}
+    for record in feed["records"]:
+        groups.setdefault(str(record.get(field, "")), []).append(record)
+    feed["derived"][field] = (feed["version"], groups)
+    return groups
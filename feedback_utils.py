@@ -0,0 +1,178 @@
+"""
+비어 있는 보기별 피드백(feedback_1..5) AI 초안 일괄 작성.
+
+문제마다 비어 있는 피드백만 한 번의 호출로 작성해 FEEDBACK_DRAFTS_PATH(JSON)에 체크포인트로 저장하고,
+관리자가 검토/수정해 승인한 초안만 questions 시트에 batch_update 한 번으로 기록한다.
+중단 후 다시 실행하면 이미 초안이 있는 문제는 건너뛴다.
+"""
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from empathy_utils import parse_choices
+from sheets_utils import col_letter
+
+FEEDBACK_DRAFTS_PATH = os.getenv("FEEDBACK_DRAFTS_PATH", "feedback_drafts.json")
+FEEDBACK_FIELDS = [f"feedback_{i}" for i in range(1, 6)]
+
+FEEDBACK_DRAFT_SYSTEM = (
+    "당신은 신경과 전문의입니다. 객관식 문제의 보기별 해설을 한국어로 작성해주세요.\n"
+    "각 보기를 골랐을 때 보여줄 해설을 2~3문장으로, 정답이면 왜 맞는지, 오답이면 왜 틀렸고 무엇과 헷갈리기 쉬운지 설명해요.\n"
+    "요청한 항목만 JSON 객체로 답해주세요. 예: {{\"feedback_2\": \"...\", \"feedback_4\": \"...\"}}"
+)
+
+_JSON_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def missing_feedback_fields(question):
+    """보기는 있는데 피드백이 비어 있는 필드 목록"""
+    choices = [c for c in parse_choices(question.get('choices', '')) if c]
+    return [
+        FEEDBACK_FIELDS[i] for i in range(min(len(choices), len(FEEDBACK_FIELDS)))
+        if not str(question.get(FEEDBACK_FIELDS[i], '') or '').strip()
+    ]
+
+
+def find_missing_feedback(questions):
+    """피드백이 하나라도 빠진 문제 [(문제, 빠진 필드 목록)]"""
+    result = []
+    for q in questions:
+        fields = missing_feedback_fields(q)
+        if fields:
+            result.append((q, fields))
+    return result
+
+
+def build_draft_request(question, fields):
+    choices = [c for c in parse_choices(question.get('choices', '')) if c]
+    lines = [
+        f"문제: {question.get('question', '')}",
+        f"정답: {question.get('answer', '')}",
+        "보기:",
+    ]
+    lines += [f"  {FEEDBACK_FIELDS[i]}: {choice}" for i, choice in enumerate(choices[:len(FEEDBACK_FIELDS)])]
+    lines.append(f"작성할 항목: {', '.join(fields)}")
+    return "\n".join(lines)
+
+
+def parse_draft(text, fields):
+    """모델 응답(JSON)에서 요청한 필드만 추출"""
+    match = _JSON_RE.search(str(text))
+    if not match:
+        raise ValueError("JSON 응답이 아닙니다")
+    data = json.loads(match.group(0))
+    drafts = {f: str(data.get(f, '')).strip() for f in fields}
+    drafts = {f: v for f, v in drafts.items() if v}
+    if not drafts:
+        raise ValueError("작성된 항목이 없습니다")
+    return drafts
+
+
+def load_drafts(path=FEEDBACK_DRAFTS_PATH):
+    """검토 대기 중인 초안 {question_id: {"question", "fields": {필드: 초안}, "created"}}"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_drafts(drafts, path=FEEDBACK_DRAFTS_PATH):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(drafts, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def get_draft_chain(chat_model):
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", FEEDBACK_DRAFT_SYSTEM),
+        ("human", "{request}"),
+    ])
+    return prompt | chat_model
+
+
+def draft_missing_feedback(questions, chain, path=FEEDBACK_DRAFTS_PATH, max_workers=4,
+                           checkpoint_every=10, on_progress=None, invoke=None):
+    """
+    피드백이 빠진 문제마다 초안을 생성해 path에 저장 (이미 초안이 있는 문제는 건너뜀).
+    invoke(fn)을 넘기면 모델 호출을 감쌈 (게이트웨이 대기열 등).
+    반환: {"drafted", "skipped", "failed"}
+    """
+    drafts = load_drafts(path)
+    jobs = []
+    skipped = 0
+    for q, fields in find_missing_feedback(questions):
+        if str(q.get('id', '')) in drafts:
+            skipped += 1
+            continue
+        jobs.append((q, fields))
+
+    result = {"drafted": 0, "skipped": skipped, "failed": 0}
+    if not jobs:
+        return result
+
+    def run(q, fields):
+        call = lambda: chain.invoke({"request": build_draft_request(q, fields)})
+        response = invoke(call) if invoke else call()
+        return parse_draft(response.content, fields)
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run, q, fields): q for q, fields in jobs}
+        for future in as_completed(futures):
+            q = futures[future]
+            try:
+                drafts[str(q.get('id', ''))] = {
+                    "question": str(q.get('question', '')),
+                    "fields": future.result(),
+                    "created": datetime.now().strftime("%Y-%m-%d %H:%M"),
+                }
+                result["drafted"] += 1
+            except Exception:
+                result["failed"] += 1
+            done += 1
+            if done % checkpoint_every == 0:
+                save_drafts(drafts, path)
+            if on_progress:
+                on_progress(done, len(jobs))
+
+    save_drafts(drafts, path)
+    return result
+
+
+def build_feedback_updates(all_values, approved):
+    """
+    시트 전체 값(get_all_values)과 승인된 초안 {question_id: {필드: 값}}으로 batch_update 데이터 생성.
+    시트에서 여전히 비어 있는 셀만 채움 (그 사이 사람이 작성한 피드백은 덮어쓰지 않음).
+    반환: (batch_update 데이터, {한 칸 이상 기록된 question_id: {기록한 필드: 값}})
+    """
+    if not all_values:
+        return [], {}
+    header = all_values[0]
+    columns = {name: i for i, name in enumerate(header)}
+    data, written = [], {}
+    for row_idx, row in enumerate(all_values[1:], start=2):
+        question_id = str(row[0]) if row else ""
+        fields = approved.get(question_id)
+        if not fields:
+            continue
+        cells = {}
+        for field, value in fields.items():
+            col = columns.get(field)
+            if col is None or not value:
+                continue
+            current = row[col] if col < len(row) else ""
+            if str(current).strip():
+                continue
+            data.append({"range": f"{col_letter(col + 1)}{row_idx}", "values": [[value]]})
+            cells[field] = value
+        if cells:
+            written[question_id] = cells
+    return data, written
@@ -0,0 +1,336 @@
+"""
+LLM 호출 게이트웨이.
+
+한 API 키를 모든 사용자가 공유하므로, 수업 중 동시에 제출이 몰리면 rate limit 오류가 연쇄로 난다.
+게이트웨이는 프로세스 전체의 동시 호출 수를 LLM_MAX_CONCURRENT로 제한하고,
+대기 중인 호출은 사용자별 큐에서 번갈아(라운드 로빈) 꺼내 한 사람이 슬롯을 독차지하지 못하게 한다.
+rate limit 오류는 지수 백오프(+Retry-After)로 재시도하고, 그동안 다른 호출도 잠시 멈춘다.
+
+부하 테스트 예 (가짜 모델 사용, API 호출 없음):
+    python gateway_utils.py --users 40 --requests 3 --concurrency 6 --latency 1.5 --rate-limit-rate 0.1
+"""
+import argparse
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError
+import streamlit as st
+
+# 게이트웨이 설정
+LLM_MAX_CONCURRENT = 6        # 동시에 진행되는 LLM 호출 수
+LLM_MAX_RETRIES = 4           # rate limit 재시도 횟수
+LLM_BACKOFF_BASE = 1.0        # 초, 시도마다 2배
+LLM_BACKOFF_MAX = 20.0
+
+
+def is_rate_limit_error(error):
+    """OpenAI RateLimitError / HTTP 429 / 가짜 모델의 rate limit 오류"""
+    if getattr(error, "status_code", None) == 429:
+        return True
+    if type(error).__name__ == "RateLimitError":
+        return True
+    return "rate limit" in str(error).lower()
+
+
+def _retry_after(error):
+    """응답 헤더의 Retry-After (초), 없으면 None"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class Ticket:
+    """대기열의 호출 1건"""
+
+    def __init__(self, user):
+        self.user = user
+        self.created = time.perf_counter()
+        self.granted_at = None
+        self.cancelled = False
+        self.retries = 0
+
+    @property
+    def granted(self):
+        return self.granted_at is not None
+
+    @property
+    def wait_time(self):
+        end = self.granted_at if self.granted else time.perf_counter()
+        return end - self.created
+
+
+class LLMGateway:
+    """동시 호출 제한 + 사용자별 공정 대기열 + rate limit 백오프"""
+
+    def __init__(self, max_concurrent=LLM_MAX_CONCURRENT, max_retries=LLM_MAX_RETRIES,
+                 backoff_base=LLM_BACKOFF_BASE, backoff_max=LLM_BACKOFF_MAX):
+        self.max_concurrent = max_concurrent
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()   # user -> deque[Ticket], 앞쪽 사용자가 다음 차례
+        self._active = 0
+        self._cooldown_until = 0.0     # rate limit 후 이 시각까지 새 호출 보류
+        self.stats = {"calls": 0, "rate_limited": 0, "retries": 0, "failed": 0, "max_queue": 0}
+
+    # ---------- 대기열 ----------
+    def enqueue(self, user):
+        """호출 대기열에 등록 (바로 슬롯이 있으면 즉시 배정)"""
+        ticket = Ticket(str(user or "anonymous"))
+        with self._cond:
+            self._queues.setdefault(ticket.user, deque()).append(ticket)
+            self.stats["max_queue"] = max(self.stats["max_queue"], self._waiting())
+            self._dispatch()
+        return ticket
+
+    def _waiting(self):
+        return sum(len(q) for q in self._queues.values())
+
+    def _dispatch(self):
+        # self._cond를 잡은 상태에서 호출
+        if time.monotonic() < self._cooldown_until:
+            return
+        granted = False
+        while self._active < self.max_concurrent and self._queues:
+            user, queue = next(iter(self._queues.items()))
+            ticket = queue.popleft()
+            if queue:
+                self._queues.move_to_end(user)
+            else:
+                del self._queues[user]
+            ticket.granted_at = time.perf_counter()
+            self._active += 1
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def position(self, ticket):
+        """앞에 대기 중인 호출 수 (0이면 다음 차례, 슬롯을 받았으면 None)"""
+        with self._cond:
+            if ticket.granted or ticket.cancelled:
+                return None
+            queue = self._queues.get(ticket.user)
+            if not queue or ticket not in queue:
+                return None
+            k = queue.index(ticket)
+            users = list(self._queues)
+            turn = users.index(ticket.user)
+            # 라운드 로빈: 앞 순서 사용자는 k+1건, 뒷 순서 사용자는 k건까지 먼저 처리됨
+            ahead = k
+            for i, user in enumerate(users):
+                if user != ticket.user:
+                    ahead += min(len(self._queues[user]), k + 1 if i < turn else k)
+            return ahead
+
+    def wait(self, ticket, on_wait=None, poll=0.5):
+        """
+        슬롯을 받을 때까지 대기. on_wait(앞 대기 수)는 대기 중 poll초마다 호출
+        (호출한 스레드에서 실행되므로 화면 갱신에 사용 가능).
+        대기 중 취소되면 CancelledError
+        """
+        while True:
+            with self._cond:
+                if ticket.cancelled:
+                    raise CancelledError()
+                if ticket.granted:
+                    return ticket
+                self._dispatch()
+                if not ticket.granted:
+                    self._cond.wait(timeout=poll)
+            if on_wait is not None and not ticket.granted:
+                ahead = self.position(ticket)
+                if ahead is not None:
+                    on_wait(ahead)
+
+    def release(self, ticket):
+        with self._cond:
+            if ticket.granted and not ticket.cancelled:
+                ticket.cancelled = True   # 두 번 반환되지 않도록
+                self._active -= 1
+                self._dispatch()
+
+    def cancel(self, ticket):
+        """대기 중이면 대기열에서 제거, 진행 중이면 슬롯 반환"""
+        with self._cond:
+            if ticket.cancelled:
+                return
+            if not ticket.granted:
+                queue = self._queues.get(ticket.user)
+                if queue and ticket in queue:
+                    queue.remove(ticket)
+                    if not queue:
+                        del self._queues[ticket.user]
+                ticket.cancelled = True
+                self._cond.notify_all()
+                return
+        self.release(ticket)
+
+    # ---------- rate limit ----------
+    def _backoff(self, ticket, error):
+        """rate limit이면 대기 시간(초), 재시도하지 않을 오류면 None"""
+        if not is_rate_limit_error(error):
+            return None
+        with self._cond:
+            self.stats["rate_limited"] += 1
+            if ticket.retries >= self.max_retries:
+                return None
+            ticket.retries += 1
+            self.stats["retries"] += 1
+            delay = _retry_after(error)
+            if delay is None:
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (ticket.retries - 1))
+                delay *= random.uniform(0.5, 1.0)
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+        return delay
+
+    def invoke(self, ticket, fn):
+        """슬롯을 받은 ticket으로 fn() 실행 (rate limit이면 백오프 후 재시도)"""
+        while True:
+            try:
+                result = fn()
+                with self._cond:
+                    self.stats["calls"] += 1
+                return result
+            except Exception as e:
+                delay = self._backoff(ticket, e)
+                if delay is None:
+                    with self._cond:
+                        self.stats["failed"] += 1
+                    raise
+                time.sleep(delay)
+
+    def stream(self, ticket, make_stream):
+        """
+        슬롯을 받은 ticket으로 make_stream()의 청크를 그대로 내보냄.
+        첫 청크 전에 rate limit이 나면 재시도 (이미 출력한 뒤에는 재시도하지 않음)
+        """
+        while True:
+            started = False
+            try:
+                for chunk in make_stream():
+                    started = True
+                    yield chunk
+                with self._cond:
+                    self.stats["calls"] += 1
+                return
+            except Exception as e:
+                delay = None if started else self._backoff(ticket, e)
+                if delay is None:
+                    with self._cond:
+                        self.stats["failed"] += 1
+                    raise
+                time.sleep(delay)
+
+    def call(self, user, fn, on_wait=None):
+        """대기열 등록 -> 대기 -> 실행 -> 반환을 한 번에"""
+        ticket = self.enqueue(user)
+        try:
+            self.wait(ticket, on_wait=on_wait)
+            return self.invoke(ticket, fn)
+        finally:
+            self.cancel(ticket)
+
+    def snapshot(self):
+        """현재 진행/대기 현황"""
+        with self._cond:
+            return {
+                "active": self._active,
+                "waiting": self._waiting(),
+                "users_waiting": len(self._queues),
+                "cooldown": max(0.0, round(self._cooldown_until - time.monotonic(), 1)),
+                **self.stats,
+            }
+
+
+@st.cache_resource
+def get_llm_gateway():
+    """프로세스 공유 게이트웨이"""
+    return LLMGateway()
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def run_load_test(gateway, chat_model, users=20, requests_per_user=3, think_time=0.0):
+    """
+    users명이 동시에 requests_per_user번씩 호출하는 상황을 재현.
+    반환: {"ok", "failed", "wait_p50", "wait_p95", "total_p50", "total_p95", "elapsed", "gateway"}
+    """
+    waits, totals = [], []
+    result = {"ok": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def user_session(user):
+        for i in range(requests_per_user):
+            start = time.perf_counter()
+            ticket = gateway.enqueue(user)
+            try:
+                gateway.wait(ticket)
+                gateway.invoke(ticket, lambda: chat_model.invoke(f"{user} 질문 {i}"))
+                outcome = "ok"
+            except Exception:
+                outcome = "failed"
+            finally:
+                gateway.cancel(ticket)
+            with lock:
+                waits.append(ticket.wait_time)
+                totals.append(time.perf_counter() - start)
+                result[outcome] += 1
+            if think_time:
+                time.sleep(think_time)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user_session, args=(f"user{u}",)) for u in range(users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    result.update(
+        wait_p50=round(_percentile(waits, 50), 3),
+        wait_p95=round(_percentile(waits, 95), 3),
+        total_p50=round(_percentile(totals, 50), 3),
+        total_p95=round(_percentile(totals, 95), 3),
+        elapsed=round(time.perf_counter() - start, 3),
+        gateway=gateway.snapshot(),
+    )
+    return result
+
+
+def main():
+    from fake_llm import FakeChatModel
+
+    parser = argparse.ArgumentParser(description="LLM 게이트웨이 부하 테스트 (가짜 모델)")
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--requests", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=LLM_MAX_CONCURRENT)
+    parser.add_argument("--latency", type=float, default=1.0, help="첫 토큰까지 지연 (초)")
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--backoff", type=float, default=LLM_BACKOFF_BASE)
+    args = parser.parse_args()
+
+    gateway = LLMGateway(max_concurrent=args.concurrency, backoff_base=args.backoff)
+    model = FakeChatModel(
+        latency=args.latency, token_delay=args.token_delay,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+    )
+    result = run_load_test(gateway, model, users=args.users, requests_per_user=args.requests)
+    print(f"성공 {result['ok']} · 실패 {result['failed']} · 전체 {result['elapsed']}초")
+    print(f"대기 p50 {result['wait_p50']}초 · p95 {result['wait_p95']}초")
+    print(f"응답 p50 {result['total_p50']}초 · p95 {result['total_p95']}초")
+    print(f"게이트웨이 {result['gateway']}")
+
+
+if __name__ == "__main__":
+    main()
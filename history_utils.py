@@ -0,0 +1,128 @@
+from functools import lru_cache
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import SystemMessage
+
+# 대화 기록 토큰 예산 (요약 포함, 호출마다 모델에 보내는 기록의 최대 크기)
+HISTORY_TOKEN_BUDGET = 1500
+HISTORY_MIN_MESSAGES = 2        # 예산을 넘더라도 최근 메시지는 이만큼 유지
+SUMMARY_PREFIX = "이전 대화 요약:\n"
+
+
+@lru_cache(maxsize=1)
+def _get_encoder():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def count_text_tokens(text):
+    """문자열의 대략적인 토큰 수 (tiktoken이 없으면 글자 수로 추정)"""
+    encoder = _get_encoder()
+    return len(encoder.encode(text)) if encoder else len(text) // 2
+
+
+def count_tokens(messages):
+    """메시지 목록의 대략적인 토큰 수"""
+    total = 0
+    for m in messages:
+        text = m.content if isinstance(m.content, str) else str(m.content)
+        total += 4 + count_text_tokens(text)
+    return total
+
+
+class WindowedChatHistory(BaseChatMessageHistory):
+    """
+    토큰 예산을 지키는 대화 기록.
+    최근 메시지는 예산 안에서 그대로 유지하고, 밀려난 메시지는 summarize로 요약해 앞에 붙임.
+    summarize(이전 요약, 메시지 목록) -> 새 요약 은 executor가 있으면 백그라운드에서 실행
+    (요약이 끝나기 전에는 밀려난 메시지를 빼고 보냄).
+    on_prompt(전체 토큰, 실제로 보낸 토큰)은 prompt_messages로 프롬프트를 만들 때만 호출됨
+    (messages는 부수 효과 없이 읽기만 함)
+    """
+
+    def __init__(self, token_budget=HISTORY_TOKEN_BUDGET, summarize=None, executor=None, on_prompt=None):
+        self.token_budget = token_budget
+        self.summarize = summarize
+        self.executor = executor
+        self.on_prompt = on_prompt
+        self.summary = ""
+        self.total_tokens = 0       # 지금까지 추가된 모든 메시지의 토큰 수
+        self._messages = []         # 아직 요약되지 않은 최근 메시지
+        self._pending = []          # 요약 대기 중인 메시지
+        self._summary_future = None
+
+    @property
+    def messages(self):
+        self._adopt_summary()
+        result = list(self._messages)
+        if self.summary:
+            result.insert(0, SystemMessage(SUMMARY_PREFIX + self.summary))
+        return result
+
+    def prompt_messages(self):
+        """이번 호출에 보낼 기록 (모델 호출 1회당 한 번 불러 on_prompt로 기록 창 크기를 남김)"""
+        result = self.messages
+        if self.on_prompt:
+            self.on_prompt(self.total_tokens, count_tokens(result))
+        return result
+
+    def add_messages(self, messages):
+        messages = list(messages)
+        self._messages.extend(messages)
+        self.total_tokens += count_tokens(messages)
+        self._compact()
+
+    def clear(self):
+        self.summary = ""
+        self.total_tokens = 0
+        self._messages = []
+        self._pending = []
+        self._summary_future = None
+
+    def _compact(self):
+        budget = self.token_budget
+        if self.summary:
+            budget -= count_tokens([SystemMessage(SUMMARY_PREFIX + self.summary)])
+        kept_tokens = 0
+        cut = len(self._messages)
+        for i in range(len(self._messages) - 1, -1, -1):
+            tokens = count_tokens([self._messages[i]])
+            if kept_tokens + tokens > budget and len(self._messages) - i > HISTORY_MIN_MESSAGES:
+                break
+            kept_tokens += tokens
+            cut = i
+        if cut == 0:
+            return
+        self._pending.extend(self._messages[:cut])
+        self._messages = self._messages[cut:]
+        self._start_summary()
+
+    def _start_summary(self):
+        if self.summarize is None:
+            self._pending = []
+            return
+        if self._summary_future is not None:
+            return  # 진행 중인 요약이 끝나면 이어서 처리
+        pending, self._pending = self._pending, []
+        if self.executor is None:
+            try:
+                self.summary = self.summarize(self.summary, pending)
+            except Exception:
+                pass
+            return
+        self._summary_future = self.executor.submit(self.summarize, self.summary, pending)
+
+    def _adopt_summary(self):
+        future = self._summary_future
+        if future is None or not future.done():
+            return
+        self._summary_future = None
+        try:
+            self.summary = future.result()
+        except Exception:
+            pass
+        if self._pending:
+            self._start_summary()
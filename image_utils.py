@@ -0,0 +1,314 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+from datetime import datetime
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image, ImageOps
+import streamlit as st
+
+# imgBB 업로드 설정
+IMGBB_UPLOAD_URL = "https://api.imgbb.com/1/upload"
+UPLOAD_WORKERS = 4
+UPLOAD_RETRIES = 2
+UPLOAD_TIMEOUT = 30
+
+# 업로드 전 이미지 전처리 설정
+IMAGE_MAX_EDGE = 2048       # 긴 변 최대 픽셀
+IMAGE_QUALITY = 85          # JPEG 기본 품질
+IMAGE_MIN_QUALITY = 50      # 목표 용량을 맞출 때 내려갈 수 있는 최저 품질
+IMAGE_TARGET_BYTES = None   # 목표 용량 (None이면 품질만 적용)
+
+# 업로드 중복 제거 레지스트리 (SHA-256 -> URL, 로컬 파일에 저장)
+UPLOAD_REGISTRY_PATH = os.getenv("UPLOAD_REGISTRY_PATH", ".upload_registry.json")
+_registry_lock = threading.Lock()
+
+
+@st.cache_resource
+def get_upload_session():
+    """업로드용 requests.Session (프로세스 단위로 커넥션 재사용)"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=UPLOAD_WORKERS, pool_maxsize=UPLOAD_WORKERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_imgbb_api_key():
+    return st.secrets.get("imgbb", {}).get("api_key", "")
+
+
+def _file_size(image_file):
+    size = getattr(image_file, 'size', None)
+    if size is None:
+        image_file.seek(0, os.SEEK_END)
+        size = image_file.tell()
+    image_file.seek(0)
+    return size
+
+
+def _encode(img, fmt, quality):
+    buffer = io.BytesIO()
+    if fmt == "JPEG":
+        img.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        img.save(buffer, format="PNG", optimize=True)
+    return buffer
+
+
+def preprocess_image(image_file, max_edge=IMAGE_MAX_EDGE, quality=IMAGE_QUALITY,
+                     target_bytes=IMAGE_TARGET_BYTES):
+    """
+    업로드 전 이미지 전처리: EXIF 제거, 긴 변 축소, 재압축.
+    반환: (name, 파일 객체, 원본 바이트 수, 처리 후 바이트 수)
+    GIF(애니메이션)나 열 수 없는 파일은 원본 그대로 반환
+    """
+    name = getattr(image_file, 'name', 'image')
+    original_size = _file_size(image_file)
+
+    try:
+        img = Image.open(image_file)
+        fmt = img.format
+        if fmt not in ("JPEG", "PNG", "MPO"):
+            image_file.seek(0)
+            return name, image_file, original_size, original_size
+
+        # 회전 정보는 픽셀에 반영한 뒤 EXIF는 버림
+        img = ImageOps.exif_transpose(img)
+        if max(img.size) > max_edge:
+            img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+        if fmt == "PNG" and img.mode in ("RGBA", "LA", "P"):
+            out_fmt = "PNG"
+        else:
+            out_fmt = "JPEG"
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+
+        buffer = _encode(img, out_fmt, quality)
+        # 목표 용량이 있으면 품질 -> 크기 순으로 낮춤
+        q = quality
+        while target_bytes and buffer.tell() > target_bytes:
+            if out_fmt == "JPEG" and q > IMAGE_MIN_QUALITY:
+                q = max(IMAGE_MIN_QUALITY, q - 10)
+            elif min(img.size) > 256:
+                img = img.resize((int(img.width * 0.8), int(img.height * 0.8)), Image.LANCZOS)
+            else:
+                break
+            buffer = _encode(img, out_fmt, q)
+        img.close()
+    except Exception:
+        image_file.seek(0)
+        return name, image_file, original_size, original_size
+
+    processed_size = buffer.tell()
+    # 재압축 결과가 원본보다 10% 이상 크면 원본 사용 (그 이하는 EXIF 제거를 위해 처리본 유지)
+    if not target_bytes and processed_size > original_size * 1.1:
+        image_file.seek(0)
+        return name, image_file, original_size, original_size
+
+    if out_fmt == "JPEG":
+        name = os.path.splitext(name)[0] + ".jpg"
+    buffer.seek(0)
+    return name, buffer, original_size, processed_size
+
+
+@st.cache_resource
+def get_upload_registry(path=UPLOAD_REGISTRY_PATH):
+    """업로드 레지스트리 로드 (프로세스 단위 1회)"""
+    registry = {"path": path, "entries": {}, "stats": {"uploads_avoided": 0, "bytes_avoided": 0}}
+    if os.path.exists(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+            registry["entries"].update(saved.get("entries", {}))
+            registry["stats"].update(saved.get("stats", {}))
+        except Exception:
+            pass
+    return registry
+
+
+def _save_registry(registry):
+    tmp_path = registry["path"] + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"entries": registry["entries"], "stats": registry["stats"]}, f, ensure_ascii=False)
+    os.replace(tmp_path, registry["path"])
+
+
+def lookup_upload(registry, digest, size):
+    """이미 업로드된 이미지면 URL 반환 (네트워크 호출 없음)"""
+    with _registry_lock:
+        entry = registry["entries"].get(digest)
+        if not entry:
+            return None
+        registry["stats"]["uploads_avoided"] += 1
+        registry["stats"]["bytes_avoided"] += size
+        _save_registry(registry)
+        return entry["url"]
+
+
+def record_upload(registry, digest, url, size):
+    with _registry_lock:
+        registry["entries"][digest] = {
+            "url": url,
+            "bytes": size,
+            "uploaded_at": datetime.now().strftime("%Y-%m-%d %H:%M"),
+        }
+        _save_registry(registry)
+
+
+def get_dedup_report(registry=None):
+    """중복 제거로 절약한 업로드 수/바이트 수"""
+    if registry is None:
+        registry = get_upload_registry()
+    with _registry_lock:
+        return {"registered": len(registry["entries"]), **registry["stats"]}
+
+
+def _sha256(stream):
+    stream.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(1024 * 1024), b""):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def _post_image(session, upload_url, api_key, name, image_stream, timeout):
+    """이미지 1개 업로드 후 URL 반환 (실패 시 예외)"""
+    # base64 문자열 대신 multipart 바이너리로 전송 (33% 증가 및 추가 복사 방지)
+    image_stream.seek(0)
+    response = session.post(
+        upload_url,
+        data={"key": api_key, "name": os.path.splitext(name)[0]},
+        files={"image": (name, image_stream)},
+        timeout=timeout
+    )
+    if response.status_code != 200:
+        raise RuntimeError(f"HTTP 오류: {response.status_code}")
+    result = response.json()
+    if not result.get('success'):
+        raise RuntimeError(f"업로드 실패: {result.get('error', {}).get('message', '알 수 없는 오류')}")
+    return result['data']['url']
+
+
+def _process_and_upload(session, upload_url, api_key, image_file, timeout, retries, preprocess, registry):
+    if preprocess is not None:
+        name, stream, original_size, processed_size = preprocess_image(image_file, **preprocess)
+    else:
+        name = getattr(image_file, 'name', 'image')
+        original_size = processed_size = _file_size(image_file)
+        stream = image_file
+
+    # 정규화된 이미지의 해시로 중복 확인
+    digest = None
+    if registry is not None:
+        digest = _sha256(stream)
+        url = lookup_upload(registry, digest, processed_size)
+        if url:
+            return url, original_size, processed_size, True
+
+    last_error = None
+    for attempt in range(retries + 1):
+        try:
+            url = _post_image(session, upload_url, api_key, name, stream, timeout)
+            if digest:
+                record_upload(registry, digest, url, processed_size)
+            return url, original_size, processed_size, False
+        except Exception as e:
+            last_error = e
+            if attempt < retries:
+                time.sleep(0.5 * (2 ** attempt))
+    raise last_error
+
+
+def upload_images(image_files, api_key=None, upload_url=IMGBB_UPLOAD_URL, session=None,
+                  max_workers=UPLOAD_WORKERS, retries=UPLOAD_RETRIES, timeout=UPLOAD_TIMEOUT,
+                  on_progress=None, preprocess=True, dedup=True):
+    """
+    여러 이미지를 동시에 업로드.
+    반환: (urls, failures, report)
+      - urls: 입력 순서대로 URL 목록 (실패한 파일은 None)
+      - failures: [(파일 이름, 오류 메시지), ...]
+      - report: {"original_bytes", "uploaded_bytes", "saved_bytes", "dedup_hits", "dedup_bytes"}
+    preprocess: True면 기본 설정으로 전처리, dict면 preprocess_image 인자, False면 원본 전송
+    dedup: True면 기본 레지스트리, dict(get_upload_registry 결과)면 해당 레지스트리, False면 사용 안 함
+    on_progress(완료 개수, 전체 개수)는 호출한 스레드에서 실행되므로 st.progress 갱신에 사용 가능
+    """
+    image_files = list(image_files or [])
+    total = len(image_files)
+    urls = [None] * total
+    failures = []
+    report = {"original_bytes": 0, "uploaded_bytes": 0, "saved_bytes": 0,
+              "dedup_hits": 0, "dedup_bytes": 0}
+    if total == 0:
+        return urls, failures, report
+
+    if api_key is None:
+        api_key = get_imgbb_api_key()
+    if not api_key:
+        failures = [(getattr(f, 'name', ''), "imgBB API 키가 설정되지 않았습니다.") for f in image_files]
+        return urls, failures, report
+
+    if session is None:
+        session = get_upload_session()
+    if preprocess is True:
+        preprocess = {}
+    elif not preprocess:
+        preprocess = None
+    if dedup is True:
+        registry = get_upload_registry()
+    else:
+        registry = dedup or None
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, total))) as executor:
+        futures = {
+            executor.submit(_process_and_upload, session, upload_url, api_key,
+                            image_file, timeout, retries, preprocess, registry): idx
+            for idx, image_file in enumerate(image_files)
+        }
+        for future in as_completed(futures):
+            idx = futures[future]
+            try:
+                urls[idx], original_size, processed_size, deduped = future.result()
+                report["original_bytes"] += original_size
+                if deduped:
+                    report["dedup_hits"] += 1
+                    report["dedup_bytes"] += processed_size
+                else:
+                    report["uploaded_bytes"] += processed_size
+            except Exception as e:
+                failures.append((idx, getattr(image_files[idx], 'name', ''), str(e)))
+            done += 1
+            if on_progress:
+                on_progress(done, total)
+
+    report["saved_bytes"] = report["original_bytes"] - report["uploaded_bytes"] - report["dedup_bytes"]
+    failures.sort()
+    return urls, [(name, message) for _, name, message in failures], report
+
+
+def format_bytes(num_bytes):
+    size = float(num_bytes)
+    for unit in ["B", "KB", "MB"]:
+        if abs(size) < 1024:
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def upload_image_to_imgbb(image_file):
+    """imgBB에 이미지 업로드하고 URL 반환"""
+    urls, failures, report = upload_images([image_file])
+    for name, message in failures:
+        st.error(f"이미지 업로드 오류 ({name}): {message}")
+    if report["dedup_hits"]:
+        st.caption("이미 업로드된 이미지입니다. 기존 URL을 재사용합니다.")
+    elif report["saved_bytes"] > 0:
+        st.caption(f"이미지 최적화: {format_bytes(report['saved_bytes'])} 절약")
+    return urls[0] if urls else None
@@ -0,0 +1,222 @@
+"""
+문제 은행 일괄 가져오기/내보내기 (xlsx, CSV).
+
+가져오기는 파일을 한 행씩 읽으며(openpyxl read-only) 검증하고, 시트에 없는 새 문제만
+append_rows로 묶어 기록한다. 먼저 plan_import로 추가/중복/오류를 확인(dry-run)한 뒤
+write_import로 실행한다. 내보내기도 행 단위로 파일을 만든다.
+"""
+import csv
+import io
+import re
+from datetime import datetime, timedelta
+
+from empathy_utils import parse_choices
+
+QUESTION_COLUMNS = [
+    "id", "category", "question", "choices", "answer",
+    "feedback_1", "feedback_2", "feedback_3", "feedback_4", "feedback_5",
+    "difficulty", "image_url", "video_url", "author", "created_at",
+]
+IMPORT_CHUNK_ROWS = 500      # append_rows 한 번에 보내는 행 수
+
+# 파일 헤더 -> 시트 컬럼 (대소문자/공백 무시)
+_HEADER_ALIASES = {
+    "분과": "category", "문제": "question", "보기": "choices", "정답": "answer", "난이도": "difficulty",
+    "1": "feedback_1", "2": "feedback_2", "3": "feedback_3", "4": "feedback_4", "5": "feedback_5",
+    "image": "image_url", "video": "video_url",
+}
+_DIFFICULTY_WORDS = {"low": 2, "easy": 2, "medium": 3, "mid": 3, "high": 4, "hard": 4}
+
+
+def _normalize_header(name):
+    if isinstance(name, float) and name.is_integer():
+        name = int(name)    # 엑셀 숫자 헤더 (1.0 -> "1")
+    key = re.sub(r"\s+", "_", str("" if name is None else name).strip().lower())
+    return _HEADER_ALIASES.get(key, key)
+
+
+def _normalize_text(text):
+    return re.sub(r"\s+", " ", str(text or "")).strip().lower()
+
+
+def iter_file_rows(file, filename):
+    """업로드 파일에서 {컬럼: 값} 레코드를 한 행씩 (xlsx는 read-only 모드)"""
+    if filename.lower().endswith(".csv"):
+        if hasattr(file, "seek"):
+            file.seek(0)
+        rows = csv.reader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    else:
+        from openpyxl import load_workbook
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+
+    header = None
+    for row in rows:
+        if header is None:
+            header = [_normalize_header(h) for h in row]
+            continue
+        if not any(v not in (None, "") for v in row):
+            continue
+        yield {h: ("" if v is None else v) for h, v in zip(header, row) if h}
+
+
+def validate_question(record, categories, default_category=None):
+    """
+    파일 레코드 1건을 시트 형식으로 변환.
+    반환: (data, errors) - errors가 있으면 data는 None
+    """
+    errors = []
+    question = str(record.get("question", "")).strip()
+    choices = [c for c in parse_choices(record.get("choices", "")) if c]
+    answer = str(record.get("answer", "")).strip()
+
+    category = str(record.get("category", "") or "").strip() or default_category
+    if category not in categories:
+        # "3. 뇌혈관질환"처럼 표시 이름으로 적은 경우
+        by_label = {label: key for key, label in categories.items()}
+        category = by_label.get(category, category)
+
+    if not question:
+        errors.append("문제가 비어 있음")
+    if len(choices) < 2:
+        errors.append("보기가 2개 미만")
+    if len(choices) > 5:
+        errors.append("보기가 5개 초과")
+    if not answer:
+        errors.append("정답이 비어 있음")
+    elif choices and answer not in choices:
+        errors.append(f"정답 '{answer}'이(가) 보기에 없음")
+    if category not in categories:
+        errors.append(f"알 수 없는 분과 '{category or ''}'")
+
+    difficulty = record.get("difficulty", "")
+    if isinstance(difficulty, str) and difficulty.strip().lower() in _DIFFICULTY_WORDS:
+        difficulty = _DIFFICULTY_WORDS[difficulty.strip().lower()]
+    try:
+        difficulty = int(float(difficulty)) if str(difficulty).strip() else 3
+    except ValueError:
+        errors.append(f"난이도 '{difficulty}'을(를) 읽을 수 없음")
+        difficulty = 3
+    if not 1 <= difficulty <= 5:
+        errors.append("난이도는 1~5")
+
+    if errors:
+        return None, errors
+
+    data = {
+        "category": category,
+        "question": question,
+        "choices": ", ".join(choices),
+        "answer": answer,
+        "difficulty": difficulty,
+        "image_url": str(record.get("image_url", "") or ""),
+        "video_url": str(record.get("video_url", "") or ""),
+    }
+    for i in range(1, 6):
+        data[f"feedback_{i}"] = str(record.get(f"feedback_{i}", "") or "")
+    return data, []
+
+
+def plan_import(records, existing_questions, categories, default_category=None, author="윤지환"):
+    """
+    가져오기 계획 (dry-run): 시트에 쓰지 않고 추가될 행/중복/오류를 계산.
+    시트나 파일 앞부분에 같은 문제(공백/대소문자 무시)가 있으면 중복으로 건너뜀.
+    반환: {"rows", "added", "duplicates", "errors", "total", "unknown_columns"}
+    unknown_columns는 시트에 없는 파일 컬럼 (가져오지 않음)
+    """
+    existing_ids = {str(q.get("id", "")) for q in existing_questions}
+    seen = {_normalize_text(q.get("question", "")) for q in existing_questions}
+    now = datetime.now()
+    created_at = now.strftime("%Y-%m-%d %H:%M")
+
+    plan = {"rows": [], "added": [], "duplicates": [], "errors": [], "total": 0, "unknown_columns": []}
+    unknown = set()
+    for line, record in enumerate(records, start=2):
+        plan["total"] += 1
+        unknown.update(k for k in record if k not in QUESTION_COLUMNS)
+        data, errors = validate_question(record, categories, default_category)
+        if errors:
+            plan["errors"].append({"line": line, "question": str(record.get("question", ""))[:60],
+                                   "errors": errors})
+            continue
+        key = _normalize_text(data["question"])
+        if key in seen:
+            plan["duplicates"].append({"line": line, "question": data["question"][:60]})
+            continue
+        seen.add(key)
+
+        plan["added"].append(data)
+        plan["rows"].append([
+            "", data["category"], data["question"], data["choices"], data["answer"],
+            data["feedback_1"], data["feedback_2"], data["feedback_3"], data["feedback_4"], data["feedback_5"],
+            data["difficulty"], data["image_url"], data["video_url"], author, created_at,
+        ])
+    plan["unknown_columns"] = sorted(unknown)
+
+    ids = _import_ids(len(plan["added"]), now, existing_ids)
+    for question_id, data, row in zip(ids, plan["added"], plan["rows"]):
+        data["id"] = row[0] = question_id
+    return plan
+
+
+def _import_ids(count, now, existing_ids):
+    """
+    직접 등록한 문제와 같은 14자리 시각 id를 count개 (파일 순서대로 오름차순).
+    지금부터 1초씩 거슬러 올라가며 이미 있는 id는 건너뜀 (미래 시각을 쓰면 나중에
+    직접 등록하는 문제와 겹치거나 그보다 최신으로 정렬되므로)
+    """
+    ids = []
+    moment = now
+    while len(ids) < count:
+        question_id = moment.strftime("%Y%m%d%H%M%S")
+        if question_id not in existing_ids:
+            ids.append(question_id)
+        moment -= timedelta(seconds=1)
+    return ids[::-1]
+
+
+def write_import(sheet, rows, chunk_rows=IMPORT_CHUNK_ROWS, on_progress=None):
+    """plan_import의 rows를 chunk_rows개씩 append_rows로 기록. 반환: API 호출 수"""
+    calls = 0
+    for start in range(0, len(rows), chunk_rows):
+        chunk = rows[start:start + chunk_rows]
+        sheet.append_rows(chunk, value_input_option="RAW")
+        calls += 1
+        if on_progress:
+            on_progress(start + len(chunk), len(rows))
+    return calls
+
+
+def _export_values(all_values):
+    # 시트 값 그대로 (헤더가 없으면 기본 헤더)
+    if all_values and all_values[0] and all_values[0][0] == "id":
+        return iter(all_values)
+    return iter([QUESTION_COLUMNS, *all_values])
+
+
+def iter_csv_export(all_values):
+    """시트 값(get_all_values)을 CSV 바이트 조각으로 (엑셀에서 한글이 깨지지 않도록 BOM 포함)"""
+    yield "\ufeff".encode("utf-8")
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in _export_values(all_values):
+        writer.writerow(row)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def export_csv(all_values):
+    return b"".join(iter_csv_export(all_values))
+
+
+def export_xlsx(all_values):
+    """시트 값을 xlsx 바이트로 (openpyxl write-only 모드로 행 단위 기록)"""
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet("questions")
+    for row in _export_values(all_values):
+        worksheet.append(list(row))
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
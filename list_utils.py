@@ -0,0 +1,147 @@
+import math
+import pandas as pd
+import streamlit as st
+
+# 관리자 목록 페이지 크기
+LIST_PAGE_SIZES = [10, 20, 50, 100]
+LIST_DEFAULT_PAGE_SIZE = 20
+THUMBNAIL_WIDTH = 96
+
+
+def filter_records(records, query="", fields=(), predicate=None):
+    """검색어(공백으로 나눈 단어가 모두 포함)와 조건으로 거른 목록"""
+    words = [w for w in str(query or "").lower().split() if w]
+    result = []
+    for record in records:
+        if predicate is not None and not predicate(record):
+            continue
+        if words:
+            text = " ".join(str(record.get(f, "") or "") for f in fields).lower()
+            if not all(w in text for w in words):
+                continue
+        result.append(record)
+    return result
+
+
+def sort_records(records, key, reverse=False):
+    """숫자/문자가 섞인 값도 정렬 (숫자 우선)"""
+    def sort_value(record):
+        value = key(record)
+        try:
+            return (0, float(value), "")
+        except (TypeError, ValueError):
+            return (1, 0.0, str(value or ""))
+    return sorted(records, key=sort_value, reverse=reverse)
+
+
+def sort_by_order(df, column="order"):
+    """
+    DataFrame을 순서 열(숫자)로 정렬. 숫자가 아니거나 비어 있으면 뒤로,
+    순서가 같으면 시트 순서 유지 (자료 페이지와 검색 이동이 같은 순서를 쓰도록)
+    """
+    if column not in df.columns:
+        return df
+    return (df.assign(_order=pd.to_numeric(df[column], errors='coerce'))
+              .sort_values('_order', kind='stable', na_position='last')
+              .drop(columns='_order'))
+
+
+def paginate(items, page, page_size):
+    """(현재 페이지 항목, 보정된 페이지 번호(1부터), 전체 페이지 수)"""
+    pages = max(1, math.ceil(len(items) / page_size))
+    page = min(max(1, page), pages)
+    start = (page - 1) * page_size
+    return items[start:start + page_size], page, pages
+
+
+def paged(items, key, filters=()):
+    """
+    페이지 크기 선택 + 이전/다음 버튼을 그리고 현재 페이지 항목만 반환.
+    filters(검색어/정렬 등)가 바뀌면 1페이지로 돌아감
+    """
+    page_key, size_key, filter_key = f"{key}_page", f"{key}_page_size", f"{key}_filters"
+    if st.session_state.get(filter_key) != tuple(filters):
+        st.session_state[filter_key] = tuple(filters)
+        st.session_state[page_key] = 1
+    if size_key not in st.session_state:
+        st.session_state[size_key] = LIST_DEFAULT_PAGE_SIZE
+
+    page_items, page, pages = paginate(items, st.session_state.get(page_key, 1), st.session_state[size_key])
+    st.session_state[page_key] = page
+
+    start = (page - 1) * st.session_state[size_key]
+    col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+    with col1:
+        if items:
+            st.caption(f"총 {len(items)}개 중 {start + 1}–{start + len(page_items)} · {page}/{pages} 페이지")
+        else:
+            st.caption("총 0개")
+    with col2:
+        st.selectbox("페이지 크기", LIST_PAGE_SIZES, key=size_key, label_visibility="collapsed",
+                     format_func=lambda n: f"{n}개씩")
+    with col3:
+        if st.button("◀", key=f"{key}_prev", disabled=page <= 1):
+            st.session_state[page_key] = page - 1
+            st.rerun()
+    with col4:
+        if st.button("▶", key=f"{key}_next", disabled=page >= pages):
+            st.session_state[page_key] = page + 1
+            st.rerun()
+    return page_items
+
+
+def get_selection(key):
+    """선택된 id 집합 (페이지를 넘겨도 유지)"""
+    return st.session_state.setdefault(f"{key}_selected", set())
+
+
+def clear_selection(key):
+    st.session_state[f"{key}_selected"] = set()
+    for name in [k for k in st.session_state if str(k).startswith(f"{key}_sel_")]:
+        del st.session_state[name]
+
+
+def _toggle_selection(key, item_id, widget_key):
+    # 체크박스 on_change: 스크립트가 다시 실행되기 전에 반영 (목록보다 먼저 그리는 도구 모음도 최신 상태)
+    selected = get_selection(key)
+    if st.session_state.get(widget_key):
+        selected.add(item_id)
+    else:
+        selected.discard(item_id)
+
+
+def selection_checkbox(key, item_id, label="선택"):
+    """항목 선택 체크박스"""
+    selected = get_selection(key)
+    item_id = str(item_id)
+    widget_key = f"{key}_sel_{item_id}"
+    if widget_key not in st.session_state:
+        st.session_state[widget_key] = item_id in selected
+    return st.checkbox(label, key=widget_key, label_visibility="collapsed",
+                       on_change=_toggle_selection, args=(key, item_id, widget_key))
+
+
+def select_page(key, page_ids):
+    """현재 페이지 전체 선택/해제 버튼"""
+    selected = get_selection(key)
+    page_ids = [str(i) for i in page_ids]
+    all_selected = bool(page_ids) and all(i in selected for i in page_ids)
+    if st.button("☐ 페이지 선택 해제" if all_selected else "☑ 페이지 전체 선택", key=f"{key}_select_page",
+                 disabled=not page_ids):
+        for i in page_ids:
+            if all_selected:
+                selected.discard(i)
+            else:
+                selected.add(i)
+            st.session_state[f"{key}_sel_{i}"] = not all_selected
+        st.rerun()
+
+
+def thumbnail(url, show):
+    """썸네일 (show가 꺼져 있으면 이미지를 받지 않음)"""
+    if not show or not url:
+        return
+    try:
+        st.image(url, width=THUMBNAIL_WIDTH)
+    except Exception:
+        st.caption("🖼️ 로드 실패")
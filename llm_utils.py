@@ -0,0 +1,469 @@
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+import httpx
+import streamlit as st
+
+from langchain_openai import ChatOpenAI
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables.history import RunnableWithMessageHistory
+from langchain_core.messages import get_buffer_string
+from langchain_core.callbacks import BaseCallbackHandler
+
+from metrics_utils import record_metric, get_metrics_store
+from cache_utils import get_cached_response, put_cached_response
+from history_utils import WindowedChatHistory, count_tokens, count_text_tokens
+from gateway_utils import get_llm_gateway
+from fake_llm import fake_model_factory_from_env
+
+# LLM 공통 설정
+LLM_MODEL = "gpt-4o"
+LLM_TIMEOUT = 60
+LLM_MAX_CONNECTIONS = 20
+LLM_BACKGROUND_WORKERS = 8
+LLM_BACKGROUND_TTL = 600         # 끝난 뒤 이 시간(초) 동안 아무도 가져가지 않은 결과는 버림
+
+# 1M 토큰당 가격 (USD, 입력/출력) - 비용 추정용
+LLM_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+# 테스트 등에서 가짜 모델을 주입할 때 사용 (None이면 ChatOpenAI, LLM_FAKE 환경 변수로도 설정)
+_chat_model_factory = fake_model_factory_from_env()
+
+
+@st.cache_resource
+def get_http_client():
+    """모든 LLM 호출이 공유하는 httpx 커넥션 풀"""
+    return httpx.Client(
+        timeout=LLM_TIMEOUT,
+        limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS,
+                            max_keepalive_connections=LLM_MAX_CONNECTIONS),
+    )
+
+
+def set_chat_model_factory(factory):
+    """
+    채팅 모델 생성 함수 교체 (테스트용).
+    factory(temperature=..., presence_penalty=..., frequency_penalty=...) -> LangChain 채팅 모델
+    None을 넘기면 ChatOpenAI로 복귀
+    """
+    global _chat_model_factory
+    _chat_model_factory = factory
+    get_chat_model.clear()
+    get_prompt_chain.clear()
+    get_history_chain.clear()
+
+
+@st.cache_resource
+def get_chat_model(temperature=0.3, presence_penalty=0.9, frequency_penalty=0):
+    """설정별 채팅 모델 (프로세스당 1회 생성)"""
+    if _chat_model_factory is not None:
+        return _chat_model_factory(
+            temperature=temperature,
+            presence_penalty=presence_penalty,
+            frequency_penalty=frequency_penalty,
+        )
+    return ChatOpenAI(
+        model=LLM_MODEL,
+        temperature=temperature,
+        api_key=st.secrets["OPENAI_API_KEY"],
+        model_kwargs={"frequency_penalty": frequency_penalty, "presence_penalty": presence_penalty},
+        http_client=get_http_client(),
+        stream_usage=True,
+    )
+
+
+# ============ 호출 계측 ============
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """토큰 수로 추정한 비용 (USD, 가격을 모르는 모델은 0)"""
+    price_in, price_out = LLM_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+
+
+def _usage_from_result(response):
+    """LLMResult에서 (입력 토큰, 출력 토큰), 없으면 None"""
+    for generations in response.generations or []:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    return None
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """
+    체인 호출마다 모델 호출 1건을 "llm_call" 지표로 기록하는 콜백.
+    실행 시간, 첫 토큰까지 시간, 입력/출력 토큰, 추정 비용, 세션, 결과를 저장.
+    토큰 사용량이 응답에 없으면 tiktoken으로 추정 (token_source="estimate").
+    워커 스레드에서도 호출되므로 메인 스레드에서 만든 store를 넘겨받아 사용
+    """
+
+    def __init__(self, page, session_id="", store=None, model=LLM_MODEL):
+        self.page = page
+        self.session_id = session_id
+        self.store = store if store is not None else get_metrics_store()
+        self.model = model
+        self._runs = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._runs[run_id] = {
+            "start": time.perf_counter(),
+            "first_token": None,
+            "prompt_tokens": sum(count_tokens(batch) for batch in messages),
+            "text": "",
+        }
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run is None:
+            return
+        if run["first_token"] is None and token:
+            run["first_token"] = time.perf_counter()
+        run["text"] += token
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        usage = _usage_from_result(response)
+        if usage:
+            prompt_tokens, completion_tokens = usage
+            source = "usage"
+        else:
+            text = run["text"] or "".join(
+                g.text for generations in response.generations or [] for g in generations
+            )
+            prompt_tokens, completion_tokens = run["prompt_tokens"], count_text_tokens(text)
+            source = "estimate"
+        self._record(run, "ok", prompt_tokens, completion_tokens, source)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        self._record(run, "error", run["prompt_tokens"], count_text_tokens(run["text"]), "estimate",
+                     error=f"{type(error).__name__}: {str(error)[:200]}")
+
+    def _record(self, run, outcome, prompt_tokens, completion_tokens, source, **extra):
+        end = time.perf_counter()
+        record_metric(
+            "llm_call",
+            store=self.store,
+            page=self.page,
+            session_id=self.session_id,
+            model=self.model,
+            duration=round(end - run["start"], 3),
+            ttft=round(run["first_token"] - run["start"], 3) if run["first_token"] else None,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost=round(estimate_cost(self.model, prompt_tokens, completion_tokens), 6),
+            token_source=source,
+            outcome=outcome,
+            **extra,
+        )
+
+
+SUMMARY_SYSTEM = (
+    "신경과 학습 대화를 요약합니다. 이전 요약과 새 대화를 합쳐 한국어로 5문장 이내로 요약해주세요.\n"
+    "학습자가 무엇을 물었고 어떤 설명을 들었는지 중심으로 정리해요."
+)
+
+
+@st.cache_resource
+def get_summary_chain():
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", SUMMARY_SYSTEM),
+        ("human", "이전 요약:\n{summary}\n\n새 대화:\n{conversation}"),
+    ])
+    return prompt | get_chat_model(temperature=0, presence_penalty=0)
+
+
+def current_user():
+    """게이트웨이 대기열에서 사용할 사용자 (메인 스레드에서 호출)"""
+    return st.session_state.get("user_id") or "anonymous"
+
+
+def _make_summarizer(chain, user, gateway, handler):
+    # 백그라운드 스레드에서 호출되므로 st.* 사용 안 함
+    def summarize(summary, messages):
+        inputs = {
+            "summary": summary or "(없음)",
+            "conversation": get_buffer_string(messages, human_prefix="학습자", ai_prefix="AI"),
+        }
+        return gateway.call(user, lambda: chain.invoke(inputs, config={"callbacks": [handler]})).content
+    return summarize
+
+
+def get_session_history(store_key, session_id) -> WindowedChatHistory:
+    """st.session_state[store_key]에 보관된 세션별 대화 기록 (토큰 예산 + 요약)"""
+    if store_key not in st.session_state:
+        st.session_state[store_key] = {}
+    store = st.session_state[store_key]
+    if session_id not in store:
+        metrics_store = get_metrics_store()
+
+        def on_prompt(full_tokens, sent_tokens):
+            record_metric(
+                "history_window",
+                store=metrics_store,
+                page=store_key,
+                session_id=session_id,
+                history_tokens=full_tokens,
+                sent_tokens=sent_tokens,
+                prompt_tokens_saved=max(0, full_tokens - sent_tokens),
+            )
+
+        store[session_id] = WindowedChatHistory(
+            summarize=_make_summarizer(
+                get_summary_chain(), current_user(), get_llm_gateway(),
+                LLMMetricsHandler(f"{store_key}_summary", session_id, metrics_store),
+            ),
+            executor=get_background_executor(),
+            on_prompt=on_prompt,
+        )
+    return store[session_id]
+
+
+def reset_session_histories(store_key, keep=None):
+    """store_key의 대화 기록 삭제 (keep으로 지정한 세션은 유지)"""
+    store = st.session_state.get(store_key)
+    if not store:
+        return
+    for session_id in [sid for sid in store if sid != keep]:
+        del store[session_id]
+
+
+def _session_history_getter(store_key):
+    # RunnableWithMessageHistory는 호출마다 한 번 불러 기록을 가져옴 (기록 창 지표도 이때 한 번만 남김)
+    def get_history(session_id: str) -> WindowedChatHistory:
+        history = get_session_history(store_key, session_id)
+        history.prompt_messages()
+        return history
+    return get_history
+
+
+@st.cache_resource
+def get_prompt_chain(system_prompt, input_key,
+                     temperature=0.3, presence_penalty=0.9, frequency_penalty=0):
+    """system 프롬프트 + 대화 기록("history") + 사용자 입력 -> 모델 (프로세스당 1회 생성)"""
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", system_prompt),
+        MessagesPlaceholder("history"),
+        ("human", "{" + input_key + "}"),
+    ])
+    return prompt | get_chat_model(temperature, presence_penalty, frequency_penalty)
+
+
+@st.cache_resource
+def get_history_chain(system_prompt, input_key, store_key,
+                      temperature=0.3, presence_penalty=0.9, frequency_penalty=0):
+    """
+    get_prompt_chain에 대화 기록 저장을 붙인 체인 (프로세스당 1회 생성).
+    대화 기록은 호출 시점의 사용자 세션(st.session_state[store_key])에서 읽음
+    """
+    return RunnableWithMessageHistory(
+        get_prompt_chain(system_prompt, input_key, temperature, presence_penalty, frequency_penalty),
+        _session_history_getter(store_key),
+        input_messages_key=input_key,
+        history_messages_key="history",
+    )
+
+
+def stream_chat_response(chain, inputs, session_id, page):
+    """
+    체인 응답을 토큰 단위로 화면에 출력 (st.chat_message 블록 안에서 호출).
+    호출은 게이트웨이 대기열을 거치며, 기다리는 동안 앞의 대기 수를 표시.
+    대화 기록은 스트림이 끝난 뒤 RunnableWithMessageHistory가 저장.
+    반환: (응답 텍스트, 예외) - 도중에 실패하면 그때까지의 텍스트와 예외를 반환
+    """
+    result = {"text": "", "error": None}
+    gateway = get_llm_gateway()
+    status = st.empty()
+
+    def show_position(ahead):
+        status.caption(f"⏳ 요청이 많아 대기 중이에요 · 앞에 {ahead}건")
+
+    def token_stream():
+        start = time.perf_counter()
+        first_token_at = None
+        ticket = gateway.enqueue(current_user())
+        try:
+            gateway.wait(ticket, on_wait=show_position)
+            status.empty()
+            config = {
+                "configurable": {"session_id": session_id},
+                "callbacks": [LLMMetricsHandler(page, session_id)],
+            }
+            make_stream = lambda: chain.stream(inputs, config=config)
+            for chunk in gateway.stream(ticket, make_stream):
+                text = getattr(chunk, "content", chunk)
+                if not text:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                result["text"] += text
+                yield text
+        except Exception as e:
+            result["error"] = e
+        finally:
+            gateway.cancel(ticket)
+            status.empty()
+            end = time.perf_counter()
+            record_metric(
+                "llm_stream",
+                page=page,
+                session_id=session_id,
+                queue_wait=round(ticket.wait_time, 3),
+                retries=ticket.retries,
+                ttft=round(first_token_at - start, 3) if first_token_at else None,
+                duration=round(end - start, 3),
+                chars=len(result["text"]),
+                outcome="error" if result["error"] else "ok",
+                error=f"{type(result['error']).__name__}: {str(result['error'])[:200]}" if result["error"] else None,
+            )
+
+    st.write_stream(token_stream())
+    return result["text"], result["error"]
+
+
+def cached_chat_response(chain, inputs, session_id, page, context_id, question, store_key):
+    """
+    응답 캐시를 먼저 확인하고, 없으면 stream_chat_response로 생성 후 캐시에 저장.
+    캐시 적중 시에도 사용자의 대화 기록(st.session_state[store_key])에 질문/응답을 추가
+    """
+    answer = get_cached_response(context_id, question)
+    if answer:
+        st.markdown(answer)
+        history = get_session_history(store_key, session_id)
+        history.add_user_message(question)
+        history.add_ai_message(answer)
+        record_metric(
+            "llm_call", page=page, session_id=session_id, model=LLM_MODEL, context_id=str(context_id),
+            duration=0.0, ttft=0.0, prompt_tokens=0, completion_tokens=0, cost=0.0,
+            token_source="cache", outcome="cache_hit",
+        )
+        return answer, None
+
+    answer, error = stream_chat_response(chain, inputs, session_id, page)
+    if answer and error is None:
+        put_cached_response(context_id, question, answer)
+    return answer, error
+
+
+# ============ 백그라운드 호출 ============
+@st.cache_resource
+def get_background_executor():
+    """화면을 막지 않는 LLM 호출용 스레드 풀 (프로세스 공유)"""
+    return ThreadPoolExecutor(max_workers=LLM_BACKGROUND_WORKERS, thread_name_prefix="llm-bg")
+
+
+@st.cache_resource
+def get_background_jobs():
+    """작업 키 -> (Future, {"ticket": 게이트웨이 Ticket, "cancelled", "finished": 끝난 시각})"""
+    return {}
+
+
+def _run_chain(chain, inputs, page, session_id, metrics_store, gateway, user, job):
+    # 워커 스레드에서 실행되므로 st.session_state 등에 접근하지 않음.
+    # 대기열 등록은 워커가 시작된 뒤에 해야 슬롯을 받은 작업이 항상 실행 중임
+    start = time.perf_counter()
+    outcome = "error"
+    error = None
+    ticket = job["ticket"] = gateway.enqueue(user)
+    try:
+        if job["cancelled"]:
+            raise CancelledError()
+        gateway.wait(ticket)
+        config = {"callbacks": [LLMMetricsHandler(page, session_id, metrics_store)]}
+        text = gateway.invoke(ticket, lambda: chain.invoke(inputs, config=config)).content
+        outcome = "ok"
+        return text
+    except Exception as e:
+        error = f"{type(e).__name__}: {str(e)[:200]}"
+        raise
+    finally:
+        gateway.cancel(ticket)
+        record_metric(
+            "llm_background",
+            store=metrics_store,
+            page=page,
+            session_id=session_id,
+            queue_wait=round(ticket.wait_time, 3),
+            retries=ticket.retries,
+            duration=round(time.perf_counter() - start, 3),
+            outcome=outcome,
+            error=error,
+        )
+
+
+def submit_chain(key, chain, inputs, history=None, page="", session_id=""):
+    """
+    체인 호출을 백그라운드로 실행. 같은 key의 이전 작업은 취소.
+    history(대화 기록)를 넘기면 현재 메시지를 복사해 "history" 입력으로 사용
+    (기록 저장은 호출하는 쪽에서 처리)
+    """
+    cancel_background(key)
+    _prune_background()
+    inputs = dict(inputs)
+    if history is not None:
+        inputs["history"] = history.prompt_messages()
+    job = {"ticket": None, "cancelled": False, "finished": None}
+    future = get_background_executor().submit(
+        _run_chain, chain, inputs, page, session_id, get_metrics_store(),
+        get_llm_gateway(), current_user(), job
+    )
+    future.add_done_callback(lambda _f: job.update(finished=time.time()))
+    get_background_jobs()[key] = (future, job)
+    return future
+
+
+def _prune_background(ttl=LLM_BACKGROUND_TTL):
+    # 페이지를 떠나 결과를 가져가지 않은 작업 정리 (끝난 지 ttl초가 지난 것만)
+    jobs = get_background_jobs()
+    now = time.time()
+    for key, (_future, job) in list(jobs.items()):
+        if job["finished"] is not None and now - job["finished"] > ttl:
+            jobs.pop(key, None)
+
+
+def poll_background(key):
+    """
+    백그라운드 작업 상태 확인.
+    반환: ("none" | "pending" | "done" | "error", 결과 또는 예외)
+    done/error는 한 번만 반환되고 작업은 목록에서 제거됨
+    """
+    jobs = get_background_jobs()
+    job = jobs.get(key)
+    if job is None:
+        return "none", None
+    future, _ = job
+    if not future.done():
+        return "pending", None
+    jobs.pop(key, None)
+    error = future.exception()
+    if error is not None:
+        return "error", error
+    return "done", future.result()
+
+
+def queue_position(key):
+    """백그라운드 작업의 게이트웨이 대기 순서 (앞의 대기 수, 대기 중이 아니면 None)"""
+    entry = get_background_jobs().get(key)
+    if entry is None or entry[1]["ticket"] is None:
+        return None
+    return get_llm_gateway().position(entry[1]["ticket"])
+
+
+def cancel_background(key):
+    """작업 취소 (대기 중이면 대기열에서 빼고, 이미 실행 중이면 결과만 버림)"""
+    entry = get_background_jobs().pop(key, None)
+    if entry is not None:
+        future, job = entry
+        future.cancel()
+        job["cancelled"] = True
+        if job["ticket"] is not None:
+            get_llm_gateway().cancel(job["ticket"])
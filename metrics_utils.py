@@ -0,0 +1,52 @@
+import json
+import os
+import threading
+from datetime import datetime
+import streamlit as st
+
+# 로컬 성능 지표 저장소 (프로세스 공유 + JSONL 파일로 보존)
+METRICS_PATH = os.getenv("METRICS_PATH", ".metrics.jsonl")
+_metrics_lock = threading.Lock()
+
+
+@st.cache_resource
+def get_metrics_store(path=METRICS_PATH):
+    """지표 저장소 로드 (프로세스 단위 1회)"""
+    store = {"path": path, "records": []}
+    if path and os.path.exists(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        store["records"].append(json.loads(line))
+        except Exception:
+            pass
+    return store
+
+
+def record_metric(kind, store=None, **fields):
+    """지표 1건 기록 (kind: 'llm_call' 등)"""
+    if store is None:
+        store = get_metrics_store()
+    record = {"kind": kind, "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), **fields}
+    with _metrics_lock:
+        store["records"].append(record)
+        if store["path"]:
+            try:
+                with open(store["path"], "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            except Exception:
+                pass
+    return record
+
+
+def get_metrics(kind=None, store=None):
+    """기록된 지표 목록 (kind 지정 시 해당 종류만)"""
+    if store is None:
+        store = get_metrics_store()
+    with _metrics_lock:
+        records = list(store["records"])
+    if kind is None:
+        return records
+    return [r for r in records if r.get("kind") == kind]
@@ -0,0 +1,111 @@
+import streamlit as st
+import pandas as pd
+import time
+
+from metrics_utils import get_metrics
+
+st.set_page_config(page_title="AI 사용량", page_icon="📈", layout="wide")
+
+PAGE_LABELS = {
+    "quiz_empathy": "Quiz 공감",
+    "quiz_follow_up": "Quiz 추가 질문",
+    "neurotest_tutor": "검사자료 튜터",
+    "conference_tutor": "컨퍼런스 튜터",
+    "shared_history_store_summary": "Quiz 대화 요약",
+    "neurotest_history_store_summary": "검사자료 대화 요약",
+    "conference_history_store_summary": "컨퍼런스 대화 요약",
+}
+
+def require_login():
+    if 'user_id' not in st.session_state or not st.session_state.user_id:
+        st.warning("등록이 필요합니다")
+        time.sleep(3)
+        st.switch_page("app.py")
+
+require_login()
+
+if not st.session_state.get("is_admin"):
+    st.warning("관리자만 볼 수 있습니다.")
+    st.stop()
+
+def load_calls():
+    records = get_metrics("llm_call")
+    if not records:
+        return pd.DataFrame()
+    df = pd.DataFrame(records)
+    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+    df["day"] = df["timestamp"].dt.date
+    for col in ("duration", "ttft", "prompt_tokens", "completion_tokens", "cost"):
+        df[col] = pd.to_numeric(df[col], errors="coerce") if col in df.columns else 0.0
+    return df
+
+def summarize(df, by):
+    """그룹별 호출 수, 지연 p50/p95, 토큰, 비용 (캐시 적중은 지연 통계에서 제외)"""
+    calls = df[df["outcome"] != "cache_hit"]
+    grouped = calls.groupby(by)
+    summary = pd.DataFrame({
+        "호출": grouped.size(),
+        "지연 p50(초)": grouped["duration"].quantile(0.5),
+        "지연 p95(초)": grouped["duration"].quantile(0.95),
+        "첫 토큰 p50(초)": grouped["ttft"].quantile(0.5),
+        "첫 토큰 p95(초)": grouped["ttft"].quantile(0.95),
+        "입력 토큰": grouped["prompt_tokens"].sum(),
+        "출력 토큰": grouped["completion_tokens"].sum(),
+        "비용($)": grouped["cost"].sum(),
+        "오류율": grouped["outcome"].apply(lambda s: (s == "error").mean()),
+    })
+    hits = df[df["outcome"] == "cache_hit"].groupby(by).size()
+    summary["캐시 적중"] = hits.reindex(summary.index).fillna(0).astype(int)
+    return summary.fillna(0).round(3)
+
+# ============ UI ============
+st.title("📈 AI 사용량")
+
+df = load_calls()
+if df.empty:
+    st.info("아직 기록된 AI 호출이 없습니다.")
+    st.stop()
+
+min_day, max_day = df["day"].min(), df["day"].max()
+col1, col2 = st.columns([2, 3])
+with col1:
+    days = st.date_input("기간", value=(min_day, max_day), min_value=min_day, max_value=max_day)
+with col2:
+    pages = st.multiselect(
+        "페이지",
+        options=sorted(df["page"].dropna().unique()),
+        format_func=lambda p: PAGE_LABELS.get(p, p),
+    )
+
+if isinstance(days, (list, tuple)) and len(days) == 2:
+    df = df[(df["day"] >= days[0]) & (df["day"] <= days[1])]
+if pages:
+    df = df[df["page"].isin(pages)]
+
+calls = df[df["outcome"] != "cache_hit"]
+col1, col2, col3, col4, col5 = st.columns(5)
+col1.metric("호출", f"{len(calls):,}")
+col2.metric("지연 p50", f"{calls['duration'].quantile(0.5):.2f}초" if len(calls) else "-")
+col3.metric("지연 p95", f"{calls['duration'].quantile(0.95):.2f}초" if len(calls) else "-")
+col4.metric("비용", f"${df['cost'].sum():.2f}")
+col5.metric("캐시 적중", f"{(df['outcome'] == 'cache_hit').sum():,}")
+
+tab1, tab2, tab3 = st.tabs(["페이지별", "일별", "최근 오류"])
+
+with tab1:
+    by_page = summarize(df, "page")
+    by_page.index = [PAGE_LABELS.get(p, p) for p in by_page.index]
+    st.dataframe(by_page, use_container_width=True)
+
+with tab2:
+    by_day = summarize(df, ["day", "page"])
+    st.dataframe(by_day, use_container_width=True)
+    st.bar_chart(calls.groupby("day")["cost"].sum().rename("비용($)"))
+
+with tab3:
+    errors = df[df["outcome"] == "error"].sort_values("timestamp", ascending=False)
+    if errors.empty:
+        st.info("오류 없음")
+    else:
+        cols = [c for c in ("timestamp", "page", "session_id", "duration", "error") if c in errors.columns]
+        st.dataframe(errors[cols].head(100), use_container_width=True)
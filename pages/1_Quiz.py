@@ -7,10 +7,13 @@ from database_utils import log_user_action
 import gspread
 from google.oauth2.service_account import Credentials
 
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_community.chat_message_histories import ChatMessageHistory
+from empathy_utils import (
+    EMPATHY_SYSTEM, build_learning_context, load_empathy_store, empathy_store_mtime, pick_empathy,
+)
+from llm_utils import (
+    get_history_chain, get_prompt_chain, get_session_history, reset_session_histories,
+    cached_chat_response, submit_chain, poll_background, cancel_background, queue_position,
+)
 
 st.set_page_config(page_title="신경학 Quiz", page_icon="🧠")
 
@@ -108,70 +111,24 @@ def save_progress(user_id, qid, category):
     except:
         sheet.append_row([user_id, qid, category, datetime.utcnow().strftime("%Y-%m-%d %H:%M")])
 
-# LLM 설정
-llm_api_key = st.secrets["OPENAI_API_KEY"]
-
-empathy_model = ChatOpenAI(
-    model="gpt-4o",
-    temperature=0.9,
-    api_key=llm_api_key,
-    model_kwargs={"frequency_penalty": 0, "presence_penalty": 0.6},
-)
-
-feedback_model = ChatOpenAI(
-    model="gpt-4o",
-    temperature=0.3,
-    api_key=llm_api_key,
-    model_kwargs={"frequency_penalty": 0, "presence_penalty": 0.9},
-)
-
-EMPATHY_SYSTEM = (
-    "당신은 신경과 전문의입니다. 학습자의 답변을 보고 한국어로 공감하는 말을 두 문장으로 표현해주세요.\n"
-    "정답인 경우: 성취감을 높일 수 있는 공감을 제공해요.\n"
-    "오답인 경우: 격려와 함께 공감을 제공해요."
-)
-
+# LLM 설정 (모델과 체인은 llm_utils에서 프로세스당 1회 생성)
 FEEDBACK_SYSTEM = (
     "당신은 신경과 전문의입니다. 학생의 추가 질문에 대해 친절하게 답변해주세요.\n"
     "가장 최근에 푼 문제에 대해서만 답변해요."
 )
 
-empathy_prompt = ChatPromptTemplate.from_messages([
-    ("system", EMPATHY_SYSTEM),
-    MessagesPlaceholder("history"),
-    ("human", "{learning_context}"),
-])
-
-feedback_prompt = ChatPromptTemplate.from_messages([
-    ("system", FEEDBACK_SYSTEM),
-    MessagesPlaceholder("history"),
-    ("human", "{follow_up_question}"),
-])
-
-empathy_chain = empathy_prompt | empathy_model
-feedback_chain = feedback_prompt | feedback_model
-
 if "shared_history_store" not in st.session_state:
     st.session_state.shared_history_store = {}
 
-def get_shared_history(session_id: str) -> ChatMessageHistory:
-    store = st.session_state.shared_history_store
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    return store[session_id]
-
-empathy_with_history = RunnableWithMessageHistory(
-    empathy_chain,
-    get_shared_history,
-    input_messages_key="learning_context",
-    history_messages_key="history",
+# 공감 메시지는 화면을 막지 않도록 백그라운드에서 생성 (기록은 완료 시 직접 저장)
+empathy_chain = get_prompt_chain(
+    EMPATHY_SYSTEM, "learning_context",
+    temperature=0.9, presence_penalty=0.6,
 )
 
-feedback_with_history = RunnableWithMessageHistory(
-    feedback_chain,
-    get_shared_history,
-    input_messages_key="follow_up_question",
-    history_messages_key="history",
+feedback_with_history = get_history_chain(
+    FEEDBACK_SYSTEM, "follow_up_question", "shared_history_store",
+    temperature=0.3, presence_penalty=0.9,
 )
 
 def send_message(message, role, save=True):
@@ -187,8 +144,78 @@ def paint_history():
     for message in st.session_state["messages"]:
         send_message(message["message"], message["role"], save=False)
 
+@st.cache_data(max_entries=1)
+def load_stored_empathy(mtime):
+    """사전 생성된 보기별 공감 메시지 (empathy_utils.py로 생성, 파일을 다시 만들면 mtime이 바뀌어 새로 읽음)"""
+    return load_empathy_store()
+
+def current_empathy_key():
+    return (st.session_state.user_id, st.session_state.selected_category, st.session_state.qid)
+
+def quiz_session_id():
+    """대화 기록은 문제 단위로 유지 (문제가 바뀌면 새 기록)"""
+    return f"{st.session_state.user_id}_{st.session_state.selected_category}_{st.session_state.qid}"
+
+def get_quiz_history():
+    return get_session_history("shared_history_store", quiz_session_id())
+
+def start_empathy(learning_context):
+    """공감 메시지 생성을 백그라운드로 시작 (사용자, 분과, 문제 번호 단위)"""
+    key = current_empathy_key()
+    history = get_quiz_history()
+    submit_chain(
+        key, empathy_chain, {"learning_context": learning_context},
+        history=history, page="quiz_empathy", session_id=quiz_session_id()
+    )
+    # 추가 질문이 공감 메시지보다 먼저 와도 문제 맥락을 알 수 있도록 바로 기록
+    history.add_user_message(learning_context)
+    st.session_state.empathy_job = key
+    st.session_state.empathy_response = None
+
+def cancel_stale_empathy():
+    """다른 문제로 이동했으면 진행 중인 공감 메시지 생성 취소"""
+    key = st.session_state.get("empathy_job")
+    if key is not None and (key != current_empathy_key() or not st.session_state.submitted):
+        cancel_background(key)
+        st.session_state.empathy_job = None
+
+@st.fragment(run_every=1)
+def empathy_message():
+    """공감 메시지가 도착하면 표시 (이 영역만 주기적으로 갱신)"""
+    if st.session_state.get("empathy_response"):
+        with st.chat_message("ai"):
+            st.write(st.session_state.empathy_response)
+        return
+    
+    key = st.session_state.get("empathy_job")
+    if key is None:
+        return
+    
+    status, result = poll_background(key)
+    if status == "pending":
+        ahead = queue_position(key)
+        with st.chat_message("ai"):
+            st.caption(f"⏳ 대기 중 · 앞에 {ahead}건" if ahead else "...")
+    elif status == "done" and result:
+        st.session_state.empathy_job = None
+        st.session_state.empathy_response = result
+        get_quiz_history().add_ai_message(result)
+        save_message(result, "ai")
+        with st.chat_message("ai"):
+            st.write(result)
+    elif status == "error":
+        # 실패 내용은 llm_call / llm_background 지표에 기록됨
+        st.session_state.empathy_job = None
+        with st.chat_message("ai"):
+            st.caption("공감 메시지를 불러오지 못했어요. 아래에서 질문을 이어가 주세요.")
+    elif status in ("done", "none"):
+        st.session_state.empathy_job = None
+
 def render_feedback(selected: str, qrow):
     if st.session_state.feedback_given:
+        # 전체 재실행(버튼 등)에도 진행 중인 공감 메시지를 계속 확인 (안 그리면 fragment 갱신이 멈춤)
+        if st.session_state.get("empathy_job") is not None:
+            empathy_message()
         return
     
     answer = str(qrow.get('answer', '')).strip()
@@ -208,7 +235,8 @@ def render_feedback(selected: str, qrow):
         choice_idx = choices.index(selected)
         feedback_key = f"feedback_{choice_idx + 1}"
         learning_feedback = qrow.get(feedback_key, '')
-    except:
+    except ValueError:
+        # 보기 목록에 없는 답 (시트 수정 등) - 해설 없이 진행
         learning_feedback = ""
     
     with st.chat_message("ai"):
@@ -227,36 +255,45 @@ def render_feedback(selected: str, qrow):
     if learning_feedback:
         save_message(learning_feedback, "ai")
     
-    learning_context = f"Question: {qrow['question']}, Correct Answer: {answer}, Student Answer: {selected}"
+    learning_context = build_learning_context(qrow['question'], answer, selected)
     
-    try:
-        e_response = empathy_with_history.invoke(
-            {"learning_context": learning_context},
-            config={"configurable": {"session_id": st.session_state.user_id}}
-        )
-        empathy_response = e_response.content
-        
+    # 사전 생성된 메시지가 있으면 바로 표시, 없으면 실시간 생성
+    stored_empathy = pick_empathy(load_stored_empathy(empathy_store_mtime()), qrow.get('id', ''), selected, is_correct)
+    if stored_empathy:
+        st.session_state.empathy_job = None
+        st.session_state.empathy_response = stored_empathy
+        history = get_quiz_history()
+        history.add_user_message(learning_context)
+        history.add_ai_message(stored_empathy)
+        save_message(stored_empathy, "ai")
         with st.chat_message("ai"):
-            st.write(empathy_response)
-            save_message(empathy_response, "ai")
-    except:
-        pass
+            st.write(stored_empathy)
+    else:
+        start_empathy(learning_context)
+        empathy_message()
 
-def follow_up(follow_up_question):
+def follow_up_context(qrow):
+    """추가 질문 캐시 맥락: 같은 문제라도 고른 보기/정오답에 따라 대화가 달라지므로 함께 구분"""
+    result = "correct" if st.session_state.is_correct else "wrong"
+    return f"quiz:{qrow.get('id', '')}:{st.session_state.selected}:{result}"
+
+def follow_up(follow_up_question, qrow):
     send_message(follow_up_question, "human", save=True)
     
-    try:
-        f_response = feedback_with_history.invoke(
+    with st.chat_message("ai"):
+        feedback_response, error = cached_chat_response(
+            feedback_with_history,
             {"follow_up_question": follow_up_question},
-            config={"configurable": {"session_id": st.session_state.user_id}}
+            quiz_session_id(),
+            page="quiz_follow_up",
+            context_id=follow_up_context(qrow),
+            question=follow_up_question,
+            store_key="shared_history_store"
         )
-        feedback_response = f_response.content
-        
-        with st.chat_message("ai"):
-            st.write(feedback_response)
+        if feedback_response:
             save_message(feedback_response, "ai")
-    except Exception as e:
-        st.error(f"오류가 발생했습니다: {e}")
+    if error:
+        st.error(f"오류가 발생했습니다: {error}")
 
 def on_choice_change():
     choice = st.session_state.current_radio
@@ -286,6 +323,8 @@ if "messages" not in st.session_state:
     st.session_state.messages = []
 if "is_correct" not in st.session_state:
     st.session_state.is_correct = None
+if "empathy_job" not in st.session_state:
+    st.session_state.empathy_job = None
 
 # ============ UI ============
 st.title("🧠 신경학 Quiz")
@@ -304,6 +343,9 @@ st.markdown("""
 
 all_questions_df = load_all_questions()
 
+cancel_stale_empathy()
+reset_session_histories("shared_history_store", keep=quiz_session_id())
+
 # 분과 선택 (카테고리 미선택 시)
 if st.session_state.selected_category is None:
     st.subheader("📚 학습 분과를 선택하세요")
@@ -457,7 +499,7 @@ else:
             follow_up_question = st.chat_input("궁금한 점을 입력하세요...")
             if follow_up_question:
                 paint_history()
-                follow_up(follow_up_question)
+                follow_up(follow_up_question, row)
             
             if st.session_state.qid == len(df):
                 col1, col2, col3 = st.columns([1, 1, 1])
@@ -5,10 +5,9 @@ from datetime import datetime
 import gspread
 from google.oauth2.service_account import Credentials
 
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_community.chat_message_histories import ChatMessageHistory
+from llm_utils import get_history_chain, cached_chat_response, reset_session_histories
+from search_utils import select_context
+from list_utils import sort_by_order
 
 st.set_page_config(page_title="임상신경생리검사 및 SNSB", page_icon="🧠")
 
@@ -107,30 +106,22 @@ def load_all_materials():
     except:
         return pd.DataFrame()
 
-def get_materials_by_category(df, category):
-    if df.empty:
-        return pd.DataFrame()
-    filtered = df[df['category'] == category]
-    if 'order' in filtered.columns:
-        filtered = filtered.sort_values('order')
-    return filtered.reset_index(drop=True)
-
-def get_category_counts(df):
-    if df.empty:
-        return {cat: 0 for cat in NEURO_TESTS.keys()}
-    counts = df['category'].value_counts().to_dict()
-    return {cat: counts.get(cat, 0) for cat in NEURO_TESTS.keys()}
+@st.cache_data(ttl=300)
+def load_materials_index():
+    """검사별 자료 {category: DataFrame} (캐시할 때 한 번만 순서대로 정렬, 화면에서는 다시 정렬하지 않음)"""
+    df = load_all_materials()
+    if df.empty or 'category' not in df.columns:
+        return {}
+    df = sort_by_order(df)
+    return {cat: group.reset_index(drop=True) for cat, group in df.groupby('category', sort=False)}
 
-# ⭐ LLM 설정
-llm_api_key = st.secrets["OPENAI_API_KEY"]
+def get_materials_by_category(index, category):
+    return index.get(category, pd.DataFrame())
 
-tutor_model = ChatOpenAI(
-    model="gpt-4o",
-    temperature=0.3,
-    api_key=llm_api_key,
-    model_kwargs={"frequency_penalty": 0, "presence_penalty": 0.9},
-)
+def get_category_counts(index):
+    return {cat: len(index.get(cat, ())) for cat in NEURO_TESTS.keys()}
 
+# ⭐ LLM 설정 (모델과 체인은 llm_utils에서 프로세스당 1회 생성)
 TUTOR_SYSTEM = """당신은 신경과 전문의이자 임상신경생리학 전문가입니다. 
 현재 학습자가 보고 있는 자료에 대해 친절하고 명확하게 답변해주세요.
 
@@ -145,30 +136,11 @@ TUTOR_SYSTEM = """당신은 신경과 전문의이자 임상신경생리학 전
 3. 필요시 추가 학습 포인트를 제안해주세요
 4. 한국어로 답변해주세요"""
 
-tutor_prompt = ChatPromptTemplate.from_messages([
-    ("system", TUTOR_SYSTEM),
-    MessagesPlaceholder("history"),
-    ("human", "{question}"),
-])
-
-tutor_chain = tutor_prompt | tutor_model
-
 # 세션별 대화 기록 관리
 if "neurotest_history_store" not in st.session_state:
     st.session_state.neurotest_history_store = {}
 
-def get_neurotest_history(session_id: str) -> ChatMessageHistory:
-    store = st.session_state.neurotest_history_store
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    return store[session_id]
-
-tutor_with_history = RunnableWithMessageHistory(
-    tutor_chain,
-    get_neurotest_history,
-    input_messages_key="question",
-    history_messages_key="history",
-)
+tutor_with_history = get_history_chain(TUTOR_SYSTEM, "question", "neurotest_history_store")
 
 # 채팅 관련 함수
 def send_message(message, role, save=True):
@@ -188,27 +160,29 @@ def ask_tutor(question, item):
     """AI 튜터에게 질문"""
     send_message(question, "human", save=True)
     
-    try:
-        session_id = f"{st.session_state.user_id}_{item.get('id', 'unknown')}"
-        
-        response = tutor_with_history.invoke(
+    session_id = f"{st.session_state.user_id}_{item.get('id', 'unknown')}"
+    # 다른 자료로 이동했으면 이전 자료의 대화 기록은 버림
+    reset_session_histories("neurotest_history_store", keep=session_id)
+    
+    with st.chat_message("ai"):
+        answer, error = cached_chat_response(
+            tutor_with_history,
             {
                 "category": NEURO_TESTS.get(item.get('category', ''), item.get('category', '')),
                 "title": item.get('title', ''),
-                "content": item.get('content', '')[:2000],  # 토큰 제한
+                "content": select_context(item.get('content', ''), question, token_budget=1000),  # 질문 관련 부분만
                 "question": question
             },
-            config={"configurable": {"session_id": session_id}}
+            session_id,
+            page="neurotest_tutor",
+            context_id=f"neurotest:{item.get('id', 'unknown')}",
+            question=question,
+            store_key="neurotest_history_store"
         )
-        
-        answer = response.content
-        
-        with st.chat_message("ai"):
-            st.markdown(answer)
+        if answer:
             save_message(answer, "ai")
-            
-    except Exception as e:
-        st.error(f"오류가 발생했습니다: {e}")
+    if error:
+        st.error(f"오류가 발생했습니다: {error}")
 
 # 세션 상태 초기화
 if "selected_neurotest" not in st.session_state:
@@ -223,13 +197,13 @@ if "show_comments" not in st.session_state:
 # ============ UI ============
 st.title("🧠 임상신경생리검사 및 SNSB")
 
-all_materials_df = load_all_materials()
+materials_index = load_materials_index()
 
 # 카테고리 미선택 시
 if st.session_state.selected_neurotest is None:
     st.subheader("📋 검사 종류를 선택하세요")
     
-    category_counts = get_category_counts(all_materials_df)
+    category_counts = get_category_counts(materials_index)
     
     items = list(NEURO_TESTS.items())
     
@@ -271,7 +245,7 @@ if st.session_state.selected_neurotest is None:
 # 카테고리 선택됨
 else:
     category = st.session_state.selected_neurotest
-    df = get_materials_by_category(all_materials_df, category)
+    df = get_materials_by_category(materials_index, category)
     
     with st.sidebar:
         st.markdown(f"**현재 검사:** {NEURO_TESTS.get(category, category)}")
@@ -391,7 +365,7 @@ else:
                     # 히스토리 스토어도 초기화
                     session_id = f"{st.session_state.user_id}_{material_id}"
                     if session_id in st.session_state.neurotest_history_store:
-                        st.session_state.neurotest_history_store[session_id] = ChatMessageHistory()
+                        st.session_state.neurotest_history_store[session_id].clear()
                     st.rerun()
         
         # 탭 2: 댓글
@@ -4,13 +4,14 @@ from datetime import datetime
 import gspread
 from google.oauth2.service_account import Credentials
 
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_community.chat_message_histories import ChatMessageHistory
+from llm_utils import get_history_chain, cached_chat_response
+from search_utils import select_context
+from feed_utils import FEED_POLL_SECONDS, get_feed_cache, sync_feed, count_since, group_by
 
 st.set_page_config(page_title="Morning Conference", page_icon="🏥", layout="wide")
 
+FEED_PAGE_SIZE = 5      # 한 번에 보여주는 글 수 ("더 보기"로 늘림)
+
 # 로그인 체크
 def require_login():
     if 'user_id' not in st.session_state or not st.session_state.user_id:
@@ -54,16 +55,20 @@ def get_replies_sheet():
         worksheet.append_row(["reply_id", "post_id", "author", "content", "created_at"])
         return worksheet
 
-@st.cache_data(ttl=300)
-def get_all_posts():
-    sheet = get_conference_sheet()
-    data = sheet.get_all_records()
-    return data
+def get_posts_feed(min_interval=FEED_POLL_SECONDS, full=False):
+    """최신순 글 목록 캐시 (새로 추가된 행만 읽어 합침)"""
+    feed = get_feed_cache("conference")
+    sync_feed(feed, get_conference_sheet, min_interval=min_interval, full=full)
+    return feed
+
+def get_replies_feed(min_interval=FEED_POLL_SECONDS, full=False):
+    feed = get_feed_cache("replies", id_field="reply_id")
+    sync_feed(feed, get_replies_sheet, min_interval=min_interval, full=full)
+    return feed
 
 def get_replies(post_id):
-    sheet = get_replies_sheet()
-    data = sheet.get_all_records()
-    return [r for r in data if str(r['post_id']) == str(post_id)]
+    """글을 펼쳤을 때만 호출 (post_id별 묶음은 댓글이 바뀔 때만 다시 만듦)"""
+    return group_by(get_replies_feed(), "post_id").get(str(post_id), [])
 
 def add_reply(post_id, author, content):
     sheet = get_replies_sheet()
@@ -85,16 +90,7 @@ def parse_image_urls(image_urls_str):
     urls = str(image_urls_str).split(',')
     return [url.strip() for url in urls if is_valid_url(url.strip())]
 
-# ⭐ LLM 설정
-llm_api_key = st.secrets["OPENAI_API_KEY"]
-
-tutor_model = ChatOpenAI(
-    model="gpt-4o",
-    temperature=0.3,
-    api_key=llm_api_key,
-    model_kwargs={"frequency_penalty": 0, "presence_penalty": 0.9},
-)
-
+# ⭐ LLM 설정 (모델과 체인은 llm_utils에서 프로세스당 1회 생성)
 TUTOR_SYSTEM = """당신은 신경과 전문의이자 의학 교육 전문가입니다.
 현재 학습자가 보고 있는 Morning Conference 케이스에 대해 친절하고 명확하게 답변해주세요.
 
@@ -108,30 +104,11 @@ TUTOR_SYSTEM = """당신은 신경과 전문의이자 의학 교육 전문가입
 4. 한국어로 답변해주세요
 5. 의학적으로 정확한 정보를 제공해주세요"""
 
-tutor_prompt = ChatPromptTemplate.from_messages([
-    ("system", TUTOR_SYSTEM),
-    MessagesPlaceholder("history"),
-    ("human", "{question}"),
-])
-
-tutor_chain = tutor_prompt | tutor_model
-
 # 세션별 대화 기록 관리
 if "conference_history_store" not in st.session_state:
     st.session_state.conference_history_store = {}
 
-def get_conference_history(session_id: str) -> ChatMessageHistory:
-    store = st.session_state.conference_history_store
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    return store[session_id]
-
-tutor_with_history = RunnableWithMessageHistory(
-    tutor_chain,
-    get_conference_history,
-    input_messages_key="question",
-    history_messages_key="history",
-)
+tutor_with_history = get_history_chain(TUTOR_SYSTEM, "question", "conference_history_store")
 
 # 채팅 관련 함수
 def get_chat_messages(post_id):
@@ -155,46 +132,160 @@ def clear_chat_messages(post_id):
     # 히스토리 스토어도 초기화
     session_id = f"{st.session_state.user_id}_conference_{post_id}"
     if session_id in st.session_state.conference_history_store:
-        st.session_state.conference_history_store[session_id] = ChatMessageHistory()
+        st.session_state.conference_history_store[session_id].clear()
 
 def ask_ai(question, post_id, case_content):
-    """AI에게 질문"""
-    try:
-        session_id = f"{st.session_state.user_id}_conference_{post_id}"
-        
-        response = tutor_with_history.invoke(
-            {
-                "case_content": case_content[:3000],  # 토큰 제한
-                "question": question
-            },
-            config={"configurable": {"session_id": session_id}}
-        )
-        
-        return response.content
-    except Exception as e:
-        return f"오류가 발생했습니다: {e}"
+    """AI에게 질문 (st.chat_message 블록 안에서 스트리밍 출력)"""
+    session_id = f"{st.session_state.user_id}_conference_{post_id}"
+    
+    answer, error = cached_chat_response(
+        tutor_with_history,
+        {
+            "case_content": select_context(case_content, question, token_budget=1500),  # 질문 관련 부분만
+            "question": question
+        },
+        session_id,
+        page="conference_tutor",
+        context_id=f"conference:{post_id}",
+        question=question,
+        store_key="conference_history_store"
+    )
+    
+    if error:
+        st.error(f"오류가 발생했습니다: {error}")
+        answer = f"{answer}\n\n(오류가 발생했습니다: {error})" if answer else f"오류가 발생했습니다: {error}"
+    return answer
 
 # ============ UI ============
 st.title("🏥 Morning Conference")
 
-# 새로고침 버튼
+# 새로고침 버튼 (평소에는 아래 자동 확인으로 새 글/의견만 읽음)
 col1, col2 = st.columns([6, 1])
 with col2:
     if st.button("🔄 새로고침"):
-        st.cache_data.clear()
+        get_posts_feed(full=True)
+        get_replies_feed(full=True)
         st.rerun()
 
+@st.fragment(run_every=FEED_POLL_SECONDS)
+def new_activity_notice():
+    """주기적으로 끝에 추가된 행만 확인해 새 글/의견 알림 (의견은 펼친 글이 있을 때만)"""
+    new_posts = count_since(get_posts_feed(), st.session_state.conference_seen_post)
+    new_replies = 0
+    if st.session_state.get("conference_open_posts"):
+        new_replies = count_since(get_replies_feed(), st.session_state.get("conference_seen_reply"))
+    if new_posts or new_replies:
+        parts = []
+        if new_posts:
+            parts.append(f"새 글 {new_posts}개")
+        if new_replies:
+            parts.append(f"새 의견 {new_replies}개")
+        if st.button(f"🆕 {', '.join(parts)} · 보기", use_container_width=True):
+            st.rerun()
+
+# 글 목록 (최신순 정렬은 캐시에서 유지)
+posts_feed = get_posts_feed()
+posts = posts_feed["newest"]
+
+# 이번 화면에 반영된 마지막 id (이후에 추가된 것만 알림)
+st.session_state.conference_seen_post = posts_feed["high_water"]
+if st.session_state.get("conference_open_posts"):
+    st.session_state.conference_seen_reply = get_replies_feed()["high_water"]
+
+new_activity_notice()
+
 st.divider()
 
-# 글 목록
-posts = get_all_posts()
+# 검색에서 특정 글로 이동한 경우 해당 글만 표시
+focus_id = st.session_state.get("conference_focus")
+if focus_id and posts:
+    posts = [p for p in posts if str(p['id']) == str(focus_id)]
+    col1, col2 = st.columns([5, 1])
+    with col1:
+        st.caption("🔍 검색 결과에서 선택한 케이스")
+    with col2:
+        if st.button("전체 보기"):
+            st.session_state.conference_focus = None
+            st.rerun()
+
+if "conference_feed_limit" not in st.session_state:
+    st.session_state.conference_feed_limit = FEED_PAGE_SIZE
+if "conference_open_posts" not in st.session_state:
+    st.session_state.conference_open_posts = set()
+
+@st.fragment
+def post_panel(post_id, content):
+    """AI 질문/의견 탭 (펼친 글만 그리고, 입력은 이 글 안에서만 다시 실행)"""
+    tab1, tab2 = st.tabs(["🤖 AI에게 질문", "💬 의견"])
+    
+    # 탭 1: AI 질문
+    with tab1:
+        st.markdown("##### 이 케이스에 대해 궁금한 점을 물어보세요")
+        
+        # 기존 대화 표시
+        chat_messages = get_chat_messages(post_id)
+        for msg in chat_messages:
+            with st.chat_message(msg["role"]):
+                st.markdown(msg["message"])
+        
+        # 질문 입력
+        question = st.chat_input("질문을 입력하세요...", key=f"ai_question_{post_id}")
+        if question:
+            # 사용자 메시지 추가
+            add_chat_message(post_id, question, "human")
+            with st.chat_message("human"):
+                st.markdown(question)
+            
+            # AI 응답
+            with st.chat_message("ai"):
+                answer = ask_ai(question, post_id, content)
+                add_chat_message(post_id, answer, "ai")
+        
+        # 대화 초기화 버튼
+        if chat_messages:
+            if st.button("🗑️ 대화 초기화", key=f"clear_chat_{post_id}"):
+                clear_chat_messages(post_id)
+                st.rerun(scope="fragment")
+    
+    # 탭 2: 의견 (기존 댓글)
+    with tab2:
+        st.markdown("##### 다른 학습자들과 의견을 나눠보세요")
+        
+        # 기존 댓글 표시
+        replies = get_replies(post_id)
+        if replies:
+            for reply in replies:
+                st.markdown(f"**{reply['author']}** · {reply['created_at']}")
+                st.markdown(f"{reply['content']}")
+                st.markdown("")
+        else:
+            st.info("아직 의견이 없습니다. 첫 번째 의견을 남겨보세요!")
+        
+        # 새 댓글 입력
+        col1, col2 = st.columns([5, 1])
+        with col1:
+            new_reply = st.text_input(
+                "의견 입력",
+                placeholder="의견을 입력하세요...",
+                key=f"reply_{post_id}",
+                label_visibility="collapsed"
+            )
+        with col2:
+            if st.button("등록", key=f"btn_{post_id}"):
+                if new_reply.strip():
+                    add_reply(post_id, st.session_state.user_id, new_reply)
+                    get_replies_feed(min_interval=0)     # 방금 쓴 의견까지 끝부분만 읽음
+                    st.rerun(scope="fragment")
+                else:
+                    st.warning("내용을 입력해주세요.")
 
 if not posts:
     st.info("아직 등록된 글이 없습니다.")
 else:
-    posts = sorted(posts, key=lambda x: x['id'], reverse=True)
+    visible = posts[:st.session_state.conference_feed_limit]
+    open_posts = st.session_state.conference_open_posts
     
-    for post in posts:
+    for post in visible:
         with st.container():
             post_id = post['id']
             
@@ -245,72 +336,23 @@ else:
             if content_below:
                 st.markdown(f"**{content_below}**")
             
-            # ⭐ AI 질문 & 의견 탭
+            # ⭐ AI 질문 & 의견 (펼친 글만)
             st.markdown("---")
             
-            tab1, tab2 = st.tabs(["🤖 AI에게 질문", "💬 의견"])
-            
-            # 탭 1: AI 질문
-            with tab1:
-                st.markdown("##### 이 케이스에 대해 궁금한 점을 물어보세요")
-                
-                # 기존 대화 표시
-                chat_messages = get_chat_messages(post_id)
-                for msg in chat_messages:
-                    with st.chat_message(msg["role"]):
-                        st.markdown(msg["message"])
-                
-                # 질문 입력
-                question = st.chat_input("질문을 입력하세요...", key=f"ai_question_{post_id}")
-                if question:
-                    # 사용자 메시지 추가
-                    add_chat_message(post_id, question, "human")
-                    with st.chat_message("human"):
-                        st.markdown(question)
-                    
-                    # AI 응답
-                    with st.chat_message("ai"):
-                        with st.spinner("생각 중..."):
-                            answer = ask_ai(question, post_id, content)
-                        st.markdown(answer)
-                        add_chat_message(post_id, answer, "ai")
-                
-                # 대화 초기화 버튼
-                if chat_messages:
-                    if st.button("🗑️ 대화 초기화", key=f"clear_chat_{post_id}"):
-                        clear_chat_messages(post_id)
-                        st.rerun()
-            
-            # 탭 2: 의견 (기존 댓글)
-            with tab2:
-                st.markdown("##### 다른 학습자들과 의견을 나눠보세요")
-                
-                # 기존 댓글 표시
-                replies = get_replies(post_id)
-                if replies:
-                    for reply in replies:
-                        st.markdown(f"**{reply['author']}** · {reply['created_at']}")
-                        st.markdown(f"{reply['content']}")
-                        st.markdown("")
-                else:
-                    st.info("아직 의견이 없습니다. 첫 번째 의견을 남겨보세요!")
-                
-                # 새 댓글 입력
-                col1, col2 = st.columns([5, 1])
-                with col1:
-                    new_reply = st.text_input(
-                        "의견 입력",
-                        placeholder="의견을 입력하세요...",
-                        key=f"reply_{post_id}",
-                        label_visibility="collapsed"
-                    )
-                with col2:
-                    if st.button("등록", key=f"btn_{post_id}"):
-                        if new_reply.strip():
-                            add_reply(post_id, st.session_state.user_id, new_reply)
-                            st.cache_data.clear()
-                            st.rerun()
-                        else:
-                            st.warning("내용을 입력해주세요.")
+            is_open = str(post_id) in open_posts or bool(focus_id)
+            if is_open:
+                if not focus_id and st.button("🔼 접기", key=f"close_{post_id}"):
+                    open_posts.discard(str(post_id))
+                    st.rerun()
+                post_panel(post_id, content)
+            elif st.button("🤖 AI 질문 · 💬 의견 보기", key=f"open_{post_id}"):
+                open_posts.add(str(post_id))
+                st.rerun()
             
             st.divider()
+    
+    if len(posts) > len(visible):
+        st.caption(f"{len(posts)}개 중 {len(visible)}개 표시")
+        if st.button("⬇️ 더 보기", use_container_width=True):
+            st.session_state.conference_feed_limit += FEED_PAGE_SIZE
+            st.rerun()
@@ -1,4 +1,5 @@
 import streamlit as st
+import hashlib
 from datetime import datetime
 import gspread
 from google.oauth2.service_account import Credentials
@@ -8,6 +9,9 @@ st.set_page_config(page_title="질의응답", page_icon="💬")
 # 관리자 목록
 ADMIN_USERS = ["윤지환"]
 
+QA_COLUMNS = ["user", "question", "time"]
+QA_PAGE_SIZE = 20       # 한 번에 읽는 질문 수 (끝에서부터 범위로 읽음)
+
 # 로그인 확인
 if 'user_id' not in st.session_state or not st.session_state.user_id:
     st.warning("홈에서 먼저 등록해주세요.")
@@ -29,6 +33,57 @@ def get_google_sheet():
     sheet = client.open_by_url(sheet_url).worksheet("질문")
     return sheet
 
+def qa_id(q):
+    """질문의 고정 id (작성자/시각/내용으로 만들어 행 위치가 바뀌어도 같음)"""
+    text = f"{q.get('user', '')}|{q.get('time', '')}|{q.get('question', '')}"
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+def to_question(row):
+    row = list(row) + [""] * (len(QA_COLUMNS) - len(row))   # API는 뒤쪽 빈 셀을 생략함
+    q = dict(zip(QA_COLUMNS, row))
+    q['id'] = qa_id(q)
+    return q
+
+@st.cache_data(ttl=30)
+def get_row_count():
+    """데이터 행 수 (A열만 읽음)"""
+    return max(0, len(get_google_sheet().col_values(1)) - 1)
+
+@st.cache_data(ttl=300)
+def load_page(row_count, end_row, size=QA_PAGE_SIZE):
+    """
+    end_row(시트 행 번호)부터 위로 size개만 범위로 읽음. 최신순 [(행 번호, 질문)].
+    row_count가 캐시 키에 들어가므로 질문이 추가/삭제되면 새로 읽음
+    """
+    start_row = max(2, end_row - size + 1)
+    if end_row < start_row:
+        return []
+    values = get_google_sheet().get(f"A{start_row}:C{end_row}")
+    rows = [(start_row + offset, to_question(row)) for offset, row in enumerate(values) if any(row)]
+    return list(reversed(rows))
+
+def delete_question(question_id, row_hint):
+    """
+    id로 삭제. 보이던 행(row_hint)을 먼저 확인하고, 그 사이 행이 밀렸으면 전체에서 id로 찾음.
+    반환: 삭제 여부
+    """
+    sheet = get_google_sheet()
+    values = sheet.get(f"A{row_hint}:C{row_hint}")
+    if values and to_question(values[0])['id'] == question_id:
+        sheet.delete_rows(row_hint)
+        return True
+    for row_number, row in enumerate(sheet.get_all_values()[1:], start=2):
+        if to_question(row)['id'] == question_id:
+            sheet.delete_rows(row_number)
+            return True
+    return False
+
+def refresh_questions():
+    """내가 추가/삭제한 뒤 행 수와 페이지 캐시 갱신 (다른 캐시는 건드리지 않음)"""
+    get_row_count.clear()
+    load_page.clear()
+    st.session_state.qa_cursor = None
+
 sheet = get_google_sheet()
 
 st.title("💬 질의응답 (Agora)")
@@ -44,7 +99,7 @@ if st.button("질문 제출"):
             datetime.now().strftime("%Y-%m-%d %H:%M")
         ])
         st.success("질문이 등록되었습니다!")
-        st.cache_resource.clear()
+        refresh_questions()
         st.rerun()
     else:
         st.warning("질문을 입력해주세요.")
@@ -52,11 +107,16 @@ if st.button("질문 제출"):
 # 질문 목록 표시
 st.subheader("📋 질문 목록")
 
-data = sheet.get_all_records()
+row_count = get_row_count()
+last_row = row_count + 1    # 마지막 데이터 행 (헤더가 1행)
+
+# 커서: 현재 페이지의 마지막(가장 최근) 행 번호, None이면 최신 페이지
+cursor = st.session_state.get("qa_cursor") or last_row
+cursor = min(cursor, last_row)
+page = load_page(row_count, cursor)
 
-if data:
-    for i, q in enumerate(reversed(data)):
-        row_num = len(data) - i + 1  # 실제 행 번호 (헤더 제외)
+if page:
+    for row_number, q in page:
         col1, col2 = st.columns([10, 1])
         with col1:
             st.markdown(f"**{q['user']}** ({q['time']})")
@@ -64,10 +124,23 @@ if data:
         with col2:
             # 관리자만 삭제 버튼 표시
             if st.session_state.user_id in ADMIN_USERS:
-                if st.button("🗑️", key=f"del_{i}"):
-                    sheet.delete_rows(row_num)
-                    st.cache_resource.clear()
+                if st.button("🗑️", key=f"del_{row_number}_{q['id']}"):
+                    delete_question(q['id'], row_number)
+                    refresh_questions()
                     st.rerun()
         st.divider()
+    
+    oldest_row = page[-1][0]
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("◀ 최신", disabled=cursor >= last_row):
+            st.session_state.qa_cursor = None
+            st.rerun()
+    with col2:
+        st.caption(f"전체 {row_count}개 중 최신 {last_row - cursor + 1}–{last_row - oldest_row + 1}번째")
+    with col3:
+        if st.button("이전 질문 ▶", disabled=oldest_row <= 2):
+            st.session_state.qa_cursor = oldest_row - 1
+            st.rerun()
 else:
     st.info("아직 등록된 질문이 없습니다.")
@@ -3,11 +3,21 @@ import time
 from datetime import datetime
 import gspread
 from google.oauth2.service_account import Credentials
-import requests
-import base64
+from cache_utils import purge_response_cache
+from list_utils import (
+    filter_records, sort_records, paged, thumbnail,
+    get_selection, clear_selection, selection_checkbox, select_page,
+)
+from sheets_utils import delete_rows_by_id, update_changed_cells
+from feed_utils import get_feed_cache, invalidate_feed
+from search_utils import index_document, remove_document, post_doc
+from image_utils import upload_images, format_bytes, get_dedup_report
 
 st.set_page_config(page_title="컨퍼런스 관리", page_icon="✍️")
 
+# conference 시트 헤더
+POST_COLUMNS = ["id", "author", "content", "created_at", "image_urls", "video_url"]
+
 # 로그인 체크
 def require_login():
     if 'user_id' not in st.session_state or not st.session_state.user_id:
@@ -29,31 +39,6 @@ def get_sheets_client():
     )
     return gspread.authorize(credentials)
 
-def upload_image_to_imgbb(image_file):
-    try:
-        api_key = st.secrets.get("imgbb", {}).get("api_key", "")
-        if not api_key:
-            st.error("imgBB API 키가 설정되지 않았습니다.")
-            return None
-        
-        image_file.seek(0)
-        image_data = base64.b64encode(image_file.read()).decode('utf-8')
-        
-        response = requests.post(
-            "https://api.imgbb.com/1/upload",
-            data={"key": api_key, "image": image_data, "name": image_file.name},
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            if result.get('success'):
-                return result['data']['url']
-        return None
-    except Exception as e:
-        st.error(f"이미지 업로드 오류: {e}")
-        return None
-
 def get_conference_sheet():
     client = get_sheets_client()
     sheet_url = st.secrets["google_sheets"]["spreadsheet_url"]
@@ -62,7 +47,7 @@ def get_conference_sheet():
         return spreadsheet.worksheet("conference")
     except:
         worksheet = spreadsheet.add_worksheet(title="conference", rows=1000, cols=6)
-        worksheet.append_row(["id", "author", "content", "created_at", "image_urls", "video_url"])
+        worksheet.append_row(POST_COLUMNS)
         return worksheet
 
 def add_post(author, content, image_urls="", video_url=""):
@@ -70,31 +55,48 @@ def add_post(author, content, image_urls="", video_url=""):
     post_id = datetime.now().strftime('%Y%m%d%H%M%S')
     created_at = datetime.now().strftime("%Y-%m-%d %H:%M")
     sheet.append_row([post_id, author, content, created_at, image_urls, video_url])
+    invalidate_feed(get_feed_cache("conference"))
+    index_document(post_doc({'id': post_id, 'content': content}))
     return post_id
 
 def get_all_posts():
     sheet = get_conference_sheet()
     return sheet.get_all_records()
 
-def delete_post(post_id):
+@st.cache_data(ttl=300)
+def load_posts():
+    """관리 목록용 캐시 (작성/수정/삭제 시 st.cache_data.clear())"""
+    return get_all_posts()
+
+POST_SORTS = {
+    "최신순": (lambda p: p.get('id', ''), True),
+    "오래된순": (lambda p: p.get('id', ''), False),
+}
+
+def delete_posts(post_ids):
+    """여러 글을 한 번에 삭제 (id 열 읽기 1회 + batch_update 1회). 반환: 삭제한 id 목록"""
     sheet = get_conference_sheet()
-    data = sheet.get_all_values()
-    for idx, row in enumerate(data):
-        if str(row[0]) == str(post_id):
-            sheet.delete_rows(idx + 1)
-            return True
-    return False
+    deleted = delete_rows_by_id(sheet, post_ids)
+    if deleted:
+        invalidate_feed(get_feed_cache("conference"))
+    for post_id in deleted:
+        remove_document(f"conference:{post_id}")
+        purge_response_cache(f"conference:{post_id}")
+    return deleted
+
+def delete_post(post_id):
+    return bool(delete_posts([post_id]))
 
-def update_post(post_id, content, image_urls="", video_url=""):
+def update_post(post_id, cached, content, image_urls="", video_url=""):
+    """cached(목록에 보이던 레코드)와 비교해 바뀐 셀만 기록. 반환: 기록한 셀 수"""
     sheet = get_conference_sheet()
-    data = sheet.get_all_values()
-    for idx, row in enumerate(data):
-        if str(row[0]) == str(post_id):
-            sheet.update_cell(idx + 1, 3, content)
-            sheet.update_cell(idx + 1, 5, image_urls)
-            sheet.update_cell(idx + 1, 6, video_url)
-            return True
-    return False
+    data = {'content': content, 'image_urls': image_urls, 'video_url': video_url}
+    written = update_changed_cells(sheet, post_id, cached, data, POST_COLUMNS)
+    if written:
+        invalidate_feed(get_feed_cache("conference"))
+        purge_response_cache(f"conference:{post_id}")
+        index_document(post_doc({'id': post_id, 'content': content}))
+    return written
 
 def is_valid_url(url):
     if not url:
@@ -184,6 +186,9 @@ else:
         uploaded_images = None
         
         if image_option == "파일 업로드 (imgBB 저장)":
+            dedup_report = get_dedup_report()
+            if dedup_report['uploads_avoided']:
+                st.caption(f"♻️ 중복 업로드 방지: {dedup_report['uploads_avoided']}회 · {format_bytes(dedup_report['bytes_avoided'])} 절약")
             uploaded_images = st.file_uploader(
                 "이미지 파일 선택 (여러 개 선택 가능)", 
                 type=['png', 'jpg', 'jpeg', 'gif'],
@@ -235,13 +240,17 @@ else:
                 
                 if image_option == "파일 업로드 (imgBB 저장)" and uploaded_images:
                     progress = st.progress(0)
-                    for idx, img_file in enumerate(uploaded_images):
-                        uploaded_url = upload_image_to_imgbb(img_file)
-                        if uploaded_url:
-                            final_image_urls.append(uploaded_url)
-                        progress.progress((idx + 1) / len(uploaded_images))
+                    uploaded_urls, failures, report = upload_images(
+                        uploaded_images,
+                        on_progress=lambda done, total: progress.progress(done / total)
+                    )
                     progress.empty()
-                    st.success(f"이미지 {len(final_image_urls)}개 업로드 완료!")
+                    final_image_urls = [url for url in uploaded_urls if url]
+                    for name, message in failures:
+                        st.error(f"이미지 업로드 오류 ({name}): {message}")
+                    st.success(f"이미지 {len(final_image_urls)}개 업로드 완료! (최적화로 {format_bytes(report['saved_bytes'])} 절약)")
+                    if report['dedup_hits']:
+                        st.info(f"중복 이미지 {report['dedup_hits']}개는 기존 URL을 재사용했습니다.")
                 
                 elif image_option == "URL 직접 입력":
                     final_image_urls = image_urls_list
@@ -262,17 +271,62 @@ else:
         
         if st.button("🔄 새로고침"):
             st.cache_data.clear()
+            invalidate_feed(get_feed_cache("conference"))
             st.rerun()
         
-        posts = get_all_posts()
+        col1, col2, col3 = st.columns([3, 2, 1])
+        with col1:
+            search_text = st.text_input("검색", placeholder="내용, 작성자", key="p_list_search")
+        with col2:
+            sort_by = st.selectbox("정렬", options=list(POST_SORTS.keys()), key="p_list_sort")
+        with col3:
+            show_thumbs = st.toggle("썸네일", key="p_list_thumbs")
+        
+        all_posts = load_posts()
+        posts = filter_records(all_posts, search_text, fields=("content", "content_above", "author"))
         
         if not posts:
             st.info("등록된 글이 없습니다.")
         else:
-            posts = sorted(posts, key=lambda x: x['id'], reverse=True)
-            st.markdown(f"**총 {len(posts)}개의 글**")
+            sort_key, sort_reverse = POST_SORTS[sort_by]
+            posts = sort_records(posts, sort_key, reverse=sort_reverse)
+            st.markdown(f"**총 {len(all_posts)}개의 글**")
+            
+            page_items = paged(posts, "p_list", (search_text, sort_by))
+            
+            # 일괄 삭제 (선택은 페이지를 넘겨도 유지)
+            selected = get_selection("p_list")
+            col1, col2, col3 = st.columns([2, 3, 2])
+            with col1:
+                select_page("p_list", [p['id'] for p in page_items])
+            with col2:
+                st.caption(f"{len(selected)}개 선택됨")
+                if selected and st.button("선택 해제", key="p_bulk_clear"):
+                    clear_selection("p_list")
+                    st.rerun()
+            with col3:
+                if st.button("🗑️ 선택 삭제", key="p_bulk_del", disabled=not selected):
+                    st.session_state.p_bulk_confirm = True
+            
+            if selected and st.session_state.get("p_bulk_confirm", False):
+                st.warning(f"선택한 {len(selected)}개 글을 삭제하시겠습니까?")
+                c1, c2 = st.columns(2)
+                with c1:
+                    if st.button("✅ 예", key="p_bulk_yes"):
+                        deleted = delete_posts(sorted(selected))
+                        st.session_state.p_bulk_confirm = False
+                        clear_selection("p_list")
+                        st.cache_data.clear()
+                        st.success(f"{len(deleted)}개 글을 삭제했습니다.")
+                        time.sleep(1)
+                        st.rerun()
+                with c2:
+                    if st.button("❌ 아니오", key="p_bulk_no"):
+                        st.session_state.p_bulk_confirm = False
+                        st.rerun()
+            st.divider()
             
-            for post in posts:
+            for post in page_items:
                 post_id = post['id']
                 content = post.get('content', '') or post.get('content_above', '')
                 is_editing = st.session_state.edit_post_id == post_id
@@ -401,20 +455,22 @@ else:
                                 # 이미지 업로드 처리
                                 if new_image_files:
                                     progress = st.progress(0)
-                                    for idx, img_file in enumerate(new_image_files):
-                                        uploaded_url = upload_image_to_imgbb(img_file)
-                                        if uploaded_url:
-                                            if edit_img_option == "전체 교체 (새로 업로드)":
-                                                final_image_urls.append(uploaded_url)
-                                            else:  # 기존에 추가
-                                                final_image_urls.append(uploaded_url)
-                                        progress.progress((idx + 1) / len(new_image_files))
+                                    uploaded_urls, failures, _ = upload_images(
+                                        new_image_files,
+                                        on_progress=lambda done, total: progress.progress(done / total)
+                                    )
                                     progress.empty()
+                                    final_image_urls.extend(url for url in uploaded_urls if url)
+                                    for name, message in failures:
+                                        st.error(f"이미지 업로드 오류 ({name}): {message}")
                                 
                                 image_urls_str = join_image_urls(final_image_urls)
-                                update_post(post_id, edit_content, image_urls_str, edit_video_url)
+                                written = update_post(post_id, post, edit_content, image_urls_str, edit_video_url)
                                 st.session_state.edit_post_id = None
-                                st.success(f"수정되었습니다! (이미지: {len(final_image_urls)}개)")
+                                if written:
+                                    st.success(f"수정되었습니다! (변경 {written}칸, 이미지: {len(final_image_urls)}개)")
+                                else:
+                                    st.info("변경된 내용이 없습니다.")
                                 st.cache_data.clear()
                                 time.sleep(1)
                                 st.rerun()
@@ -424,7 +480,9 @@ else:
                                 st.rerun()
                     
                     else:
-                        col1, col2, col3 = st.columns([5, 1, 1])
+                        col0, col1, col2, col3 = st.columns([0.5, 5, 1, 1])
+                        with col0:
+                            selection_checkbox("p_list", post_id)
                         with col1:
                             media_icons = []
                             img_str = str(post.get('image_urls', '') or post.get('image_url', '') or post.get('image_name', '') or '')
@@ -437,6 +495,7 @@ else:
                             
                             st.markdown(f"**{content[:50]}{'...' if len(content) > 50 else ''}** {media_str}")
                             st.caption(f"{post['author']} · {post['created_at']}")
+                            thumbnail(parse_image_urls(img_str)[0] if img_count else "", show_thumbs)
                         with col2:
                             if st.button("✏️", key=f"edit_{post_id}"):
                                 st.session_state.edit_post_id = post_id
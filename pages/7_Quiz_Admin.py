@@ -3,8 +3,26 @@ import time
 from datetime import datetime
 import gspread
 from google.oauth2.service_account import Credentials
-import requests
-import base64
+from cache_utils import purge_response_cache
+from search_utils import index_document, remove_document, question_doc
+from image_utils import upload_image_to_imgbb
+from feedback_utils import (
+    find_missing_feedback, load_drafts, save_drafts,
+    get_draft_chain, draft_missing_feedback, build_feedback_updates,
+)
+from llm_utils import get_chat_model, LLMMetricsHandler
+from list_utils import (
+    filter_records, sort_records, paged, thumbnail,
+    get_selection, clear_selection, selection_checkbox, select_page,
+)
+from sheets_utils import delete_rows_by_id, update_column_by_id, update_changed_cells
+from revision_utils import record_revision, revision_history
+from dedup_utils import (
+    DUPLICATE_THRESHOLD, get_duplicate_index, build_duplicate_index,
+    index_question, remove_question, find_duplicates, duplicate_report,
+)
+from import_utils import QUESTION_COLUMNS, iter_file_rows, plan_import, write_import, export_csv, export_xlsx
+from gateway_utils import get_llm_gateway
 
 st.set_page_config(page_title="문제 관리", page_icon="📝")
 
@@ -41,45 +59,6 @@ def get_sheets_client():
     )
     return gspread.authorize(credentials)
 
-# ⭐ imgBB에 이미지 업로드
-def upload_image_to_imgbb(image_file):
-    """imgBB에 이미지 업로드하고 URL 반환"""
-    try:
-        api_key = st.secrets.get("imgbb", {}).get("api_key", "")
-        
-        if not api_key:
-            st.error("imgBB API 키가 설정되지 않았습니다. Streamlit Secrets에 추가해주세요.")
-            return None
-        
-        # 이미지를 base64로 인코딩
-        image_data = base64.b64encode(image_file.read()).decode('utf-8')
-        
-        # imgBB API 호출
-        response = requests.post(
-            "https://api.imgbb.com/1/upload",
-            data={
-                "key": api_key,
-                "image": image_data,
-                "name": image_file.name
-            },
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            if result.get('success'):
-                return result['data']['url']
-            else:
-                st.error(f"업로드 실패: {result.get('error', {}).get('message', '알 수 없는 오류')}")
-                return None
-        else:
-            st.error(f"HTTP 오류: {response.status_code}")
-            return None
-            
-    except Exception as e:
-        st.error(f"이미지 업로드 오류: {e}")
-        return None
-
 def get_questions_sheet():
     client = get_sheets_client()
     sheet_url = st.secrets["google_sheets"]["spreadsheet_url"]
@@ -104,34 +83,106 @@ def add_question(data):
         data['feedback_1'], data['feedback_2'], data['feedback_3'], data['feedback_4'], data['feedback_5'],
         data['difficulty'], data['image_url'], data['video_url'], "윤지환", created_at
     ])
+    index_document(question_doc({**data, 'id': question_id}))
+    index_question({**data, 'id': question_id})
     return question_id
 
 def get_all_questions():
     sheet = get_questions_sheet()
     return sheet.get_all_records()
 
+def get_duplicate_checker():
+    """유사 중복 색인 (처음 한 번만 전체 문제로 만들고 이후에는 등록/수정/삭제 때 갱신)"""
+    index = get_duplicate_index()
+    if not index["built"]:
+        build_duplicate_index(get_all_questions(), index)
+    return index
+
+@st.cache_data(ttl=300)
+def load_questions():
+    """관리 목록용 캐시 (등록/수정/삭제 시 st.cache_data.clear())"""
+    return get_all_questions()
+
+QUESTION_SORTS = {
+    "최신순": (lambda q: q.get('id', ''), True),
+    "오래된순": (lambda q: q.get('id', ''), False),
+    "분과순": (lambda q: list(CATEGORIES).index(q['category']) if q.get('category') in CATEGORIES else 99, False),
+    "난이도 높은순": (lambda q: q.get('difficulty', 0), True),
+}
+
+def delete_questions(question_ids):
+    """여러 문제를 한 번에 삭제 (id 열 읽기 1회 + batch_update 1회). 반환: 삭제한 id 목록"""
+    sheet = get_questions_sheet()
+    deleted = delete_rows_by_id(sheet, question_ids)
+    for question_id in deleted:
+        remove_document(f"quiz:{question_id}")
+        remove_question(question_id)
+        purge_response_cache(f"quiz:{question_id}")
+    return deleted
+
 def delete_question(question_id):
+    return bool(delete_questions([question_id]))
+
+def move_questions(question_ids, category, questions_by_id):
+    """여러 문제의 분과 변경 (B열, batch_update 1회). 반환: 변경한 id 목록"""
     sheet = get_questions_sheet()
-    data = sheet.get_all_values()
-    for idx, row in enumerate(data):
-        if str(row[0]) == str(question_id):
-            sheet.delete_rows(idx + 1)
-            return True
-    return False
+    moved = update_column_by_id(sheet, question_ids, 2, category)
+    for question_id in moved:
+        purge_response_cache(f"quiz:{question_id}")
+        if question_id in questions_by_id:
+            before = questions_by_id[question_id]
+            record_revision("quiz", question_id, before, {'category': category}, st.session_state.user_id)
+            index_document(question_doc({**before, 'category': category}))
+    return moved
 
-def update_question(question_id, data):
+def update_question(question_id, data, cached, op="edit"):
+    """cached(목록에 보이던 레코드)와 비교해 바뀐 셀만 기록 + 수정 이력. 반환: 기록한 셀 수"""
     sheet = get_questions_sheet()
-    all_data = sheet.get_all_values()
-    for idx, row in enumerate(all_data):
-        if str(row[0]) == str(question_id):
-            sheet.update(f'B{idx+1}:M{idx+1}', [[
-                data['category'], data['question'], data['choices'], data['answer'],
-                data['feedback_1'], data['feedback_2'], data['feedback_3'], 
-                data['feedback_4'], data['feedback_5'],
-                data['difficulty'], data['image_url'], data['video_url']
-            ]])
-            return True
-    return False
+    written = update_changed_cells(sheet, question_id, cached, data, QUESTION_COLUMNS)
+    if written:
+        record_revision("quiz", question_id, cached, data, st.session_state.user_id, QUESTION_COLUMNS, op=op)
+        purge_response_cache(f"quiz:{question_id}")
+        index_document(question_doc({**cached, **data, 'id': question_id}))
+        index_question({**cached, **data, 'id': question_id})
+    return written
+
+def revert_question(cached, version):
+    """이력의 버전으로 되돌리기 (되돌리기도 이력으로 남음)"""
+    data = {field: version.get(field, '') for field in QUESTION_COLUMNS[1:13]}  # category..video_url
+    written = update_question(cached['id'], data, cached, op="revert")
+    st.session_state.edit_question_id = None
+    st.cache_data.clear()
+    st.success(f"되돌렸습니다! (변경 {written}칸)" if written else "이미 같은 내용입니다.")
+    time.sleep(1)
+    st.rerun()
+
+def write_approved_feedback(approved):
+    """승인된 피드백 초안을 batch_update 한 번으로 기록 + 수정 이력. 반환: (기록한 셀 수, {question_id: 기록한 필드})"""
+    sheet = get_questions_sheet()
+    data, written = build_feedback_updates(sheet.get_all_values(), approved)
+    if data:
+        sheet.batch_update(data)
+    for question_id, fields in written.items():
+        # 빈 칸만 채우므로 이전 값은 모두 빈 값
+        record_revision("quiz", question_id, {}, fields, st.session_state.user_id, op="bulk")
+        purge_response_cache(f"quiz:{question_id}")
+    return len(data), written
+
+def run_feedback_drafting(questions, workers):
+    """빠진 피드백 초안 일괄 작성 (게이트웨이 대기열을 거쳐 학습자 호출과 공정하게 나눔)"""
+    gateway = get_llm_gateway()
+    user = st.session_state.user_id
+    chain = get_draft_chain(get_chat_model(temperature=0.3, presence_penalty=0)).with_config(
+        callbacks=[LLMMetricsHandler("quiz_admin_feedback", user)]
+    )
+    progress = st.progress(0.0, text="초안 작성 중...")
+    result = draft_missing_feedback(
+        questions, chain, max_workers=workers,
+        on_progress=lambda done, total: progress.progress(done / total, text=f"초안 작성 중... {done}/{total}"),
+        invoke=lambda fn: gateway.call(user, fn),
+    )
+    progress.empty()
+    return result
 
 # ============ UI ============
 st.title("📝 문제 관리")
@@ -161,7 +212,7 @@ if not st.session_state.quiz_admin_authorized:
 else:
     st.success("✅ 관리자 인증됨")
     
-    tab1, tab2 = st.tabs(["➕ 문제 등록", "📋 문제 관리"])
+    tab1, tab2, tab3, tab4 = st.tabs(["➕ 문제 등록", "📋 문제 관리", "🤖 피드백 초안", "📥 가져오기/내보내기"])
     
     # 탭 1: 문제 등록
     with tab1:
@@ -232,7 +283,20 @@ else:
         
         st.markdown("---")
         
-        if st.button("문제 등록", type="primary"):
+        # 유사 중복 확인 (입력할 때마다 색인에서 바로 조회)
+        duplicates = []
+        if question.strip():
+            duplicates = find_duplicates({'question': question, 'choices': choices}, index=get_duplicate_checker())
+        duplicate_ok = True
+        if duplicates:
+            st.warning(f"⚠️ 비슷한 문제가 {len(duplicates)}개 있습니다.")
+            for dup_id, score, dup_question in duplicates[:5]:
+                st.caption(f"유사도 {score:.0%} · {dup_question[:80]} (ID: {dup_id})")
+            # 확인은 보고 있던 유사 문제 목록에만 적용 (목록이 바뀌면 다시 확인)
+            duplicate_ok = st.checkbox("중복이 아닌 것을 확인했습니다",
+                                       key="dup_confirm_" + "_".join(sorted(d[0] for d in duplicates)))
+        
+        if st.button("문제 등록", type="primary", disabled=not duplicate_ok):
             if question.strip() and choices.strip() and answer.strip():
                 final_image_url = image_url
                 
@@ -261,6 +325,8 @@ else:
                     'video_url': video_url
                 }
                 question_id = add_question(data)
+                for name in [k for k in st.session_state if str(k).startswith("dup_confirm_")]:
+                    del st.session_state[name]
                 st.success(f"문제가 등록되었습니다! (ID: {question_id})")
                 st.balloons()
                 st.cache_data.clear()
@@ -271,24 +337,96 @@ else:
     with tab2:
         st.subheader("등록된 문제 목록")
         
-        filter_cat = st.selectbox("분과 필터", options=["All"] + list(CATEGORIES.keys()),
-                                  format_func=lambda x: "전체" if x == "All" else f"{CATEGORIES[x]} ({x})")
+        col1, col2 = st.columns(2)
+        with col1:
+            filter_cat = st.selectbox("분과 필터", options=["All"] + list(CATEGORIES.keys()),
+                                      format_func=lambda x: "전체" if x == "All" else f"{CATEGORIES[x]} ({x})")
+        with col2:
+            search_text = st.text_input("검색", placeholder="문제, 보기, 정답", key="q_list_search")
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            sort_by = st.selectbox("정렬", options=list(QUESTION_SORTS.keys()), key="q_list_sort")
+        with col2:
+            show_thumbs = st.toggle("썸네일", key="q_list_thumbs")
         
-        questions = get_all_questions()
+        questions = filter_records(
+            load_questions(), search_text, fields=("question", "choices", "answer"),
+            predicate=None if filter_cat == "All" else (lambda q: q.get('category') == filter_cat)
+        )
+        sort_key, sort_reverse = QUESTION_SORTS[sort_by]
+        questions = sort_records(questions, sort_key, reverse=sort_reverse)
         
-        if filter_cat != "All":
-            questions = [q for q in questions if q.get('category') == filter_cat]
+        with st.expander("🔁 유사 중복 문제 보고서"):
+            threshold = st.slider("유사도 기준", 0.5, 0.95, DUPLICATE_THRESHOLD, 0.05, key="dup_threshold")
+            if st.button("문제 은행 전체 검사", key="dup_report"):
+                index = get_duplicate_checker()
+                report = duplicate_report(threshold, index)
+                if not report:
+                    st.success("유사 중복 문제가 없습니다.")
+                else:
+                    st.caption(f"{len(report)}개 묶음, {sum(len(g['ids']) for g in report)}개 문제")
+                    for group in report:
+                        best = group['pairs'][0][2]
+                        st.markdown(f"**{len(group['ids'])}개 문제** · 최고 유사도 {best:.0%}")
+                        for dup_id in group['ids']:
+                            st.caption(f"ID {dup_id} · {index['questions'].get(dup_id, '')[:80]}")
         
         if not questions:
             st.info("등록된 문제가 없습니다.")
         else:
-            for q in questions:
+            page_items = paged(questions, "q_list", (filter_cat, search_text, sort_by))
+            
+            # 일괄 작업 (선택은 페이지를 넘겨도 유지)
+            selected = get_selection("q_list")
+            col1, col2, col3, col4 = st.columns([2, 2, 3, 2])
+            with col1:
+                select_page("q_list", [q['id'] for q in page_items])
+            with col2:
+                st.caption(f"{len(selected)}개 선택됨")
+                if selected and st.button("선택 해제", key="q_bulk_clear"):
+                    clear_selection("q_list")
+                    st.rerun()
+            with col3:
+                move_to = st.selectbox("분과 이동", options=list(CATEGORIES.keys()), key="q_bulk_cat",
+                                       format_func=lambda x: CATEGORIES[x], label_visibility="collapsed")
+                if st.button("📂 선택 분과 이동", key="q_bulk_move", disabled=not selected):
+                    questions_by_id = {str(q['id']): q for q in load_questions()}
+                    moved = move_questions(sorted(selected), move_to, questions_by_id)
+                    clear_selection("q_list")
+                    st.cache_data.clear()
+                    st.success(f"{len(moved)}개 문제를 '{CATEGORIES[move_to]}'(으)로 옮겼습니다.")
+                    time.sleep(1)
+                    st.rerun()
+            with col4:
+                if st.button("🗑️ 선택 삭제", key="q_bulk_del", disabled=not selected):
+                    st.session_state.q_bulk_confirm = True
+            
+            if selected and st.session_state.get("q_bulk_confirm", False):
+                st.warning(f"선택한 {len(selected)}개 문제를 삭제하시겠습니까?")
+                c1, c2 = st.columns(2)
+                with c1:
+                    if st.button("✅ 예", key="q_bulk_yes"):
+                        deleted = delete_questions(sorted(selected))
+                        st.session_state.q_bulk_confirm = False
+                        clear_selection("q_list")
+                        st.cache_data.clear()
+                        st.success(f"{len(deleted)}개 문제를 삭제했습니다.")
+                        time.sleep(1)
+                        st.rerun()
+                with c2:
+                    if st.button("❌ 아니오", key="q_bulk_no"):
+                        st.session_state.q_bulk_confirm = False
+                        st.rerun()
+            st.divider()
+            
+            for q in page_items:
                 q_id = q['id']
                 is_editing = st.session_state.edit_question_id == q_id
                 
                 with st.container():
                     if is_editing:
                         st.markdown("### ✏️ 문제 수정")
+                        revision_history("quiz", q, lambda version, q=q: revert_question(q, version), key=f"q_hist_{q_id}")
                         
                         edit_cat = st.selectbox("분과", options=list(CATEGORIES.keys()),
                                                index=list(CATEGORIES.keys()).index(q['category']) if q['category'] in CATEGORIES else 0,
@@ -411,9 +549,9 @@ else:
                                     'image_url': final_image_url,
                                     'video_url': edit_video_url
                                 }
-                                update_question(q_id, update_data)
+                                written = update_question(q_id, update_data, q)
                                 st.session_state.edit_question_id = None
-                                st.success("수정되었습니다!")
+                                st.success(f"수정되었습니다! (변경 {written}칸)" if written else "변경된 내용이 없습니다.")
                                 st.cache_data.clear()
                                 time.sleep(1)
                                 st.rerun()
@@ -423,7 +561,9 @@ else:
                                 st.rerun()
                     
                     else:
-                        col1, col2, col3 = st.columns([5, 1, 1])
+                        col0, col1, col2, col3 = st.columns([0.5, 5, 1, 1])
+                        with col0:
+                            selection_checkbox("q_list", q_id)
                         with col1:
                             cat_name = CATEGORIES.get(q['category'], q['category'])
                             st.markdown(f"**[{cat_name}]** {q['question'][:50]}...")
@@ -434,6 +574,7 @@ else:
                                 media_info.append("🎬")
                             media_str = " ".join(media_info) if media_info else ""
                             st.caption(f"정답: {q['answer']} | 난이도: {q.get('difficulty', '-')} {media_str}")
+                            thumbnail(q.get('image_url'), show_thumbs)
                         with col2:
                             if st.button("✏️", key=f"edit_{q_id}"):
                                 st.session_state.edit_question_id = q_id
@@ -458,6 +599,158 @@ else:
                     
                     st.divider()
     
+    # 탭 3: 비어 있는 피드백 AI 초안
+    with tab3:
+        st.subheader("보기별 피드백 일괄 작성")
+        
+        all_questions = load_questions()
+        missing = find_missing_feedback(all_questions)
+        drafts = load_drafts()
+        pending = list(drafts.items())
+        st.caption(f"피드백이 빠진 문제 {len(missing)}개 · 검토 대기 초안 {len(pending)}개")
+        
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            workers = st.slider("동시 작성 수", min_value=1, max_value=8, value=4)
+        with col2:
+            if st.button("🤖 초안 작성", type="primary", disabled=not missing):
+                result = run_feedback_drafting(all_questions, workers)
+                st.success(f"작성 {result['drafted']} · 건너뜀 {result['skipped']} · 실패 {result['failed']}")
+                st.rerun()
+        
+        if pending:
+            st.markdown("---")
+            st.markdown("**초안 검토** (수정 후 승인한 항목만 시트에 기록됩니다)")
+            questions_by_id = {str(q['id']): q for q in all_questions}
+            review = pending[:20]
+            
+            for qid, draft in review:
+                with st.expander(f"{draft['question'][:60]}", expanded=False):
+                    q = questions_by_id.get(qid, {})
+                    st.caption(f"정답: {q.get('answer', '-')} | 보기: {q.get('choices', '-')}")
+                    st.checkbox("승인", value=True, key=f"fb_ok_{qid}")
+                    for field, value in draft['fields'].items():
+                        st.text_area(field.replace("feedback_", "보기 ") + " 피드백", value=value,
+                                     height=80, key=f"fb_draft_{qid}_{field}")
+            
+            if len(pending) > len(review):
+                st.caption(f"나머지 {len(pending) - len(review)}개는 저장 후 이어서 표시됩니다.")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("✅ 승인 항목 저장", type="primary"):
+                    approved = {}
+                    for qid, draft in review:
+                        if st.session_state.get(f"fb_ok_{qid}"):
+                            approved[qid] = {
+                                field: st.session_state.get(f"fb_draft_{qid}_{field}", value).strip()
+                                for field, value in draft['fields'].items()
+                            }
+                    with st.spinner("시트에 기록 중..."):
+                        cells, written = write_approved_feedback(approved)
+                    for qid in written:
+                        if qid in questions_by_id:
+                            index_document(question_doc({**questions_by_id[qid], **written[qid]}))
+                    # 그 사이 사람이 모두 채워 기록할 칸이 없던 초안도 검토가 끝났으므로 정리
+                    for qid in approved:
+                        drafts.pop(qid, None)
+                    save_drafts(drafts)
+                    st.success(f"{len(written)}개 문제, {cells}개 셀을 한 번에 기록했습니다.")
+                    st.cache_data.clear()
+                    time.sleep(1)
+                    st.rerun()
+            with col2:
+                if st.button("🗑️ 미승인 초안 버리기"):
+                    for qid, draft in review:
+                        if not st.session_state.get(f"fb_ok_{qid}"):
+                            drafts.pop(qid, None)
+                    save_drafts(drafts)
+                    st.rerun()
+    
+    # 탭 4: 일괄 가져오기 / 내보내기
+    with tab4:
+        st.subheader("문제 일괄 가져오기")
+        st.caption("xlsx/CSV 첫 행은 헤더 (question, choices, answer 필수 · category, difficulty, "
+                   "feedback_1..5 또는 1..5, image_url 또는 image, video_url 또는 video 선택)")
+        
+        import_file = st.file_uploader("파일 선택", type=['xlsx', 'csv'], key="import_file")
+        default_cat = st.selectbox("분과가 없는 행의 분과", options=list(CATEGORIES.keys()),
+                                   format_func=lambda x: f"{CATEGORIES[x]} ({x})", key="import_default_cat")
+        
+        if st.button("🔍 미리보기 (dry-run)", disabled=import_file is None):
+            with st.spinner("파일 검사 중..."):
+                st.session_state.import_plan = plan_import(
+                    iter_file_rows(import_file, import_file.name),
+                    get_all_questions(), CATEGORIES, default_category=default_cat
+                )
+        
+        plan = st.session_state.get("import_plan")
+        if plan:
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("전체 행", plan['total'])
+            col2.metric("추가", len(plan['added']))
+            col3.metric("중복 (건너뜀)", len(plan['duplicates']))
+            col4.metric("오류", len(plan['errors']))
+            if plan.get('unknown_columns'):
+                st.warning(f"가져오지 않는 컬럼: {', '.join(plan['unknown_columns'])}")
+            
+            if plan['added']:
+                with st.expander(f"추가될 문제 {len(plan['added'])}개", expanded=True):
+                    st.dataframe(
+                        [{"분과": d['category'], "문제": d['question'][:60], "정답": d['answer'],
+                          "난이도": d['difficulty']} for d in plan['added'][:200]],
+                        use_container_width=True
+                    )
+            if plan['duplicates']:
+                with st.expander(f"중복 {len(plan['duplicates'])}개"):
+                    st.dataframe(plan['duplicates'], use_container_width=True)
+            if plan['errors']:
+                with st.expander(f"오류 {len(plan['errors'])}개", expanded=True):
+                    st.dataframe(
+                        [{"행": e['line'], "문제": e['question'], "오류": ", ".join(e['errors'])} for e in plan['errors']],
+                        use_container_width=True
+                    )
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button(f"📥 {len(plan['added'])}개 가져오기", type="primary", disabled=not plan['added']):
+                    progress = st.progress(0.0, text="기록 중...")
+                    calls = write_import(
+                        get_questions_sheet(), plan['rows'],
+                        on_progress=lambda done, total: progress.progress(done / total, text=f"기록 중... {done}/{total}")
+                    )
+                    for data in plan['added']:
+                        record_revision("quiz", data['id'], {}, data, st.session_state.user_id,
+                                        QUESTION_COLUMNS[1:13], op="import")
+                        index_document(question_doc(data))
+                        index_question(data)
+                    st.success(f"{len(plan['added'])}개 문제를 {calls}번의 요청으로 등록했습니다.")
+                    st.session_state.import_plan = None
+                    st.cache_data.clear()
+            with col2:
+                if st.button("취소", key="import_cancel"):
+                    st.session_state.import_plan = None
+                    st.rerun()
+        
+        st.markdown("---")
+        st.subheader("문제 내보내기")
+        export_format = st.radio("형식", ["xlsx", "csv"], horizontal=True, key="export_format")
+        if st.button("📤 파일 만들기"):
+            with st.spinner("내보내는 중..."):
+                all_values = get_questions_sheet().get_all_values()
+                st.session_state.export_file = (
+                    export_format,
+                    export_xlsx(all_values) if export_format == "xlsx" else export_csv(all_values),
+                    max(len(all_values) - 1, 0),
+                )
+        if st.session_state.get("export_file"):
+            fmt, payload, count = st.session_state.export_file
+            st.download_button(
+                f"⬇️ questions.{fmt} ({count}문제)", data=payload,
+                file_name=f"questions_{datetime.now().strftime('%Y%m%d')}.{fmt}",
+                mime="text/csv" if fmt == "csv" else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
+    
     st.divider()
     if st.button("로그아웃"):
         st.session_state.quiz_admin_authorized = False
@@ -3,11 +3,24 @@ import time
 from datetime import datetime
 import gspread
 from google.oauth2.service_account import Credentials
-import requests
-import base64
+from cache_utils import purge_response_cache
+from list_utils import (
+    filter_records, sort_records, paged, thumbnail,
+    get_selection, clear_selection, selection_checkbox, select_page,
+)
+from sheets_utils import delete_rows_by_id, update_column_by_id, update_changed_cells, update_values_by_id
+from revision_utils import record_revision, revision_history
+from search_utils import index_document, remove_document, material_doc
+from image_utils import upload_image_to_imgbb
 
 st.set_page_config(page_title="검사자료 관리", page_icon="🔬")
 
+# neurotest 시트 헤더
+MATERIAL_COLUMNS = [
+    "id", "category", "title", "content", "image_url",
+    "video_url", "author", "created_at", "order", "type"
+]
+
 # 검사 카테고리 정의
 NEURO_TESTS = {
     "NCS": "1. 신경전도검사",
@@ -42,45 +55,6 @@ def get_sheets_client():
     )
     return gspread.authorize(credentials)
 
-# ⭐ imgBB에 이미지 업로드
-def upload_image_to_imgbb(image_file):
-    """imgBB에 이미지 업로드하고 URL 반환"""
-    try:
-        api_key = st.secrets.get("imgbb", {}).get("api_key", "")
-        
-        if not api_key:
-            st.error("imgBB API 키가 설정되지 않았습니다.")
-            return None
-        
-        # 이미지를 base64로 인코딩
-        image_data = base64.b64encode(image_file.read()).decode('utf-8')
-        
-        # imgBB API 호출
-        response = requests.post(
-            "https://api.imgbb.com/1/upload",
-            data={
-                "key": api_key,
-                "image": image_data,
-                "name": image_file.name
-            },
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            if result.get('success'):
-                return result['data']['url']
-            else:
-                st.error(f"업로드 실패: {result.get('error', {}).get('message', '알 수 없는 오류')}")
-                return None
-        else:
-            st.error(f"HTTP 오류: {response.status_code}")
-            return None
-            
-    except Exception as e:
-        st.error(f"이미지 업로드 오류: {e}")
-        return None
-
 def get_neurotest_sheet():
     client = get_sheets_client()
     sheet_url = st.secrets["google_sheets"]["spreadsheet_url"]
@@ -89,10 +63,7 @@ def get_neurotest_sheet():
         return spreadsheet.worksheet("neurotest")
     except:
         worksheet = spreadsheet.add_worksheet(title="neurotest", rows=1000, cols=10)
-        worksheet.append_row([
-            "id", "category", "title", "content", "image_url",
-            "video_url", "author", "created_at", "order", "type"
-        ])
+        worksheet.append_row(MATERIAL_COLUMNS)
         return worksheet
 
 def add_material(data):
@@ -103,32 +74,88 @@ def add_material(data):
         material_id, data['category'], data['title'], data['content'], data['image_url'],
         data['video_url'], "윤지환", created_at, data['order'], data['type']
     ])
+    index_document(material_doc({**data, 'id': material_id}))
     return material_id
 
 def get_all_materials():
     sheet = get_neurotest_sheet()
     return sheet.get_all_records()
 
+@st.cache_data(ttl=300)
+def load_materials():
+    """관리 목록용 캐시 (등록/수정/삭제 시 st.cache_data.clear())"""
+    return get_all_materials()
+
+MATERIAL_SORTS = {
+    "검사/순서": (lambda m: (list(NEURO_TESTS).index(m['category']) if m.get('category') in NEURO_TESTS else 99) * 100000
+                 + (m.get('order') if isinstance(m.get('order'), (int, float)) else 999), False),
+    "최신순": (lambda m: m.get('id', ''), True),
+    "제목순": (lambda m: str(m.get('title', '')), False),
+}
+
+def delete_materials(material_ids):
+    """여러 자료를 한 번에 삭제 (id 열 읽기 1회 + batch_update 1회). 반환: 삭제한 id 목록"""
+    sheet = get_neurotest_sheet()
+    deleted = delete_rows_by_id(sheet, material_ids)
+    for material_id in deleted:
+        remove_document(f"neurotest:{material_id}")
+        purge_response_cache(f"neurotest:{material_id}")
+    return deleted
+
 def delete_material(material_id):
+    return bool(delete_materials([material_id]))
+
+def move_materials(material_ids, category, materials_by_id):
+    """여러 자료의 검사 분류 변경 (B열, batch_update 1회). 반환: 변경한 id 목록"""
     sheet = get_neurotest_sheet()
-    data = sheet.get_all_values()
-    for idx, row in enumerate(data):
-        if str(row[0]) == str(material_id):
-            sheet.delete_rows(idx + 1)
-            return True
-    return False
+    moved = update_column_by_id(sheet, material_ids, 2, category)
+    for material_id in moved:
+        purge_response_cache(f"neurotest:{material_id}")
+        if material_id in materials_by_id:
+            before = materials_by_id[material_id]
+            record_revision("neurotest", material_id, before, {'category': category}, st.session_state.user_id)
+            index_document(material_doc({**before, 'category': category}))
+    return moved
 
-def update_material(material_id, data):
+def update_material(material_id, data, cached, op="edit"):
+    """cached(목록에 보이던 레코드)와 비교해 바뀐 셀만 기록 + 수정 이력. 반환: 기록한 셀 수"""
     sheet = get_neurotest_sheet()
-    all_data = sheet.get_all_values()
-    for idx, row in enumerate(all_data):
-        if str(row[0]) == str(material_id):
-            sheet.update(f'B{idx+1}:J{idx+1}', [[
-                data['category'], data['title'], data['content'], data['image_url'],
-                data['video_url'], row[6], row[7], data['order'], data['type']
-            ]])
-            return True
-    return False
+    written = update_changed_cells(sheet, material_id, cached, data, MATERIAL_COLUMNS)
+    if written:
+        record_revision("neurotest", material_id, cached, data, st.session_state.user_id, MATERIAL_COLUMNS, op=op)
+        purge_response_cache(f"neurotest:{material_id}")
+        index_document(material_doc({**cached, **data, 'id': material_id}))
+    return written
+
+def save_material_order(ordered_ids, materials_by_id):
+    """
+    검사 하나의 자료 순서를 1, 2, 3...으로 다시 매겨 batch_update 1회로 기록 (순서가 바뀐 자료만).
+    반환: 변경한 id 목록
+    """
+    orders = {
+        material_id: position
+        for position, material_id in enumerate(ordered_ids, start=1)
+        if str(materials_by_id[material_id].get('order', '')) != str(position)
+    }
+    if not orders:
+        return []
+    sheet = get_neurotest_sheet()
+    changed = update_values_by_id(sheet, orders, MATERIAL_COLUMNS.index("order") + 1)
+    for material_id in changed:
+        record_revision("neurotest", material_id, materials_by_id[material_id],
+                        {'order': orders[material_id]}, st.session_state.user_id)
+    return changed
+
+def revert_material(cached, version):
+    """이력의 버전으로 되돌리기 (되돌리기도 이력으로 남음)"""
+    data = {field: version.get(field, '') for field in ("category", "title", "content", "image_url",
+                                                        "video_url", "order", "type")}
+    written = update_material(cached['id'], data, cached, op="revert")
+    st.session_state.edit_material_id = None
+    st.cache_data.clear()
+    st.success(f"되돌렸습니다! (변경 {written}칸)" if written else "이미 같은 내용입니다.")
+    time.sleep(1)
+    st.rerun()
 
 # ============ UI ============
 st.title("🔬 검사자료 관리")
@@ -159,7 +186,7 @@ if not st.session_state.neurotest_admin_authorized:
 else:
     st.success("✅ 관리자 인증됨")
     
-    tab1, tab2 = st.tabs(["➕ 자료 등록", "📋 자료 관리"])
+    tab1, tab2, tab3 = st.tabs(["➕ 자료 등록", "📋 자료 관리", "🔀 순서 편집"])
     
     # 탭 1: 자료 등록
     with tab1:
@@ -276,30 +303,86 @@ else:
         st.subheader("등록된 자료 목록")
         
         # 검사 필터
-        filter_cat = st.selectbox(
-            "검사 필터", 
-            options=["All"] + list(NEURO_TESTS.keys()),
-            format_func=lambda x: "전체" if x == "All" else f"{NEURO_TESTS[x]} ({x})"
-        )
-        
-        materials = get_all_materials()
+        col1, col2 = st.columns(2)
+        with col1:
+            filter_cat = st.selectbox(
+                "검사 필터", 
+                options=["All"] + list(NEURO_TESTS.keys()),
+                format_func=lambda x: "전체" if x == "All" else f"{NEURO_TESTS[x]} ({x})"
+            )
+        with col2:
+            search_text = st.text_input("검색", placeholder="제목, 내용", key="m_list_search")
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            sort_by = st.selectbox("정렬", options=list(MATERIAL_SORTS.keys()), key="m_list_sort")
+        with col2:
+            show_thumbs = st.toggle("썸네일", key="m_list_thumbs")
         
-        if filter_cat != "All":
-            materials = [m for m in materials if m.get('category') == filter_cat]
+        materials = filter_records(
+            load_materials(), search_text, fields=("title", "content"),
+            predicate=None if filter_cat == "All" else (lambda m: m.get('category') == filter_cat)
+        )
         
         if not materials:
             st.info("등록된 자료가 없습니다.")
         else:
             # 정렬
-            materials = sorted(materials, key=lambda x: (x.get('category', ''), x.get('order', 999)))
+            sort_key, sort_reverse = MATERIAL_SORTS[sort_by]
+            materials = sort_records(materials, sort_key, reverse=sort_reverse)
+            
+            page_items = paged(materials, "m_list", (filter_cat, search_text, sort_by))
+            
+            # 일괄 작업 (선택은 페이지를 넘겨도 유지)
+            selected = get_selection("m_list")
+            col1, col2, col3, col4 = st.columns([2, 2, 3, 2])
+            with col1:
+                select_page("m_list", [m['id'] for m in page_items])
+            with col2:
+                st.caption(f"{len(selected)}개 선택됨")
+                if selected and st.button("선택 해제", key="m_bulk_clear"):
+                    clear_selection("m_list")
+                    st.rerun()
+            with col3:
+                move_to = st.selectbox("검사 이동", options=list(NEURO_TESTS.keys()), key="m_bulk_cat",
+                                       format_func=lambda x: NEURO_TESTS[x], label_visibility="collapsed")
+                if st.button("📂 선택 검사 이동", key="m_bulk_move", disabled=not selected):
+                    materials_by_id = {str(m['id']): m for m in load_materials()}
+                    moved = move_materials(sorted(selected), move_to, materials_by_id)
+                    clear_selection("m_list")
+                    st.cache_data.clear()
+                    st.success(f"{len(moved)}개 자료를 '{NEURO_TESTS[move_to]}'(으)로 옮겼습니다.")
+                    time.sleep(1)
+                    st.rerun()
+            with col4:
+                if st.button("🗑️ 선택 삭제", key="m_bulk_del", disabled=not selected):
+                    st.session_state.m_bulk_confirm = True
             
-            for m in materials:
+            if selected and st.session_state.get("m_bulk_confirm", False):
+                st.warning(f"선택한 {len(selected)}개 자료를 삭제하시겠습니까?")
+                c1, c2 = st.columns(2)
+                with c1:
+                    if st.button("✅ 예", key="m_bulk_yes"):
+                        deleted = delete_materials(sorted(selected))
+                        st.session_state.m_bulk_confirm = False
+                        clear_selection("m_list")
+                        st.cache_data.clear()
+                        st.success(f"{len(deleted)}개 자료를 삭제했습니다.")
+                        time.sleep(1)
+                        st.rerun()
+                with c2:
+                    if st.button("❌ 아니오", key="m_bulk_no"):
+                        st.session_state.m_bulk_confirm = False
+                        st.rerun()
+            st.divider()
+            
+            for m in page_items:
                 m_id = m['id']
                 is_editing = st.session_state.edit_material_id == m_id
                 
                 with st.container():
                     if is_editing:
                         st.markdown("### ✏️ 자료 수정")
+                        revision_history("neurotest", m, lambda version, m=m: revert_material(m, version), key=f"m_hist_{m_id}")
                         
                         edit_cat = st.selectbox(
                             "검사 종류", 
@@ -420,10 +503,10 @@ else:
                                     'order': edit_order,
                                     'type': edit_type
                                 }
-                                update_material(m_id, update_data)
+                                written = update_material(m_id, update_data, m)
                                 st.session_state.edit_material_id = None
                                 st.cache_data.clear()
-                                st.success("수정되었습니다!")
+                                st.success(f"수정되었습니다! (변경 {written}칸)" if written else "변경된 내용이 없습니다.")
                                 time.sleep(1)
                                 st.rerun()
                         with col2:
@@ -432,7 +515,9 @@ else:
                                 st.rerun()
                     
                     else:
-                        col1, col2, col3 = st.columns([5, 1, 1])
+                        col0, col1, col2, col3 = st.columns([0.5, 5, 1, 1])
+                        with col0:
+                            selection_checkbox("m_list", m_id)
                         with col1:
                             cat_name = NEURO_TESTS.get(m['category'], m['category'])
                             type_emoji = {"lecture": "📚", "case": "🏥", "reference": "📖", "video": "🎬"}.get(m.get('type', ''), "📄")
@@ -446,6 +531,7 @@ else:
                             
                             st.markdown(f"**[{cat_name}]** {type_emoji} {m['title'][:50]}{'...' if len(m['title']) > 50 else ''}")
                             st.caption(f"순서: {m.get('order', '-')} | 등록: {m.get('created_at', '-')} {media_str}")
+                            thumbnail(m.get('image_url'), show_thumbs)
                         with col2:
                             if st.button("✏️", key=f"edit_{m_id}"):
                                 st.session_state.edit_material_id = m_id
@@ -470,6 +556,63 @@ else:
                     
                     st.divider()
     
+    # 탭 3: 검사별 순서 일괄 편집 (저장은 batch_update 1회)
+    with tab3:
+        st.subheader("검사별 자료 순서")
+        
+        reorder_cat = st.selectbox("검사", options=list(NEURO_TESTS.keys()), key="reorder_cat",
+                                   format_func=lambda x: NEURO_TESTS[x])
+        sort_key, _ = MATERIAL_SORTS["검사/순서"]
+        cat_materials = sort_records([m for m in load_materials() if m.get('category') == reorder_cat], sort_key)
+        materials_by_id = {str(m['id']): m for m in cat_materials}
+        
+        # 편집 중인 순서 (자료가 추가/삭제되면 시트 순서로 다시 시작)
+        state_key = f"reorder_{reorder_cat}"
+        if sorted(st.session_state.get(state_key, [])) != sorted(materials_by_id):
+            st.session_state[state_key] = list(materials_by_id)
+        ordered = st.session_state[state_key]
+        
+        if not ordered:
+            st.info("등록된 자료가 없습니다.")
+        else:
+            for position, material_id in enumerate(ordered):
+                m = materials_by_id[material_id]
+                col1, col2, col3, col4, col5 = st.columns([0.6, 6, 0.6, 0.6, 0.6])
+                with col1:
+                    st.markdown(f"**{position + 1}.**")
+                with col2:
+                    moved = " 🔸" if str(m.get('order', '')) != str(position + 1) else ""
+                    st.markdown(f"{m.get('title', '')[:60]}{moved}")
+                with col3:
+                    if st.button("⏫", key=f"reorder_top_{material_id}", disabled=position == 0, help="맨 위로"):
+                        ordered.insert(0, ordered.pop(position))
+                        st.rerun()
+                with col4:
+                    if st.button("⬆️", key=f"reorder_up_{material_id}", disabled=position == 0):
+                        ordered[position - 1], ordered[position] = ordered[position], ordered[position - 1]
+                        st.rerun()
+                with col5:
+                    if st.button("⬇️", key=f"reorder_down_{material_id}", disabled=position == len(ordered) - 1):
+                        ordered[position + 1], ordered[position] = ordered[position], ordered[position + 1]
+                        st.rerun()
+            
+            pending = sum(1 for i, material_id in enumerate(ordered, start=1)
+                          if str(materials_by_id[material_id].get('order', '')) != str(i))
+            st.caption(f"순서가 바뀔 자료 {pending}개 (🔸)")
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("💾 순서 저장", type="primary", disabled=not pending, key="reorder_save"):
+                    changed = save_material_order(ordered, materials_by_id)
+                    del st.session_state[state_key]
+                    st.cache_data.clear()
+                    st.success(f"{len(changed)}개 자료의 순서를 저장했습니다.")
+                    time.sleep(1)
+                    st.rerun()
+            with col2:
+                if st.button("↩️ 되돌리기", disabled=not pending, key="reorder_reset"):
+                    del st.session_state[state_key]
+                    st.rerun()
+    
     st.divider()
     if st.button("로그아웃"):
         st.session_state.neurotest_admin_authorized = False
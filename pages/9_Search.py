@@ -0,0 +1,173 @@
+import streamlit as st
+import pandas as pd
+import time
+from datetime import datetime
+import gspread
+from google.oauth2.service_account import Credentials
+
+from search_utils import get_search_index, build_search_index, search
+from list_utils import sort_by_order
+
+st.set_page_config(page_title="검색", page_icon="🔍")
+
+CATEGORIES = {
+    "Approach": "1. 신경계질환의 접근",
+    "Critical Care": "2. 의식장애와 중환자관리",
+    "Stroke": "3. 뇌혈관질환",
+    "Movement": "4. 이상운동",
+    "Neuromuscular": "5. 신경근육",
+    "Demyelinating": "6. 탈수초성",
+    "CNS Infection": "7. 뇌감염질환",
+    "Seizure": "8. 경련",
+    "Dementia": "9. 치매",
+    "Headache": "10. 두통"
+}
+
+NEURO_TESTS = {
+    "NCS": "1. 신경전도검사",
+    "EMG": "2. 침근전도검사",
+    "EP": "3. 유발전위검사",
+    "ANS": "4. 자율신경계기능검사",
+    "EEG": "5. 뇌파",
+    "TCD": "6. 뇌혈류초음파",
+    "Carotid": "7. 경동맥초음파",
+    "VOG_VNG": "8. VOG & VNG",
+    "SNSB": "9. SNSB",
+    "Gait": "10. 보행검사"
+}
+
+KIND_LABELS = {
+    "quiz": "🧠 문제",
+    "neurotest": "🔬 검사자료",
+    "conference": "🏥 컨퍼런스",
+}
+
+def require_login():
+    if 'user_id' not in st.session_state or not st.session_state.user_id:
+        st.warning("등록이 필요합니다")
+        time.sleep(3)
+        st.switch_page("app.py")
+
+require_login()
+
+# Google Sheets 연결
+def get_sheets_client():
+    scopes = [
+        "https://www.googleapis.com/auth/spreadsheets",
+        "https://www.googleapis.com/auth/drive"
+    ]
+    credentials = Credentials.from_service_account_info(
+        st.secrets["gcp_service_account"],
+        scopes=scopes
+    )
+    return gspread.authorize(credentials)
+
+@st.cache_data(ttl=300)
+def load_records(worksheet_name):
+    try:
+        client = get_sheets_client()
+        sheet_url = st.secrets["google_sheets"]["spreadsheet_url"]
+        return client.open_by_url(sheet_url).worksheet(worksheet_name).get_all_records()
+    except:
+        return []
+
+def ensure_index(rebuild=False):
+    index = get_search_index()
+    if rebuild or not index["built"]:
+        with st.spinner("검색 색인을 만드는 중..."):
+            build_search_index(
+                load_records("questions"),
+                load_records("neurotest"),
+                load_records("conference"),
+            )
+    return index
+
+def open_question(doc):
+    """Quiz 페이지의 해당 분과/문제 번호로 이동"""
+    questions = [q for q in load_records("questions") if q.get('category') == doc["category"]]
+    ids = [str(q.get('id', '')) for q in questions]
+    if doc["item_id"] not in ids:
+        st.warning("문제를 찾을 수 없습니다. 색인을 새로고침해주세요.")
+        return
+    st.session_state.selected_category = doc["category"]
+    st.session_state.qid = ids.index(doc["item_id"]) + 1
+    st.session_state.submitted = False
+    st.session_state.selected = None
+    st.session_state.feedback_given = False
+    st.session_state.is_correct = None
+    st.session_state.messages = []
+    st.session_state.start_time = datetime.now()
+    st.switch_page("pages/1_Quiz.py")
+
+def open_material(doc):
+    """검사자료 페이지의 해당 자료로 이동 (자료 페이지와 같은 정렬 기준)"""
+    df = pd.DataFrame(load_records("neurotest"))
+    if df.empty:
+        return
+    filtered = sort_by_order(df[df['category'] == doc["category"]])
+    ids = [str(i) for i in filtered['id'].tolist()]
+    if doc["item_id"] not in ids:
+        st.warning("자료를 찾을 수 없습니다. 색인을 새로고침해주세요.")
+        return
+    st.session_state.selected_neurotest = doc["category"]
+    st.session_state.neurotest_item_idx = ids.index(doc["item_id"])
+    st.session_state.neurotest_messages = []
+    st.switch_page("pages/2_임신생검사 및 SNSB.py")
+
+def open_post(doc):
+    st.session_state.conference_focus = doc["item_id"]
+    st.switch_page("pages/3_Morning_Conference.py")
+
+# ============ UI ============
+st.title("🔍 검색")
+
+col1, col2 = st.columns([6, 1])
+with col1:
+    query = st.text_input("검색어", placeholder="예: Miller Fisher, 안진, 뇌파 극파...", label_visibility="collapsed")
+with col2:
+    if st.button("🔄 색인"):
+        st.cache_data.clear()
+        ensure_index(rebuild=True)
+        st.rerun()
+
+kinds = st.multiselect(
+    "검색 범위",
+    options=list(KIND_LABELS.keys()),
+    default=list(KIND_LABELS.keys()),
+    format_func=lambda x: KIND_LABELS[x],
+    label_visibility="collapsed"
+)
+
+index = ensure_index()
+
+if query.strip():
+    start = time.perf_counter()
+    results = search(query, limit=30, kinds=kinds)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    st.caption(f"검색 결과 {len(results)}개 · {elapsed_ms:.1f}ms · 전체 {len(index['docs'])}개 문서")
+
+    if not results:
+        st.info("검색 결과가 없습니다.")
+
+    for i, doc in enumerate(results):
+        with st.container():
+            col1, col2 = st.columns([6, 1])
+            with col1:
+                if doc["kind"] == "quiz":
+                    place = CATEGORIES.get(doc["category"], doc["category"])
+                elif doc["kind"] == "neurotest":
+                    place = NEURO_TESTS.get(doc["category"], doc["category"])
+                else:
+                    place = "Morning Conference"
+                st.markdown(f"**{KIND_LABELS[doc['kind']]}** · {place}")
+                st.markdown(f"**{doc['title'][:80]}**")
+                st.caption(doc["snippet"])
+            with col2:
+                if st.button("이동", key=f"open_{i}_{doc['doc_id']}"):
+                    if doc["kind"] == "quiz":
+                        open_question(doc)
+                    elif doc["kind"] == "neurotest":
+                        open_material(doc)
+                    else:
+                        open_post(doc)
+            st.divider()
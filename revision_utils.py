@@ -0,0 +1,190 @@
+"""
+문제/검사자료 수정 이력 (append-only).
+
+수정마다 바뀐 필드만 {필드: [이전 값, 새 값]}으로 작성자/시각과 함께 기록한다.
+새 이력은 먼저 tail 파일(JSONL)에 한 줄씩 붙이고, REVISION_SEGMENT_SIZE개가 모이면
+gzip 세그먼트 하나로 압축해 세그먼트 파일 끝에 덧붙인다 (gzip은 여러 멤버를 이어 읽을 수 있음).
+파일 쓰기는 백그라운드 스레드 하나가 순서대로 처리하므로 저장 경로에는 메모리 기록만 남는다.
+
+과거 버전은 현재 레코드에서 최신 이력부터 이전 값을 되돌려 복원한다 (이력 수에 비례).
+"""
+import gzip
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import streamlit as st
+
+from sheets_utils import same_cell_value
+
+logger = logging.getLogger(__name__)
+
+REVISIONS_PATH = os.getenv("REVISIONS_PATH", ".revisions")
+REVISION_SEGMENT_SIZE = 200     # tail에 이만큼 모이면 gzip 세그먼트로 압축
+
+# 이력 목록에 보이는 작업 이름 (그 외는 "수정")
+REVISION_OP_LABELS = {"edit": "수정", "revert": "되돌리기", "bulk": "일괄", "import": "가져오기"}
+
+_TAIL_FILE = "tail.jsonl"
+_SEGMENT_FILE = "segments.jsonl.gz"
+
+
+def _normalize(value):
+    return "" if value is None else value
+
+
+def _read_lines(path, opener=open):
+    records = []
+    if not os.path.exists(path):
+        return records
+    try:
+        with opener(path, "rt", encoding="utf-8") as f:
+            for number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # 쓰다 끊긴 줄은 건너뛰고 나머지는 계속 읽음
+                    logger.warning("수정 이력 %s:%d 줄을 읽을 수 없어 건너뜀", path, number)
+    except (OSError, EOFError):
+        # 압축 세그먼트가 쓰다 끊긴 경우 읽은 데까지만
+        logger.warning("수정 이력 %s를 끝까지 읽지 못함 (%d건 읽음)", path, len(records), exc_info=True)
+    return records
+
+
+@st.cache_resource
+def get_revision_store(path=REVISIONS_PATH):
+    """이력 저장소 로드 (프로세스 단위 1회). by_record: (kind, id) -> 이력 목록 (오래된 순)"""
+    store = {
+        "path": path,
+        "by_record": {},
+        "next_rev": 1,
+        "tail_count": 0,
+        "lock": threading.Lock(),
+        "writer": ThreadPoolExecutor(max_workers=1, thread_name_prefix="revisions"),
+    }
+    if not path:
+        return store
+    segments = _read_lines(os.path.join(path, _SEGMENT_FILE), gzip.open)
+    tail = _read_lines(os.path.join(path, _TAIL_FILE))
+    seen = set()
+    for revision in segments + tail:
+        if revision["rev"] in seen:
+            continue    # 압축 직후 tail을 비우기 전에 멈춘 경우
+        seen.add(revision["rev"])
+        store["by_record"].setdefault((revision["kind"], str(revision["id"])), []).append(revision)
+        store["next_rev"] = max(store["next_rev"], revision["rev"] + 1)
+    store["tail_count"] = len(tail)
+    return store
+
+
+def _write(store, revision):
+    # writer 스레드에서만 실행 (순서 보장)
+    path = store["path"]
+    try:
+        os.makedirs(path, exist_ok=True)
+        tail_path = os.path.join(path, _TAIL_FILE)
+        with open(tail_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(revision, ensure_ascii=False) + "\n")
+        store["tail_count"] += 1
+        if store["tail_count"] >= REVISION_SEGMENT_SIZE:
+            with open(tail_path, encoding="utf-8") as f:
+                lines = f.read()
+            with gzip.open(os.path.join(path, _SEGMENT_FILE), "at", encoding="utf-8") as f:
+                f.write(lines)
+            open(tail_path, "w").close()
+            store["tail_count"] = 0
+    except Exception:
+        # 메모리 기록은 남아 있으므로 저장 경로는 막지 않음 (재시작하면 이 이력은 사라짐)
+        logger.exception("수정 이력 #%s 파일 기록 실패", revision.get("rev"))
+
+
+def record_revision(kind, record_id, before, after, author, columns=None, op="edit", store=None):
+    """
+    before -> after에서 바뀐 필드를 이력 1건으로 기록 (파일 쓰기는 비동기).
+    columns를 주면 그 필드만 비교. 바뀐 필드가 없으면 기록하지 않고 None
+    """
+    if store is None:
+        store = get_revision_store()
+    changes = {
+        field: [_normalize(before.get(field)), _normalize(value)]
+        for field, value in after.items()
+        if (columns is None or field in columns) and not same_cell_value(before.get(field), value)
+    }
+    if not changes:
+        return None
+    with store["lock"]:
+        revision = {
+            "rev": store["next_rev"],
+            "kind": kind,
+            "id": str(record_id),
+            "op": op,
+            "author": author,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "changes": changes,
+        }
+        store["next_rev"] += 1
+        store["by_record"].setdefault((kind, str(record_id)), []).append(revision)
+    if store["path"]:
+        store["writer"].submit(_write, store, revision)
+    return revision
+
+
+def get_revisions(kind, record_id, store=None):
+    """레코드의 이력 목록 (오래된 순)"""
+    if store is None:
+        store = get_revision_store()
+    with store["lock"]:
+        return list(store["by_record"].get((kind, str(record_id)), []))
+
+
+def reconstruct(current, revisions, rev=0):
+    """
+    rev번 이력 직후의 레코드 (rev=0이면 첫 이력 이전).
+    현재 레코드에서 rev보다 나중 이력의 이전 값을 최신순으로 되돌림
+    """
+    version = dict(current)
+    for revision in reversed(revisions):
+        if revision["rev"] <= rev:
+            break
+        for field, (old, _new) in revision["changes"].items():
+            version[field] = old
+    return version
+
+
+def flush_revisions(store=None):
+    """대기 중인 파일 쓰기가 끝날 때까지 대기"""
+    if store is None:
+        store = get_revision_store()
+    store["writer"].submit(lambda: None).result()
+
+
+def _short(value, limit=40):
+    text = str(_normalize(value)).replace("\n", " ")
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+def revision_history(kind, record, revert, key):
+    """
+    수정 이력 목록 + 되돌리기 버튼.
+    revert(복원할 레코드)는 시트 기록을 맡고, 버튼은 해당 수정 이전 상태로 되돌림
+    """
+    revisions = get_revisions(kind, record.get('id'))
+    with st.expander(f"🕘 수정 이력 ({len(revisions)})"):
+        if not revisions:
+            st.caption("기록된 수정 이력이 없습니다.")
+            return
+        for i in range(len(revisions) - 1, -1, -1):
+            revision = revisions[i]
+            op = REVISION_OP_LABELS.get(revision.get("op"), "수정")
+            st.markdown(f"**#{revision['rev']}** {op} · {revision.get('author', '-')} · {revision['timestamp']}")
+            for field, (old, new) in revision["changes"].items():
+                st.caption(f"{field}: {_short(old)} → {_short(new)}")
+            if st.button("↩️ 이 수정 이전으로 되돌리기", key=f"{key}_revert_{revision['rev']}"):
+                previous = revisions[i - 1]["rev"] if i > 0 else 0
+                revert(reconstruct(record, revisions, previous))
@@ -0,0 +1,286 @@
+import hashlib
+import math
+import re
+import threading
+from collections import Counter
+import streamlit as st
+
+from history_utils import count_text_tokens
+
+# 자료 본문 검색(BM25) 설정
+CHUNK_CHARS = 600          # 청크 최대 글자 수
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+SEARCH_SNIPPET_CHARS = 80
+_search_lock = threading.Lock()
+
+_WORD_RE = re.compile(r"\w+")
+_HANGUL_RE = re.compile(r"[가-힣]")
+
+
+def tokenize(text):
+    """
+    한국어는 글자 bigram, 영어/숫자는 단어 단위로 토큰화.
+    ("밀러피셔 증후군" -> 밀러, 러피, 피셔, 증후, 후군 / "Miller Fisher" -> miller, fisher)
+    """
+    tokens = []
+    for word in _WORD_RE.findall(str(text).lower()):
+        if _HANGUL_RE.search(word):
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def content_hash(text):
+    return hashlib.sha256(str(text).encode("utf-8")).hexdigest()
+
+
+def split_chunks(text, max_chars=CHUNK_CHARS):
+    """문단 단위로 나눠 max_chars 이하의 청크로 묶음 (긴 문단은 문장/길이로 자름)"""
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n|\n(?=#)", str(text)):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        while len(paragraph) > max_chars:
+            cut = max(paragraph.rfind(". ", 0, max_chars), paragraph.rfind("\n", 0, max_chars))
+            cut = cut + 1 if cut > max_chars // 2 else max_chars
+            pieces.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        if paragraph:
+            pieces.append(paragraph)
+
+    chunks = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) + len(piece) + 2 <= max_chars:
+            chunks[-1] = chunks[-1] + "\n\n" + piece
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+def build_bm25_index(text):
+    chunks = split_chunks(text)
+    term_freqs = [Counter(tokenize(chunk)) for chunk in chunks]
+    doc_freq = Counter()
+    for tf in term_freqs:
+        doc_freq.update(tf.keys())
+    lengths = [sum(tf.values()) for tf in term_freqs]
+    return {
+        "chunks": chunks,
+        "term_freqs": term_freqs,
+        "doc_freq": doc_freq,
+        "lengths": lengths,
+        "avg_length": (sum(lengths) / len(lengths)) if lengths else 0,
+        "tokens": [count_text_tokens(chunk) for chunk in chunks],
+    }
+
+
+@st.cache_resource(max_entries=500)
+def get_chunk_index(text_hash, _text):
+    """본문 해시별 BM25 인덱스 (내용이 바뀌면 새로 생성)"""
+    return build_bm25_index(_text)
+
+
+def bm25_scores(index, query):
+    n = len(index["chunks"])
+    scores = [0.0] * n
+    avg_length = index["avg_length"] or 1
+    for term in set(tokenize(query)):
+        df = index["doc_freq"].get(term)
+        if not df:
+            continue
+        idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        for i, tf in enumerate(index["term_freqs"]):
+            f = tf.get(term)
+            if f:
+                norm = 1 - BM25_B + BM25_B * index["lengths"][i] / avg_length
+                scores[i] += idf * f * (BM25_K1 + 1) / (f + BM25_K1 * norm)
+    return scores
+
+
+def select_context(text, question, token_budget=1000, top_k=4):
+    """
+    질문과 관련된 청크를 토큰 예산 안에서 골라 원래 순서대로 이어 붙임.
+    본문이 예산 안에 들어가면 전체를, 관련 청크가 없으면 앞부분을 사용
+    """
+    text = str(text or "")
+    if not text or count_text_tokens(text) <= token_budget:
+        return text
+
+    index = get_chunk_index(content_hash(text), text)
+    scores = bm25_scores(index, question)
+    ranked = [i for i in sorted(range(len(scores)), key=lambda i: (-scores[i], i)) if scores[i] > 0]
+    limit = top_k
+    if not ranked:
+        # 관련 청크가 없으면 기존처럼 앞에서부터 예산만큼
+        ranked, limit = list(range(len(scores))), len(scores)
+
+    selected, used = [], 0
+    for i in ranked:
+        if len(selected) >= limit:
+            break
+        if used + index["tokens"][i] > token_budget:
+            continue
+        selected.append(i)
+        used += index["tokens"][i]
+    return "\n...\n".join(index["chunks"][i] for i in sorted(selected))
+
+
+# ============ 통합 검색 (문제 / 검사자료 / 컨퍼런스) ============
+@st.cache_resource
+def get_search_index():
+    """문서 id -> 문서, 토큰 -> {문서 id: 빈도} (프로세스 공유 역색인)"""
+    return {"docs": {}, "postings": {}, "lengths": {}, "total_length": 0, "built": False}
+
+
+def _add_doc(index, doc):
+    doc_id = doc["doc_id"]
+    if doc_id in index["docs"]:
+        _remove_doc(index, doc_id)
+    tf = Counter(tokenize(doc["title"]) * 2 + tokenize(doc["text"]))  # 제목 가중치 2배
+    for term, freq in tf.items():
+        index["postings"].setdefault(term, {})[doc_id] = freq
+    length = sum(tf.values())
+    index["docs"][doc_id] = {**doc, "terms": list(tf.keys())}
+    index["lengths"][doc_id] = length
+    index["total_length"] += length
+
+
+def _remove_doc(index, doc_id):
+    doc = index["docs"].pop(doc_id, None)
+    if doc is None:
+        return
+    for term in doc["terms"]:
+        postings = index["postings"].get(term)
+        if postings is not None:
+            postings.pop(doc_id, None)
+            if not postings:
+                del index["postings"][term]
+    index["total_length"] -= index["lengths"].pop(doc_id, 0)
+
+
+def question_doc(q):
+    feedback = " ".join(str(q.get(f"feedback_{i}", "") or "") for i in range(1, 6))
+    return {
+        "doc_id": f"quiz:{q.get('id', '')}",
+        "kind": "quiz",
+        "item_id": str(q.get('id', '')),
+        "category": q.get('category', ''),
+        "title": str(q.get('question', '')),
+        "text": f"{q.get('choices', '')} {q.get('answer', '')} {feedback}",
+    }
+
+
+def material_doc(m):
+    return {
+        "doc_id": f"neurotest:{m.get('id', '')}",
+        "kind": "neurotest",
+        "item_id": str(m.get('id', '')),
+        "category": m.get('category', ''),
+        "title": str(m.get('title', '')),
+        "text": str(m.get('content', '')),
+    }
+
+
+def post_doc(p):
+    content = str(p.get('content', '') or p.get('content_above', '') or '')
+    first_line, _, rest = content.partition("\n")
+    return {
+        "doc_id": f"conference:{p.get('id', '')}",
+        "kind": "conference",
+        "item_id": str(p.get('id', '')),
+        "category": "",
+        "title": first_line,
+        "text": f"{rest} {p.get('content_below', '') or ''}".strip(),
+    }
+
+
+def build_search_index(questions, materials, posts, index=None):
+    """전체 색인 새로 만들기"""
+    if index is None:
+        index = get_search_index()
+    with _search_lock:
+        for key in ("docs", "postings", "lengths"):
+            index[key].clear()
+        index["total_length"] = 0
+        for q in questions:
+            _add_doc(index, question_doc(q))
+        for m in materials:
+            _add_doc(index, material_doc(m))
+        for p in posts:
+            _add_doc(index, post_doc(p))
+        index["built"] = True
+    return index
+
+
+def index_document(doc, index=None):
+    """관리자 등록/수정 시 해당 문서만 색인 갱신 (색인이 아직 없으면 생략)"""
+    if index is None:
+        index = get_search_index()
+    with _search_lock:
+        if index["built"]:
+            _add_doc(index, doc)
+
+
+def remove_document(doc_id, index=None):
+    if index is None:
+        index = get_search_index()
+    with _search_lock:
+        _remove_doc(index, doc_id)
+
+
+def _snippet(text, query_words):
+    text = re.sub(r"\s+", " ", str(text))
+    lowered = text.lower()
+    pos = -1
+    for word in query_words:
+        pos = lowered.find(word.lower())
+        if pos >= 0:
+            break
+    if pos < 0:
+        return text[:SEARCH_SNIPPET_CHARS * 2]
+    start = max(0, pos - SEARCH_SNIPPET_CHARS)
+    end = min(len(text), pos + SEARCH_SNIPPET_CHARS)
+    return ("..." if start > 0 else "") + text[start:end] + ("..." if end < len(text) else "")
+
+
+def search(query, limit=20, kinds=None, index=None):
+    """BM25 순위 검색. 반환: [{문서 필드..., "score", "snippet"}]"""
+    if index is None:
+        index = get_search_index()
+    terms = set(tokenize(query))
+    if not terms:
+        return []
+
+    with _search_lock:
+        n = len(index["docs"])
+        avg_length = (index["total_length"] / n) if n else 1
+        scores = Counter()
+        for term in terms:
+            postings = index["postings"].get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, f in postings.items():
+                norm = 1 - BM25_B + BM25_B * index["lengths"][doc_id] / avg_length
+                scores[doc_id] += idf * f * (BM25_K1 + 1) / (f + BM25_K1 * norm)
+
+        results = []
+        query_words = _WORD_RE.findall(query)
+        for doc_id, score in scores.most_common():
+            doc = index["docs"][doc_id]
+            if kinds and doc["kind"] not in kinds:
+                continue
+            result = {k: v for k, v in doc.items() if k != "terms"}
+            result["score"] = score
+            result["snippet"] = _snippet(doc["title"] + " " + doc["text"], query_words)
+            results.append(result)
+            if len(results) >= limit:
+                break
+    return results
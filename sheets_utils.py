@@ -0,0 +1,144 @@
+"""
+여러 행을 한 번에 처리하는 Google Sheets 일괄 작업.
+
+대상 행은 id 열을 한 번 읽어 찾고(행 번호가 아니라 id 기준이라 그 사이 행이 밀려도 안전),
+삭제는 spreadsheet.batch_update의 deleteDimension 요청 하나로, 값 변경은 worksheet.batch_update 하나로 보낸다.
+레코드 수정은 캐시된 레코드와 비교해 바뀐 셀만 보낸다.
+"""
+
+
+def col_letter(col):
+    """열 번호(1부터) -> A1 표기 열 이름"""
+    letters = ""
+    while col:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(ord("A") + rem) + letters
+    return letters
+
+
+def find_rows(worksheet, ids, id_col=1):
+    """id -> 시트 행 번호(1부터). id 열을 한 번만 읽음"""
+    wanted = {str(i) for i in ids}
+    rows = {}
+    for row_number, value in enumerate(worksheet.col_values(id_col), start=1):
+        if row_number == 1:
+            continue  # 헤더
+        value = str(value)
+        if value in wanted and value not in rows:
+            rows[value] = row_number
+    return rows
+
+
+def _row_ranges(row_numbers):
+    """연속된 행을 묶어 (시작, 끝) 범위로, 아래쪽부터 (앞 행을 먼저 지우면 뒤 행 번호가 밀림)"""
+    ranges = []
+    for row in sorted(set(row_numbers)):
+        if ranges and ranges[-1][1] == row - 1:
+            ranges[-1][1] = row
+        else:
+            ranges.append([row, row])
+    return [tuple(r) for r in reversed(ranges)]
+
+
+def delete_rows_by_id(worksheet, ids, id_col=1):
+    """
+    id가 일치하는 행 삭제 (읽기 1회 + batch_update 1회).
+    반환: 삭제한 id 목록 (시트에 없던 id는 제외)
+    """
+    rows = find_rows(worksheet, ids, id_col)
+    if not rows:
+        return []
+    requests = [
+        {
+            "deleteDimension": {
+                "range": {
+                    "sheetId": worksheet.id,
+                    "dimension": "ROWS",
+                    "startIndex": start - 1,   # 0부터, end 미포함
+                    "endIndex": end,
+                }
+            }
+        }
+        for start, end in _row_ranges(rows.values())
+    ]
+    worksheet.spreadsheet.batch_update({"requests": requests})
+    return list(rows)
+
+
+def update_column_by_id(worksheet, ids, col, value, id_col=1):
+    """
+    id가 일치하는 행들의 col 열을 value로 (읽기 1회 + batch_update 1회).
+    반환: 변경한 id 목록
+    """
+    rows = find_rows(worksheet, ids, id_col)
+    if not rows:
+        return []
+    letter = col_letter(col)
+    data = []
+    for start, end in sorted(_row_ranges(rows.values())):
+        data.append({
+            "range": f"{letter}{start}:{letter}{end}",
+            "values": [[value] for _ in range(end - start + 1)],
+        })
+    worksheet.batch_update(data)
+    return list(rows)
+
+
+def update_values_by_id(worksheet, values, col, id_col=1):
+    """
+    {id: 값}을 각 행의 col 열에 기록 (읽기 1회 + batch_update 1회).
+    반환: 변경한 id 목록
+    """
+    rows = find_rows(worksheet, values, id_col)
+    if not rows:
+        return []
+    letter = col_letter(col)
+    by_id = {str(k): v for k, v in values.items()}
+    worksheet.batch_update([
+        {"range": f"{letter}{row}", "values": [[by_id[record_id]]]}
+        for record_id, row in sorted(rows.items(), key=lambda item: item[1])
+    ])
+    return list(rows)
+
+
+def same_cell_value(a, b):
+    """
+    시트 셀 값이 같은지 (시트 값은 문자열/숫자가 섞여 옴: 3 == "3" == 3.0, None == "").
+    셀 기록(update_changed_cells)과 수정 이력(revision_utils)이 같은 기준을 쓰도록 공유
+    """
+    a = "" if a is None else str(a).strip()
+    b = "" if b is None else str(b).strip()
+    if a == b:
+        return True
+    try:
+        return float(a) == float(b)
+    except ValueError:
+        return False
+
+
+def changed_fields(before, after, columns):
+    """after 중 before와 값이 다른 필드 {필드: 새 값} (columns에 있는 필드만)"""
+    return {
+        field: value for field, value in after.items()
+        if field in columns and not same_cell_value(before.get(field), value)
+    }
+
+
+def update_changed_cells(worksheet, record_id, before, after, columns, id_col=1):
+    """
+    before(캐시된 레코드)와 after(수정한 값)를 비교해 바뀐 셀만 batch_update 1회로 기록.
+    바뀐 값이 없으면 요청을 보내지 않음. columns는 시트 헤더 순서의 필드 이름.
+    반환: 기록한 셀 수 (레코드가 시트에 없으면 0)
+    """
+    changes = changed_fields(before, after, columns)
+    if not changes:
+        return 0
+    row = find_rows(worksheet, [record_id], id_col).get(str(record_id))
+    if row is None:
+        return 0
+    data = [
+        {"range": f"{col_letter(columns.index(field) + 1)}{row}", "values": [[value]]}
+        for field, value in changes.items()
+    ]
+    worksheet.batch_update(data)
+    return len(data)
@@ -0,0 +1,569 @@
+"""
+오프라인 성능 테스트 도구.
+
+Google Sheets(gspread)와 OpenAI 없이 페이지를 실행할 수 있도록
+메모리 기반 가짜 스프레드시트(FakeSheetsClient)와 가짜 채팅 모델(fake_llm)을 주입한다.
+API 호출 지연, 할당량(분당 호출 수), 실패를 설정할 수 있고, 호출 횟수를 메서드별로 센다.
+
+실행 예:
+    python testing_utils.py                                 # 모든 페이지 5회씩 실행 시간 측정
+    python testing_utils.py --pages 1_Quiz 7_Quiz_Admin --questions 2000 --sheets-latency 0.2
+
+코드에서:
+    client = seed_client(questions=500)
+    with fake_backends(client, ScriptedChatModel(responses=["..."])):
+        at = make_app_test("pages/1_Quiz.py")
+        at.run()
+    client.calls  # {"get_all_records": 3, ...}
+"""
+import argparse
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# 페이지가 만드는 워크시트와 같은 헤더
+SHEET_HEADERS = {
+    "questions": [
+        "id", "category", "question", "choices", "answer",
+        "feedback_1", "feedback_2", "feedback_3", "feedback_4", "feedback_5",
+        "difficulty", "image_url", "video_url", "author", "created_at",
+    ],
+    "neurotest": [
+        "id", "category", "title", "content", "image_url",
+        "video_url", "author", "created_at", "order", "type",
+    ],
+    "neurotest_comments": ["id", "material_id", "author", "content", "created_at", "parent_id"],
+    "conference": ["id", "author", "content", "created_at", "image_urls", "video_url"],
+    "replies": ["reply_id", "post_id", "author", "content", "created_at"],
+    "progress": ["user_id", "qid", "category", "last_access"],
+    "질문": ["user", "question", "time"],
+}
+
+# 페이지의 CATEGORIES / NEURO_TESTS 키
+QUIZ_CATEGORIES = [
+    "Approach", "Critical Care", "Stroke", "Movement", "Neuromuscular",
+    "Demyelinating", "CNS Infection", "Seizure", "Dementia", "Headache",
+]
+NEURO_TEST_CATEGORIES = ["NCS", "EMG", "EP", "ANS", "EEG", "TCD", "Carotid", "VOG_VNG", "SNSB", "Gait"]
+
+FAKE_SECRETS = {
+    "OPENAI_API_KEY": "sk-fake",
+    "IMGBB_API_KEY": "fake",
+    "gcp_service_account": {"type": "service_account", "client_email": "fake@example.com"},
+    "google_sheets": {"spreadsheet_url": "https://docs.google.com/spreadsheets/d/fake"},
+}
+
+
+class FakeAPIError(Exception):
+    """gspread APIError처럼 status_code를 가진 오류 (429: 할당량 초과)"""
+
+    def __init__(self, message, status_code=500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FakeWorksheetNotFound(Exception):
+    pass
+
+
+class FakeCell:
+    def __init__(self, row, col, value):
+        self.row = row
+        self.col = col
+        self.value = value
+
+    def __repr__(self):
+        return f"<FakeCell R{self.row}C{self.col} {self.value!r}>"
+
+
+_A1_RE = re.compile(r"^([A-Z]*)(\d*)$")
+
+
+def _col_number(letters):
+    number = 0
+    for ch in letters:
+        number = number * 26 + (ord(ch) - ord("A") + 1)
+    return number
+
+
+def parse_a1(range_name):
+    """
+    'B2:M2', 'A5:F', 'A:C', "'질문'!A2:C" -> (시작 행, 시작 열, 끝 행, 끝 열), 생략된 끝은 None.
+    행/열 번호는 1부터
+    """
+    range_name = range_name.split("!")[-1].replace("$", "").upper()
+    start, _, end = range_name.partition(":")
+    m1, m2 = _A1_RE.match(start), _A1_RE.match(end or start)
+    if not m1 or not m2:
+        raise ValueError(f"Unsupported range: {range_name}")
+    r1 = int(m1.group(2)) if m1.group(2) else 1
+    c1 = _col_number(m1.group(1)) if m1.group(1) else 1
+    r2 = int(m2.group(2)) if m2.group(2) else None
+    c2 = _col_number(m2.group(1)) if m2.group(1) else None
+    return r1, c1, r2, c2
+
+
+class FakeBackend:
+    """모든 가짜 API 호출이 거치는 곳: 지연, 할당량, 실패 주입과 호출 횟수 기록"""
+
+    def __init__(self, latency=0.0, quota=None, quota_window=60.0, failures=None):
+        self.latency = latency              # 호출마다 지연 (초)
+        self.quota = quota                  # quota_window 동안 허용되는 호출 수 (None이면 무제한)
+        self.quota_window = quota_window
+        self.failures = dict(failures or {})  # 메서드 이름 -> 남은 실패 횟수
+        self.calls = Counter()
+        self.call_log = []
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def fail_next(self, method, times=1):
+        """다음 times번의 method 호출을 실패시킴"""
+        with self._lock:
+            self.failures[method] = self.failures.get(method, 0) + times
+
+    def reset_counts(self):
+        with self._lock:
+            self.calls.clear()
+            self.call_log.clear()
+
+    def call(self, method, detail=""):
+        now = time.monotonic()
+        with self._lock:
+            self.calls[method] += 1
+            self.call_log.append((method, detail))
+            if self.quota is not None:
+                while self._recent and now - self._recent[0] > self.quota_window:
+                    self._recent.popleft()
+                if len(self._recent) >= self.quota:
+                    raise FakeAPIError("Quota exceeded for quota metric 'Read requests' (fake)", 429)
+                self._recent.append(now)
+            remaining = self.failures.get(method, 0)
+            if remaining:
+                self.failures[method] = remaining - 1
+                raise FakeAPIError(f"Injected failure in {method}", 500)
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class FakeWorksheet:
+    """gspread.Worksheet 중 이 앱이 사용하는 메서드만 구현"""
+
+    def __init__(self, backend, title, rows=1000, cols=26, sheet_id=0, spreadsheet=None):
+        self._backend = backend
+        self.spreadsheet = spreadsheet
+        self.id = sheet_id
+        self.title = title
+        self._rows = []
+        self._row_limit = rows
+        self._col_limit = cols
+        self._lock = threading.Lock()
+
+    # ---------- 조회 ----------
+    @property
+    def row_count(self):
+        return max(self._row_limit, len(self._rows))
+
+    @property
+    def col_count(self):
+        return self._col_limit
+
+    def get_all_values(self, **kwargs):
+        self._backend.call("get_all_values", self.title)
+        with self._lock:
+            return [list(row) for row in self._rows]
+
+    def get_all_records(self, head=1, default_blank="", **kwargs):
+        self._backend.call("get_all_records", self.title)
+        with self._lock:
+            if len(self._rows) < head:
+                return []
+            header = self._rows[head - 1]
+            records = []
+            for row in self._rows[head:]:
+                values = list(row) + [default_blank] * (len(header) - len(row))
+                records.append({key: _typed(value) for key, value in zip(header, values)})
+            return records
+
+    def get(self, range_name=None, **kwargs):
+        self._backend.call("get", f"{self.title}!{range_name}")
+        with self._lock:
+            return self._read_range(range_name) if range_name else [list(r) for r in self._rows]
+
+    get_values = get
+
+    def batch_get(self, ranges, **kwargs):
+        self._backend.call("batch_get", f"{self.title}!{','.join(ranges)}")
+        with self._lock:
+            return [self._read_range(r) for r in ranges]
+
+    def row_values(self, row, **kwargs):
+        self._backend.call("row_values", f"{self.title}!{row}")
+        with self._lock:
+            return list(self._rows[row - 1]) if 0 < row <= len(self._rows) else []
+
+    def col_values(self, col, **kwargs):
+        self._backend.call("col_values", f"{self.title}!{col}")
+        with self._lock:
+            return [row[col - 1] if len(row) >= col else "" for row in self._rows]
+
+    def find(self, query, in_row=None, in_column=None, case_sensitive=True):
+        self._backend.call("find", self.title)
+        with self._lock:
+            for cell in self._iter_cells(in_row, in_column):
+                if _matches(cell.value, query, case_sensitive):
+                    return cell
+        return None
+
+    def findall(self, query, in_row=None, in_column=None, case_sensitive=True):
+        self._backend.call("findall", self.title)
+        with self._lock:
+            return [c for c in self._iter_cells(in_row, in_column) if _matches(c.value, query, case_sensitive)]
+
+    # ---------- 쓰기 ----------
+    def append_row(self, values, **kwargs):
+        self._backend.call("append_row", self.title)
+        with self._lock:
+            self._rows.append([_cell_text(v) for v in values])
+
+    def append_rows(self, values, **kwargs):
+        self._backend.call("append_rows", f"{self.title} x{len(values)}")
+        with self._lock:
+            self._rows.extend([_cell_text(v) for v in row] for row in values)
+
+    def update_cell(self, row, col, value):
+        self._backend.call("update_cell", f"{self.title}!R{row}C{col}")
+        with self._lock:
+            self._write(row, col, [[value]])
+
+    def update(self, range_name=None, values=None, **kwargs):
+        # gspread 6은 update(values, range_name), 이전 버전은 update(range_name, values)
+        if isinstance(values, str) or (isinstance(range_name, list) and values is None):
+            range_name, values = values, range_name
+        range_name = range_name or "A1"
+        self._backend.call("update", f"{self.title}!{range_name}")
+        with self._lock:
+            r1, c1, _, _ = parse_a1(range_name)
+            self._write(r1, c1, values)
+
+    def batch_update(self, data, **kwargs):
+        """data: [{"range": "B2:C2", "values": [[...]]}, ...] (API 호출 1회)"""
+        self._backend.call("batch_update", f"{self.title} x{len(data)}")
+        with self._lock:
+            for item in data:
+                r1, c1, _, _ = parse_a1(item["range"])
+                self._write(r1, c1, item["values"])
+
+    def delete_rows(self, start_index, end_index=None):
+        self._backend.call("delete_rows", f"{self.title}!{start_index}:{end_index or start_index}")
+        with self._lock:
+            del self._rows[start_index - 1:(end_index or start_index)]
+
+    def clear(self):
+        self._backend.call("clear", self.title)
+        with self._lock:
+            self._rows = []
+
+    # ---------- 내부 ----------
+    def _read_range(self, range_name):
+        r1, c1, r2, c2 = parse_a1(range_name)
+        r2 = min(r2 or len(self._rows), len(self._rows))
+        result = []
+        for row in self._rows[r1 - 1:r2]:
+            values = row[c1 - 1:c2] if c2 else row[c1 - 1:]
+            result.append(list(values))
+        # gspread처럼 끝의 빈 행은 생략
+        while result and not any(result[-1]):
+            result.pop()
+        return result
+
+    def _write(self, row, col, values):
+        for i, row_values in enumerate(values):
+            r = row - 1 + i
+            while len(self._rows) <= r:
+                self._rows.append([])
+            target = self._rows[r]
+            for j, value in enumerate(row_values):
+                c = col - 1 + j
+                while len(target) <= c:
+                    target.append("")
+                target[c] = _cell_text(value)
+
+    def _iter_cells(self, in_row, in_column):
+        for r, row in enumerate(self._rows, start=1):
+            if in_row is not None and r != in_row:
+                continue
+            for c, value in enumerate(row, start=1):
+                if in_column is not None and c != in_column:
+                    continue
+                yield FakeCell(r, c, value)
+
+    def _delete_dimension(self, dimension, start, end):
+        # Spreadsheet.batch_update의 deleteDimension (0부터, end 미포함)
+        if dimension == "ROWS":
+            del self._rows[start:end]
+        else:
+            for row in self._rows:
+                del row[start:end]
+
+
+def _cell_text(value):
+    # 시트에는 문자열로 저장됨 (숫자는 get_all_records에서 다시 숫자로)
+    if value is None:
+        return ""
+    return str(value)
+
+
+def _typed(value):
+    # gspread get_all_records처럼 숫자처럼 보이는 값은 int/float로
+    if isinstance(value, str) and re.fullmatch(r"-?\d+", value):
+        return int(value)
+    if isinstance(value, str) and re.fullmatch(r"-?\d+\.\d+", value):
+        return float(value)
+    return value
+
+
+def _matches(value, query, case_sensitive):
+    if hasattr(query, "search"):
+        return bool(query.search(value))
+    if case_sensitive:
+        return value == str(query)
+    return value.lower() == str(query).lower()
+
+
+class FakeSpreadsheet:
+    """gspread.Spreadsheet 대체"""
+
+    def __init__(self, backend, url=""):
+        self._backend = backend
+        self.url = url
+        self._worksheets = {}
+
+    def worksheet(self, title):
+        self._backend.call("worksheet", title)
+        if title not in self._worksheets:
+            raise FakeWorksheetNotFound(title)
+        return self._worksheets[title]
+
+    def worksheets(self):
+        self._backend.call("worksheets")
+        return list(self._worksheets.values())
+
+    def add_worksheet(self, title, rows=1000, cols=26, **kwargs):
+        self._backend.call("add_worksheet", title)
+        worksheet = FakeWorksheet(self._backend, title, rows, cols,
+                                  sheet_id=len(self._worksheets), spreadsheet=self)
+        self._worksheets[title] = worksheet
+        return worksheet
+
+    def batch_update(self, body):
+        """deleteDimension 요청만 지원 (sheetId 대신 워크시트 제목도 허용)"""
+        requests = body.get("requests", [])
+        self._backend.call("spreadsheet_batch_update", f"x{len(requests)}")
+        by_id = {ws.id: ws for ws in self._worksheets.values()}
+        for request in requests:
+            rng = request["deleteDimension"]["range"]
+            sheet_id = rng["sheetId"]
+            worksheet = by_id[sheet_id] if sheet_id in by_id else self._worksheets[sheet_id]
+            with worksheet._lock:
+                worksheet._delete_dimension(rng["dimension"], rng["startIndex"], rng["endIndex"])
+        return {"replies": [{} for _ in requests]}
+
+    def _seed(self, title, rows):
+        """API 호출 수에 포함되지 않도록 직접 데이터 넣기"""
+        worksheet = self._worksheets.get(title) or FakeWorksheet(
+            self._backend, title, sheet_id=len(self._worksheets), spreadsheet=self)
+        self._worksheets[title] = worksheet
+        worksheet._rows = [[_cell_text(v) for v in row] for row in rows]
+        return worksheet
+
+
+class FakeSheetsClient:
+    """gspread.Client 대체. 모든 URL이 같은 스프레드시트를 가리킴"""
+
+    def __init__(self, latency=0.0, quota=None, quota_window=60.0, failures=None):
+        self.backend = FakeBackend(latency, quota, quota_window, failures)
+        self.spreadsheet = FakeSpreadsheet(self.backend)
+
+    @property
+    def calls(self):
+        return dict(self.backend.calls)
+
+    def open_by_url(self, url):
+        self.backend.call("open_by_url")
+        return self.spreadsheet
+
+    def open_by_key(self, key):
+        self.backend.call("open_by_key")
+        return self.spreadsheet
+
+
+# ============ 테스트 데이터 ============
+def seed_client(questions=100, materials=30, posts=50, replies=100, client=None, **client_options):
+    """헤더와 가짜 데이터를 채운 FakeSheetsClient (데이터 넣기는 API 호출로 세지 않음)"""
+    client = client or FakeSheetsClient(**client_options)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    categories = QUIZ_CATEGORIES
+    tests = NEURO_TEST_CATEGORIES
+    spreadsheet = client.spreadsheet
+
+    rows = [SHEET_HEADERS["questions"]]
+    for i in range(1, questions + 1):
+        choices = [f"보기{i}-{k}" for k in range(1, 6)]
+        rows.append([
+            i, categories[i % len(categories)], f"문제 {i}: 다음 중 옳은 것은?", ", ".join(choices),
+            choices[i % 5], *[f"{c} 해설" for c in choices], "중", "", "", "윤지환", now,
+        ])
+    spreadsheet._seed("questions", rows)
+
+    rows = [SHEET_HEADERS["neurotest"]]
+    for i in range(1, materials + 1):
+        rows.append([
+            i, tests[i % len(tests)], f"자료 {i}", f"자료 {i} 본문\n\n" + "검사 설명 문단. " * 50,
+            "", "", "윤지환", now, i, "text",
+        ])
+    spreadsheet._seed("neurotest", rows)
+
+    rows = [SHEET_HEADERS["conference"]]
+    rows += [[i, "윤지환", f"증례 {i}\n환자는 65세 남자로...", now, "", ""] for i in range(1, posts + 1)]
+    spreadsheet._seed("conference", rows)
+
+    rows = [SHEET_HEADERS["replies"]]
+    rows += [[i, (i % max(posts, 1)) + 1, "송배섭", f"답글 {i}", now] for i in range(1, replies + 1)]
+    spreadsheet._seed("replies", rows)
+
+    for title in ("neurotest_comments", "progress", "질문"):
+        spreadsheet._seed(title, [SHEET_HEADERS[title]])
+    return client
+
+
+# ============ 주입 ============
+@contextmanager
+def fake_backends(client=None, chat_model=None):
+    """
+    gspread.authorize / Credentials.from_service_account_info와 LLM 모델 생성을 가짜로 교체.
+    AppTest는 같은 프로세스에서 페이지를 실행하므로 이 블록 안에서 실행하면 됨
+    """
+    import gspread
+    from google.oauth2.service_account import Credentials
+    from fake_llm import ScriptedChatModel
+    import llm_utils
+
+    client = client or seed_client()
+    chat_model = chat_model or ScriptedChatModel()
+    original_authorize = gspread.authorize
+    original_credentials = Credentials.__dict__["from_service_account_info"]
+    gspread.authorize = lambda *args, **kwargs: client
+    Credentials.from_service_account_info = classmethod(lambda cls, *args, **kwargs: None)
+    llm_utils.set_chat_model_factory(lambda **kwargs: chat_model)
+    try:
+        yield client
+    finally:
+        gspread.authorize = original_authorize
+        Credentials.from_service_account_info = original_credentials
+        llm_utils.set_chat_model_factory(None)
+
+
+def make_app_test(page_path, user_id="윤지환", is_admin=True, timeout=60, **session):
+    """로그인된 상태의 AppTest (fake_backends 블록 안에서 run)"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(page_path, default_timeout=timeout)
+    for key, value in FAKE_SECRETS.items():
+        at.secrets[key] = value
+    at.session_state["user_id"] = user_id
+    at.session_state["is_admin"] = is_admin
+    for key, value in session.items():
+        at.session_state[key] = value
+    return at
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))] if values else 0.0
+
+
+def measure_page(page_path, client, runs=5, chat_model=None, **session):
+    """
+    페이지를 runs번 다시 실행하며 실행 시간과 Sheets 호출 수 측정.
+    반환: {"page", "first", "p50", "p95", "calls", "exceptions"}
+    """
+    import streamlit as st
+
+    timings = []
+    exceptions = []
+    with fake_backends(client, chat_model):
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        client.backend.reset_counts()
+        at = make_app_test(page_path, **session)
+        for _ in range(runs):
+            start = time.perf_counter()
+            at.run()
+            timings.append(time.perf_counter() - start)
+            exceptions.extend(str(e.message) for e in at.exception)
+    return {
+        "page": page_path,
+        "first": round(timings[0], 3) if timings else None,
+        "p50": round(_percentile(timings[1:] or timings, 50), 3),
+        "p95": round(_percentile(timings[1:] or timings, 95), 3),
+        "calls": client.calls,
+        "exceptions": exceptions,
+    }
+
+
+PAGES = {
+    "1_Quiz": "pages/1_Quiz.py",
+    "2_SNSB": "pages/2_임신생검사 및 SNSB.py",
+    "3_Morning_Conference": "pages/3_Morning_Conference.py",
+    "4_Dashboard": "pages/4_Dashboard.py",
+    "5_Question": "pages/5_Question.py",
+    "6_New_Post": "pages/6_New_Post.py",
+    "7_Quiz_Admin": "pages/7_Quiz_Admin.py",
+    "8_Test_Admin": "pages/8_Test_Admin.py",
+    "9_Search": "pages/9_Search.py",
+    "10_AI_Usage": "pages/10_AI_Usage.py",
+}
+
+
+# 관리 페이지 인증을 통과한 상태 (인증 화면 대신 실제 목록을 그리도록)
+AUTHORIZED_SESSION = {
+    "write_authorized": True,
+    "quiz_admin_authorized": True,
+    "neurotest_admin_authorized": True,
+}
+
+
+def main():
+    from fake_llm import ScriptedChatModel
+
+    parser = argparse.ArgumentParser(description="가짜 Sheets/LLM으로 페이지 실행 시간 측정")
+    parser.add_argument("--pages", nargs="*", default=list(PAGES), help=", ".join(PAGES))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--questions", type=int, default=500)
+    parser.add_argument("--materials", type=int, default=100)
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--sheets-latency", type=float, default=0.0, help="Sheets API 호출당 지연 (초)")
+    parser.add_argument("--sheets-quota", type=int, default=None, help="분당 Sheets 호출 한도")
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    for name in args.pages:
+        client = seed_client(
+            questions=args.questions, materials=args.materials, posts=args.posts,
+            latency=args.sheets_latency, quota=args.sheets_quota,
+        )
+        model = ScriptedChatModel(latency=args.llm_latency)
+        result = measure_page(PAGES.get(name, name), client, runs=args.runs, chat_model=model,
+                              **AUTHORIZED_SESSION)
+        calls = sum(result["calls"].values())
+        print(f"{name}: 첫 실행 {result['first']}초 · 재실행 p50 {result['p50']}초 · p95 {result['p95']}초 · "
+              f"Sheets 호출 {calls}회 {result['calls']}")
+        for message in result["exceptions"][:3]:
+            print(f"  ! {message}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""feed_utils 증분 캐시를 가짜 워크시트로 확인"""
+from feed_utils import get_feed_cache, invalidate_feed, sync_feed
+from testing_utils import FakeSheetsClient, SHEET_HEADERS
+
+
+def _conference_sheet(posts):
+    client = FakeSheetsClient()
+    rows = [SHEET_HEADERS["conference"]]
+    rows += [[i, "윤지환", f"증례 {i}", "2024-06-01 09:00", "", ""] for i in range(1, posts + 1)]
+    return client.spreadsheet._seed("conference", rows)
+
+
+def test_tail_sync_appends_new_rows():
+    sheet = _conference_sheet(3)
+    feed = get_feed_cache("test_feed_tail")
+    sync_feed(feed, lambda: sheet, full=True)
+
+    sheet.append_row([4, "윤지환", "증례 4", "2024-06-01 09:00", "", ""])
+    sheet.append_row([5, "윤지환", "증례 5", "2024-06-01 09:00", "", ""])
+    new = sync_feed(feed, lambda: sheet, min_interval=0)
+
+    assert [r["id"] for r in new] == ["4", "5"]
+    assert [r["id"] for r in feed["newest"]][:2] == ["5", "4"]
+
+
+def test_invalidate_picks_up_in_place_edit():
+    sheet = _conference_sheet(3)
+    feed = get_feed_cache("test_feed_edit")
+    sync_feed(feed, lambda: sheet, full=True)
+
+    sheet.update_cell(3, 3, "증례 2 (수정)")
+    sync_feed(feed, lambda: sheet, min_interval=0)
+    assert feed["records"][1]["content"] == "증례 2"     # tail 확인만으로는 알 수 없음
+
+    invalidate_feed(feed)
+    sync_feed(feed, lambda: sheet)    # 확인 간격 안이어도 전체를 다시 읽음
+    assert feed["records"][1]["content"] == "증례 2 (수정)"
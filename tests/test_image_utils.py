@@ -0,0 +1,111 @@
+"""
+image_utils.upload_images를 로컬 HTTP 서버(imgBB 응답 흉내)에 대고 확인.
+
+파일 이름으로 서버 동작을 정한다:
+  flaky_*: 첫 요청만 500, bad_*: 항상 500, 그 외: 성공
+완료 순서가 입력 순서와 달라지도록 앞쪽 파일일수록 늦게 응답한다.
+"""
+import io
+import json
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from image_utils import upload_images
+
+_FILENAME_RE = re.compile(rb'filename="([^"]+)"')
+
+
+class _UploadHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        name = _FILENAME_RE.search(body).group(1).decode()
+        server = self.server
+        with server.lock:
+            server.attempts[name] += 1
+            attempt = server.attempts[name]
+        time.sleep(server.delays.get(name, 0))
+
+        if name.startswith("bad_") or (name.startswith("flaky_") and attempt == 1):
+            self.send_response(500)
+            self.end_headers()
+            return
+        payload = json.dumps({"success": True, "data": {"url": f"http://img.test/{name}"}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upload_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _UploadHandler)
+    server.lock = threading.Lock()
+    server.attempts = Counter()
+    server.delays = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _files(*names):
+    files = []
+    for name in names:
+        f = io.BytesIO(f"image-{name}".encode())
+        f.name = name
+        files.append(f)
+    return files
+
+
+def _upload(server, files, **kwargs):
+    with requests.Session() as session:
+        return upload_images(
+            files, api_key="test", upload_url=f"http://127.0.0.1:{server.server_port}/upload",
+            session=session, preprocess=False, dedup=False, **kwargs
+        )
+
+
+def test_urls_follow_input_order(upload_server):
+    names = ["a.png", "b.png", "c.png", "d.png"]
+    for i, name in enumerate(names):
+        upload_server.delays[name] = 0.05 * (len(names) - i)
+
+    urls, failures, report = _upload(upload_server, _files(*names), max_workers=4)
+
+    assert urls == [f"http://img.test/{name}" for name in names]
+    assert failures == []
+    assert report["uploaded_bytes"] == sum(len(f"image-{name}") for name in names)
+
+
+def test_failed_upload_is_retried(upload_server):
+    urls, failures, _ = _upload(upload_server, _files("ok.png", "flaky_1.png"), retries=1)
+
+    assert urls == ["http://img.test/ok.png", "http://img.test/flaky_1.png"]
+    assert failures == []
+    assert upload_server.attempts["flaky_1.png"] == 2
+    assert upload_server.attempts["ok.png"] == 1
+
+
+def test_persistent_failure_reported_per_file(upload_server):
+    progress = []
+    urls, failures, _ = _upload(
+        upload_server, _files("bad_1.png", "ok.png", "bad_2.png"), retries=1,
+        on_progress=lambda done, total: progress.append((done, total))
+    )
+
+    assert urls == [None, "http://img.test/ok.png", None]
+    assert [name for name, _ in failures] == ["bad_1.png", "bad_2.png"]
+    assert all("500" in message for _, message in failures)
+    assert upload_server.attempts["bad_1.png"] == 2
+    assert progress[-1] == (3, 3)
@@ -0,0 +1,36 @@
+"""import_utils.plan_import의 id 생성 확인"""
+import time
+from datetime import datetime, timedelta
+
+from import_utils import plan_import
+from list_utils import sort_records
+
+CATEGORIES = {"Stroke": "3. 뇌혈관질환", "Headache": "10. 두통"}
+
+
+def _record(i):
+    return {"question": f"가져온 문제 {i}", "choices": "가, 나, 다", "answer": "나", "category": "Stroke"}
+
+
+def test_import_ids_match_hand_added_format():
+    now = datetime.now()
+    # 방금 직접 등록한 문제와 id가 겹치지 않아야 함
+    existing = [{"id": (now - timedelta(seconds=s)).strftime("%Y%m%d%H%M%S"), "question": f"기존 {s}"}
+                for s in (0, 2)]
+    plan = plan_import([_record(i) for i in range(5)], existing, CATEGORIES)
+
+    ids = [d["id"] for d in plan["added"]]
+    assert all(len(i) == 14 and i.isdigit() for i in ids)
+    assert len(set(ids)) == 5
+    assert not set(ids) & {q["id"] for q in existing}
+    assert ids == sorted(ids)                                   # 파일 순서 유지
+    assert [row[0] for row in plan["rows"]] == ids
+
+
+def test_hand_added_after_import_sorts_newest():
+    plan = plan_import([_record(i) for i in range(50)], [], CATEGORIES)
+    time.sleep(1)
+    hand_added = {"id": datetime.now().strftime("%Y%m%d%H%M%S"), "question": "직접 등록"}
+
+    newest_first = sort_records(plan["added"] + [hand_added], key=lambda q: q.get("id", ""), reverse=True)
+    assert newest_first[0] is hand_added
@@ -0,0 +1,44 @@
+"""
+모든 페이지를 가짜 Sheets/LLM(testing_utils)으로 실행하는 스모크 테스트.
+읽기를 줄인 페이지는 재실행해도 Sheets 호출이 늘지 않는지 상한으로 확인한다.
+"""
+import pytest
+import streamlit as st
+
+from testing_utils import AUTHORIZED_SESSION, PAGES, fake_backends, make_app_test, measure_page, seed_client
+
+
+@pytest.fixture
+def client():
+    return seed_client(questions=60, materials=20, posts=20, replies=40)
+
+
+@pytest.mark.parametrize("name", list(PAGES))
+def test_page_renders(name, client):
+    with fake_backends(client):
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        at = make_app_test(PAGES[name], **AUTHORIZED_SESSION)
+        at.run()
+        at.run()
+    assert not at.exception, [e.message for e in at.exception]
+
+
+# 데이터를 읽는 Sheets 호출 (진행 상황 저장 등 쓰기와 find는 제외)
+READ_METHODS = ("get_all_records", "get_all_values", "get", "batch_get", "col_values", "row_values")
+
+# 페이지 -> (추가 세션 상태, 5회 실행 동안 허용되는 읽기 호출 수)
+SHEETS_READ_LIMITS = {
+    "1_Quiz": ({"selected_category": "Stroke"}, 1),
+    "3_Morning_Conference": ({}, 2),      # 글 + 답글 피드
+    "5_Question": ({}, 1),
+}
+
+
+@pytest.mark.parametrize("name", list(SHEETS_READ_LIMITS))
+def test_page_sheets_reads(name, client):
+    session, limit = SHEETS_READ_LIMITS[name]
+    result = measure_page(PAGES[name], client, runs=5, **AUTHORIZED_SESSION, **session)
+    assert not result["exceptions"]
+    reads = sum(result["calls"].get(method, 0) for method in READ_METHODS)
+    assert reads <= limit, result["calls"]
@@ -0,0 +1,31 @@
+"""revision_utils 이력 저장소 확인"""
+import json
+
+from revision_utils import get_revision_store, record_revision
+from sheets_utils import changed_fields
+
+
+def _revision(rev):
+    return {"rev": rev, "kind": "quiz", "id": "1", "op": "edit", "author": "윤지환",
+            "timestamp": "2024-06-01 09:00:00", "changes": {"question": [f"v{rev - 1}", f"v{rev}"]}}
+
+
+def test_corrupt_line_is_skipped(tmp_path):
+    lines = [json.dumps(_revision(1)), '{"rev": 2, "kind": "qu', json.dumps(_revision(3))]
+    (tmp_path / "tail.jsonl").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    store = get_revision_store(str(tmp_path))
+
+    assert [r["rev"] for r in store["by_record"][("quiz", "1")]] == [1, 3]
+    assert store["next_rev"] == 4
+
+
+def test_revision_matches_changed_cells():
+    store = get_revision_store("")
+    before = {"question": "문제", "difficulty": 3, "image_url": None}
+    after = {"question": "문제 ", "difficulty": "3.0", "image_url": "", "answer": "가"}
+    columns = list(after)
+
+    revision = record_revision("quiz", "1", before, after, "윤지환", columns, store=store)
+
+    assert set(revision["changes"]) == set(changed_fields(before, after, columns)) == {"answer"}